@@ -0,0 +1,133 @@
+import numpy as np
+from sqlalchemy.orm import Session
+from .cache import TTLCache
+from .config import settings
+from .models import Student, TrialResult, TrialResultSubject
+
+# (exam_id, bins) -> computed analytics; dropped whenever the exam's results change.
+analytics_cache = TTLCache("exam_analytics", 256, settings.ANALYTICS_CACHE_TTL_SECONDS)
+
+def invalidate_exam_analytics(exam_id) -> None:
+    exam_id = str(exam_id)
+    analytics_cache.pop_where(lambda v: v["exam_id"] == exam_id)
+
+class ExamFrame:
+    # One row per student who took the exam; `nets` is students x subjects with NaN
+    # where a subject was not entered.
+    def __init__(self, exam_id, student_ids, names, grades, sections, totals, subjects, nets):
+        self.exam_id = str(exam_id)
+        self.student_ids = student_ids
+        self.names = names
+        self.grades = np.asarray(grades, dtype=np.int16)
+        self.sections = np.asarray(sections, dtype=object)
+        self.totals = np.asarray(totals, dtype=np.float64)
+        self.subjects = subjects
+        self.nets = np.asarray(nets, dtype=np.float64).reshape(len(student_ids), len(subjects))
+
+def load_exam_frame(db: Session, exam_id) -> ExamFrame:
+    # Single query over trial_result ⨝ student ⟕ trial_result_subject.
+    rows = (db.query(TrialResult.id, TrialResult.student_id, Student.full_name, Student.grade, Student.class_section,
+                     TrialResult.net_total, TrialResultSubject.subject_code, TrialResultSubject.net)
+              .join(Student, Student.id == TrialResult.student_id)
+              .outerjoin(TrialResultSubject, TrialResultSubject.trial_result_id == TrialResult.id)
+              .filter(TrialResult.trial_exam_id == exam_id)
+              .all())
+    index, students = {}, []
+    subjects = sorted({r.subject_code for r in rows if r.subject_code})
+    col = {code: j for j, code in enumerate(subjects)}
+    cells = []
+    for r in rows:
+        i = index.get(r.id)
+        if i is None:
+            i = index[r.id] = len(students)
+            students.append(r)
+        if r.subject_code:
+            cells.append((i, col[r.subject_code], float(r.net)))
+    nets = np.full((len(students), len(subjects)), np.nan)
+    if cells:
+        ii, jj, vv = zip(*cells)
+        nets[list(ii), list(jj)] = vv
+    return ExamFrame(exam_id, [str(s.student_id) for s in students], [s.full_name for s in students],
+                     [s.grade for s in students], [s.class_section for s in students],
+                     [float(s.net_total) for s in students], subjects, nets)
+
+def _ranks(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Competition rank (1 = best, ties share) and percentile rank (mid-rank convention).
+    ordered = np.sort(values)
+    left = np.searchsorted(ordered, values, side="left")
+    right = np.searchsorted(ordered, values, side="right")
+    rank = len(values) - right + 1
+    percentile = (left + 0.5 * (right - left)) / len(values) * 100
+    return rank, percentile
+
+def _group_stats(keys: np.ndarray, totals: np.ndarray, nets: np.ndarray, subjects: list) -> dict:
+    labels, inverse = np.unique(keys, return_inverse=True)
+    count = np.bincount(inverse, minlength=len(labels))
+    total_mean = np.bincount(inverse, weights=totals, minlength=len(labels)) / count
+    present = ~np.isnan(nets)
+    sums = np.zeros((len(labels), len(subjects)))
+    seen = np.zeros((len(labels), len(subjects)))
+    np.add.at(sums, inverse, np.where(present, nets, 0.0))
+    np.add.at(seen, inverse, present)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        subject_mean = sums / seen
+    out = {}
+    for g, label in enumerate(labels):
+        out[str(label)] = {
+            "count": int(count[g]),
+            "mean_net_total": round(float(total_mean[g]), 3),
+            "subjects": {code: (None if np.isnan(subject_mean[g, j]) else round(float(subject_mean[g, j]), 3))
+                         for j, code in enumerate(subjects)},
+        }
+    return out
+
+def _summary(values: np.ndarray) -> dict:
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {"count": 0, "mean": None, "median": None, "std": None, "min": None, "max": None}
+    return {"count": int(len(values)), "mean": round(float(values.mean()), 3),
+            "median": round(float(np.median(values)), 3), "std": round(float(values.std()), 3),
+            "min": round(float(values.min()), 3), "max": round(float(values.max()), 3)}
+
+def compute_exam_analytics(frame: ExamFrame, bins: int = 10) -> dict:
+    n = len(frame.student_ids)
+    out = {"exam_id": frame.exam_id, "participants": n, "subjects": frame.subjects, "bins": bins}
+    if n == 0:
+        out.update({"overall": _summary(frame.totals), "per_subject": {}, "grades": {}, "sections": {},
+                    "histogram": {"bin_edges": [], "counts": []}, "students": []})
+        return out
+    rank, percentile = _ranks(frame.totals)
+    section_rank = np.zeros(n, dtype=np.int64)
+    labels, inverse = np.unique(frame.sections, return_inverse=True)
+    for g in range(len(labels)):
+        members = np.flatnonzero(inverse == g)
+        section_rank[members] = _ranks(frame.totals[members])[0]
+    subject_rank = {}
+    for j, code in enumerate(frame.subjects):
+        column = frame.nets[:, j]
+        taken = np.flatnonzero(~np.isnan(column))
+        ranks = np.zeros(n, dtype=np.int64)
+        ranks[taken] = _ranks(column[taken])[0]
+        subject_rank[code] = ranks
+    counts, edges = np.histogram(frame.totals, bins=bins)
+    order = np.argsort(rank, kind="stable")
+    out.update({
+        "overall": _summary(frame.totals),
+        "per_subject": {code: _summary(frame.nets[:, j]) for j, code in enumerate(frame.subjects)},
+        "grades": _group_stats(frame.grades, frame.totals, frame.nets, frame.subjects),
+        "sections": _group_stats(frame.sections, frame.totals, frame.nets, frame.subjects),
+        "histogram": {"bin_edges": [round(float(e), 3) for e in edges], "counts": counts.tolist()},
+        "students": [{
+            "student_id": frame.student_ids[i],
+            "full_name": frame.names[i],
+            "grade": int(frame.grades[i]),
+            "class_section": frame.sections[i],
+            "net_total": round(float(frame.totals[i]), 3),
+            "rank": int(rank[i]),
+            "section_rank": int(section_rank[i]),
+            "percentile": round(float(percentile[i]), 2),
+            "subjects": {code: {"net": round(float(frame.nets[i, j]), 3), "rank": int(subject_rank[code][i])}
+                         for j, code in enumerate(frame.subjects) if not np.isnan(frame.nets[i, j])},
+        } for i in order],
+    })
+    return out
@@ -0,0 +1,49 @@
+from typing import List
+from uuid import UUID
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from .deps import get_async_db, get_async_user
+from .schemas import TrialResultOut
+from .audit_view import audit_filters
+from . import reads
+
+# async def twins of the hot read routes, mounted ahead of the sync ones when
+# DB_ASYNC=1. The handler bodies are the shared functions in reads.py, run with
+# AsyncSession.run_sync(): their queries go out over asyncpg from the event loop,
+# so a request waiting on Postgres no longer pins a threadpool worker.
+
+router = APIRouter()
+
+@router.get("/students")
+async def list_students(grade: int | None = None, q: str | None = None, page: int = 1, page_size: int = 20,
+                        cursor: str | None = None, total: str = "exact",
+                        request: Request = None, db: AsyncSession = Depends(get_async_db)):
+    user, sess = await get_async_user(request, db)
+    return await db.run_sync(reads.list_students, user, grade, q, page, page_size, cursor, total)
+
+@router.get("/students/{id}/trials", response_model=List[TrialResultOut])
+async def student_trials(id: UUID, request: Request, db: AsyncSession = Depends(get_async_db)):
+    user, sess = await get_async_user(request, db)
+    return await db.run_sync(reads.student_trials, user, id, newest_first=True, not_found="student_not_found")
+
+@router.get("/trials")
+async def list_trials(grade: int | None = None, request: Request = None, db: AsyncSession = Depends(get_async_db)):
+    user, sess = await get_async_user(request, db)
+    return await db.run_sync(reads.list_trials, grade)
+
+@router.get("/workbooks")
+async def list_workbooks(grade: int | None = None, request: Request = None, db: AsyncSession = Depends(get_async_db)):
+    user, sess = await get_async_user(request, db)
+    return await db.run_sync(reads.list_workbooks, grade)
+
+@router.get("/audit")
+async def audit_view(actor_id: UUID | None = None, action: str | None = None, entity_type: str | None = None,
+                     entity_id: UUID | None = None, from_: datetime | None = Query(None, alias="from"),
+                     to: datetime | None = None, cursor: str | None = None, limit: int = 200,
+                     request: Request = None, db: AsyncSession = Depends(get_async_db)):
+    user, sess = await get_async_user(request, db)
+    if user.username != "rooter":
+        raise HTTPException(403, "forbidden")
+    return await db.run_sync(reads.audit_page, audit_filters(actor_id, action, entity_type, entity_id, from_, to),
+                             cursor, limit)
@@ -1,9 +1,173 @@
+import json, logging, os, queue, threading, time, uuid
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from .models import AuditLog
+from .config import settings
 from datetime import datetime, timezone
 
+log = logging.getLogger("app.audit")
+
+class AuditSink:
+    # Queues audit events in memory and writes them from a background thread with
+    # multi-row INSERTs, flushing when batch_size events are waiting or every
+    # flush_interval seconds. Batches that cannot be written are appended to an
+    # NDJSON fallback file and replayed on the next start.
+    def __init__(self, session_factory, *, batch_size: int, flush_interval: float, queue_max: int,
+                 backpressure: str, block_timeout: float, fallback_path: str):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure    # block | spill | drop
+        self.block_timeout = block_timeout
+        self.fallback_path = fallback_path
+        self.written = self.spilled = self.dropped = self.failed_flushes = self.spill_failures = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_max)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._file_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        # Drains everything still queued before returning. If the writer thread is
+        # still stuck in a write after `timeout`, the rest goes to the fallback file
+        # rather than racing it (and the slow database) for the remaining events.
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread:
+            thread.join(timeout)
+            if thread.is_alive():
+                leftovers = []
+                while batch := self._drain(block=False):
+                    leftovers += batch
+                if leftovers:
+                    self._spill(leftovers)
+                return
+        while batch := self._drain(block=False):
+            self._write(batch)
+
+    def submit(self, event: dict):
+        if not (self._thread and self._thread.is_alive()):
+            self.start()
+        try:
+            self._queue.put_nowait(event)
+            return
+        except queue.Full:
+            pass
+        if self.backpressure == "drop":
+            self.dropped += 1
+            return
+        if self.backpressure == "block":
+            try:
+                self._queue.put(event, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                pass
+        self._spill([event])
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {"pending": self.pending(), "written": self.written, "spilled": self.spilled,
+                "dropped": self.dropped, "failed_flushes": self.failed_flushes,
+                "spill_failures": self.spill_failures}
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._write(self._drain(block=True))
+
+    def _drain(self, block: bool) -> list[dict]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if block:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list[dict]):
+        if not batch:
+            return
+        try:
+            with self.session_factory() as db:
+                db.execute(insert(AuditLog), batch)
+                db.commit()
+            self.written += len(batch)
+        except Exception:
+            self.failed_flushes += 1
+            self._spill(batch)
+
+    def _spill(self, events: list[dict]):
+        # Last resort, so it must not raise: an error here would kill the writer
+        # thread and leave the queue undrained. The events are lost; count and log it.
+        try:
+            with self._file_lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.fallback_path)), exist_ok=True)
+                with open(self.fallback_path, "a", encoding="utf-8") as f:
+                    for e in events:
+                        f.write(json.dumps(e, default=str, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.spilled += len(events)
+        except OSError:
+            self.spill_failures += 1
+            log.exception("audit fallback write to %s failed; %d events lost", self.fallback_path, len(events))
+
+    def replay_fallback(self) -> int:
+        # Moves the fallback file aside and re-submits its events; anything that
+        # still fails to write is spilled to a fresh fallback file.
+        with self._file_lock:
+            if not os.path.exists(self.fallback_path):
+                return 0
+            replay_path = f"{self.fallback_path}.{int(time.time())}.replay"
+            os.replace(self.fallback_path, replay_path)
+        events = []
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    events.append(_decode_event(json.loads(line)))
+        for start in range(0, len(events), self.batch_size):
+            self._write(events[start:start + self.batch_size])
+        os.remove(replay_path)
+        return len(events)
+
+def _decode_event(e: dict) -> dict:
+    for key in ("id", "actor_id", "entity_id"):
+        if e.get(key):
+            e[key] = uuid.UUID(e[key])
+    e["ts"] = datetime.fromisoformat(e["ts"])
+    return e
+
+def _sink():
+    from .db import SessionLocal
+    return AuditSink(SessionLocal,
+                     batch_size=settings.AUDIT_BATCH_SIZE,
+                     flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+                     queue_max=settings.AUDIT_QUEUE_MAX,
+                     backpressure=settings.AUDIT_BACKPRESSURE,
+                     block_timeout=settings.AUDIT_BLOCK_TIMEOUT_SECONDS,
+                     fallback_path=settings.AUDIT_FALLBACK_PATH)
+
+audit_sink = _sink()
+
 def audit(db: Session, *, actor_id, actor_role, action, entity_type, entity_id=None, before=None, after=None, ip=None, user_agent=None):
-    row = AuditLog(
+    row = dict(
+        id=uuid.uuid4(),
         actor_id=actor_id,
         actor_role=actor_role,
         action=action,
@@ -15,5 +179,9 @@ def audit(db: Session, *, actor_id, actor_role, action, entity_type, entity_id=N
         ip=ip,
         user_agent=user_agent
     )
-    db.add(row)
-    db.commit()
+    if not settings.AUDIT_ASYNC:
+        db.add(AuditLog(**row))
+        db.commit()
+        return
+    # Async mode never touches the caller's session; commit your own changes first.
+    audit_sink.submit(row)
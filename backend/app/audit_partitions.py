@@ -0,0 +1,212 @@
+import gzip, json, os, re, sys
+from datetime import date, datetime, timezone
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from .config import settings
+
+# audit_log is range-partitioned by month on ts (UTC bounds), one child table per
+# month named audit_log_yYYYYmMM. ensure_partitions() keeps future months created;
+# run_retention() writes months older than AUDIT_RETENTION_MONTHS to gzipped NDJSON
+# under AUDIT_ARCHIVE_DIR, then detaches and drops them. Archives are read back by
+# iter_archived_rows() for the audit viewer.
+
+PARTITION_RE = re.compile(r"^audit_log_y(\d{4})m(\d{2})$")
+ARCHIVE_RE = re.compile(r"^audit_log_y(\d{4})m(\d{2})\.ndjson\.gz$")
+COLUMNS = ["id", "actor_id", "actor_role", "action", "entity_type", "entity_id", "ts", "before", "after", "ip", "user_agent"]
+
+def month_floor(value) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, n: int) -> date:
+    y, m = divmod(month.year * 12 + month.month - 1 + n, 12)
+    return date(y, m + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"audit_log_y{month.year:04d}m{month.month:02d}"
+
+def is_partitioned(db: Session) -> bool:
+    kind = db.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('audit_log')")).scalar()
+    return kind == "p"
+
+def list_partitions(db: Session) -> list[date]:
+    names = db.execute(text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                            "WHERE i.inhparent = 'audit_log'::regclass")).scalars()
+    months = []
+    for name in names:
+        m = PARTITION_RE.match(name)
+        if m:
+            months.append(date(int(m.group(1)), int(m.group(2)), 1))
+    return sorted(months)
+
+def ensure_partitions(db: Session, ahead: int | None = None, now: datetime | None = None) -> list[str]:
+    # Current month plus `ahead` future months; returns the partitions it created.
+    ahead = settings.AUDIT_PARTITIONS_AHEAD if ahead is None else ahead
+    current = month_floor(now or datetime.now(timezone.utc))
+    existing = set(list_partitions(db))
+    created = []
+    for i in range(ahead + 1):
+        month = add_months(current, i)
+        if month in existing:
+            continue
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF audit_log "
+                        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+                        f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"))
+        created.append(partition_name(month))
+    return created
+
+def archive_path(month: date, archive_dir: str | None = None) -> str:
+    return os.path.join(archive_dir or settings.AUDIT_ARCHIVE_DIR, f"{partition_name(month)}.ndjson.gz")
+
+def encode_row(row) -> str:
+    out = {}
+    for key in COLUMNS:
+        value = getattr(row, key)
+        if key in ("id", "actor_id", "entity_id") and value is not None:
+            value = str(value)
+        elif key == "ts":
+            value = value.isoformat()
+        out[key] = value
+    return json.dumps(out, ensure_ascii=False, default=str)
+
+# DETACH takes an ACCESS EXCLUSIVE lock on audit_log; give up rather than queue
+# behind a long transaction (every audit insert would queue behind the DETACH).
+DETACH_LOCK_TIMEOUT = "5s"
+
+def _write_archive(rows, path: str) -> int:
+    n = 0
+    with open(path, "wb") as raw:
+        with gzip.GzipFile(filename=os.path.basename(path).split(".gz")[0], mode="wb", fileobj=raw, mtime=0) as gz:
+            for row in rows:
+                gz.write((encode_row(row) + "\n").encode("utf-8"))
+                n += 1
+        raw.flush()
+        os.fsync(raw.fileno())
+    return n
+
+def count_archive(path: str) -> int:
+    with gzip.open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+def archive_partition(db: Session, month: date, archive_dir: str | None = None) -> int:
+    # The month is streamed to <archive>.tmp from the still-attached child table
+    # (plain reads, no lock on audit_log), then detached and dropped in a short
+    # transaction, and only after that commits is the archive renamed into place.
+    # A failed commit leaves the partition attached and just a stale .tmp behind.
+    name = partition_name(month)
+    path = archive_path(month, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = None
+    if os.path.exists(path):
+        # Published by an earlier run whose drop did not go through; reuse it if
+        # it holds every row, otherwise an operator has to look at it.
+        n = count_archive(path)
+    else:
+        tmp = path + ".tmp"
+        rows = db.execute(text(f"SELECT {', '.join(COLUMNS)} FROM {name} ORDER BY ts, id")
+                            .execution_options(yield_per=5000))
+        n = _write_archive(rows, tmp)
+    db.commit()
+    try:
+        db.execute(text(f"SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}'"))
+        db.execute(text(f"ALTER TABLE audit_log DETACH PARTITION {name}"))
+        current = db.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+        if current != n:
+            if tmp is None:
+                raise FileExistsError(path)
+            raise RuntimeError(f"partition_changed:{name}")
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+    except BaseException:
+        db.rollback()
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    if tmp is not None:
+        os.replace(tmp, path)
+    return n
+
+def publish_orphans(db: Session, archive_dir: str | None = None) -> list[str]:
+    # A crash between the DROP commit and the rename leaves the only copy of a month
+    # in <archive>.tmp; publish those whose partition is gone. Stale .tmp files of
+    # partitions that still exist are rewritten by the next archive_partition().
+    archive_dir = archive_dir or settings.AUDIT_ARCHIVE_DIR
+    if not os.path.isdir(archive_dir):
+        return []
+    attached = set(list_partitions(db))
+    published = []
+    for fname in sorted(os.listdir(archive_dir)):
+        m = ARCHIVE_RE.match(fname[:-4]) if fname.endswith(".tmp") else None
+        if not m:
+            continue
+        month = date(int(m.group(1)), int(m.group(2)), 1)
+        path = archive_path(month, archive_dir)
+        if month not in attached and not os.path.exists(path):
+            os.replace(os.path.join(archive_dir, fname), path)
+            published.append(path)
+    return published
+
+def run_retention(db: Session, retention_months: int | None = None, archive_dir: str | None = None,
+                  now: datetime | None = None) -> list[dict]:
+    retention_months = settings.AUDIT_RETENTION_MONTHS if retention_months is None else retention_months
+    now = now or datetime.now(timezone.utc)
+    ensure_partitions(db, now=now)
+    db.commit()
+    publish_orphans(db, archive_dir)
+    cutoff = add_months(month_floor(now), -retention_months)
+    archived = []
+    for month in list_partitions(db):
+        if month < cutoff:
+            archived.append({"partition": partition_name(month), "rows": archive_partition(db, month, archive_dir),
+                             "path": archive_path(month, archive_dir)})
+    return archived
+
+def list_archives(archive_dir: str | None = None) -> list[dict]:
+    archive_dir = archive_dir or settings.AUDIT_ARCHIVE_DIR
+    if not os.path.isdir(archive_dir):
+        return []
+    out = []
+    for fname in sorted(os.listdir(archive_dir)):
+        m = ARCHIVE_RE.match(fname)
+        if m:
+            out.append({"month": f"{m.group(1)}-{m.group(2)}",
+                        "bytes": os.path.getsize(os.path.join(archive_dir, fname))})
+    return out
+
+def _utc(value: datetime | None) -> datetime | None:
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+def iter_archived_rows(from_=None, to=None, archive_dir: str | None = None):
+    # Yields decoded rows (same shape as the viewer's items), oldest first, from the
+    # monthly archives overlapping [from_, to]; other filters are applied by the caller.
+    from_, to = _utc(from_), _utc(to)
+    for item in list_archives(archive_dir):
+        month = date.fromisoformat(item["month"] + "-01")
+        if from_ and add_months(month, 1) <= month_floor(from_.astimezone(timezone.utc)):
+            continue
+        if to and month > month_floor(to.astimezone(timezone.utc)):
+            continue
+        with gzip.open(archive_path(month, archive_dir), "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                ts = datetime.fromisoformat(row["ts"])
+                if (from_ and ts < from_) or (to and ts > to):
+                    continue
+                yield row
+
+if __name__ == "__main__":
+    command = sys.argv[1:]
+    if command not in (["ensure"], ["retention"]):
+        sys.exit("usage: python -m app.audit_partitions ensure|retention")
+    from .db import SessionLocal
+    with SessionLocal() as db:
+        if not is_partitioned(db):
+            sys.exit("audit_log is not partitioned; see audit_model.md (Partitioning)")
+        if command == ["ensure"]:
+            created = ensure_partitions(db)
+            db.commit()
+            print(f"created {len(created)} partitions: {', '.join(created) or '-'}")
+        else:
+            for a in run_retention(db):
+                print(f"archived {a['partition']}: {a['rows']} rows -> {a['path']}")
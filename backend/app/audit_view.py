@@ -0,0 +1,69 @@
+import json
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .models import AuditLog
+from .pagination import encode_cursor, decode_cursor, keyset_after
+
+# Read side of the audit log: filters shared by the viewer and the export, (ts, id)
+# keyset cursors, and row serialization. Indexes backing the filters are in database.sql.
+
+AUDIT_SORT = [(AuditLog.ts, "desc"), (AuditLog.id, "desc")]
+EXPORT_FIELDS = ["id", "ts", "actor_id", "actor_role", "action", "entity_type", "entity_id",
+                 "ip", "user_agent", "before", "after"]
+
+def audit_filters(actor_id=None, action=None, entity_type=None, entity_id=None, from_=None, to=None) -> list:
+    cond = []
+    if actor_id:
+        cond.append(AuditLog.actor_id == actor_id)
+    if action:
+        cond.append(AuditLog.action == action)
+    if entity_type:
+        cond.append(AuditLog.entity_type == entity_type)
+    if entity_id:
+        cond.append(AuditLog.entity_id == entity_id)
+    if from_:
+        cond.append(AuditLog.ts >= from_)
+    if to:
+        cond.append(AuditLog.ts <= to)
+    return cond
+
+def row_matches(row: dict, actor_id=None, action=None, entity_type=None, entity_id=None) -> bool:
+    # In-memory twin of audit_filters() for archived rows (time bounds are applied by the reader).
+    return ((not actor_id or row["actor_id"] == str(actor_id))
+            and (not action or row["action"] == action)
+            and (not entity_type or row["entity_type"] == entity_type)
+            and (not entity_id or row["entity_id"] == str(entity_id)))
+
+def audit_cursor(a) -> str:
+    return encode_cursor([a.ts.isoformat(), str(a.id)])
+
+def after_cursor(cursor: str):
+    # Raises ValueError("invalid_cursor") for anything that is not one of ours.
+    ts, aid = decode_cursor(cursor, len(AUDIT_SORT))
+    try:
+        return keyset_after(AUDIT_SORT, [datetime.fromisoformat(ts), UUID(aid)])
+    except (TypeError, ValueError):
+        raise ValueError("invalid_cursor")
+
+def audit_row(a) -> dict:
+    return {
+        "id": str(a.id), "actor_id": str(a.actor_id), "actor_role": a.actor_role, "action": a.action,
+        "entity_type": a.entity_type, "entity_id": (str(a.entity_id) if a.entity_id else None),
+        "ts": a.ts.isoformat(), "before": a.before, "after": a.after, "ip": a.ip, "user_agent": a.user_agent
+    }
+
+def audit_csv_row(row: dict) -> dict:
+    return {**row, "before": _json_cell(row["before"]), "after": _json_cell(row["after"])}
+
+def _json_cell(value):
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+def iter_audit_rows(db: Session, filters: list, yield_per: int = 2000):
+    # Oldest first for exports; streamed through a server-side cursor.
+    stmt = (select(AuditLog).where(*filters)
+              .order_by(AuditLog.ts.asc(), AuditLog.id.asc())
+              .execution_options(yield_per=yield_per))
+    for a in db.execute(stmt).scalars():
+        yield audit_row(a)
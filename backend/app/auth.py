@@ -7,6 +7,9 @@ from .models import Teacher, Session as SessionModel
 from .security import verify_password, hash_password, validate_password, random_token, new_session_expiry
 from .config import settings
 from .audit import audit
+from .session_cache import invalidate_session
+from .sessions import session_touches
+from .ratelimit import login_ip_limiter, login_user_limiter, retry_after, client_ip
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -21,6 +24,17 @@ def login(payload: dict, request: Request):
     email = payload.get("email")
     password = payload.get("password") or ""
     remember = bool(payload.get("remember", True))
+    # Throttle before touching the database or Argon2: per client IP and per
+    # account name, so neither a single source nor a spread-out attack on one
+    # account gets more than RATE_LIMIT_MAX_AUTH_ATTEMPTS per window.
+    ip = client_ip(request)
+    wait = login_ip_limiter.take(ip or "-")
+    account = (username or email or "").strip().lower()
+    if not wait and account:
+        wait = login_user_limiter.take(account)
+    if wait:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="rate_limited",
+                            headers={"Retry-After": retry_after(wait)})
     with SessionLocal() as db:
         q = db.query(Teacher)
         if username:
@@ -35,7 +49,7 @@ def login(payload: dict, request: Request):
         csrf = random_token(16)
         sess = SessionModel(id=sid, user_id=user.id, role="rooter" if user.username == "rooter" else "teacher",
                             csrf_token=csrf, expires_at=new_session_expiry(),
-                            user_agent=request.headers.get("user-agent"), last_seen_ip=request.client.host)
+                            user_agent=request.headers.get("user-agent"), last_seen_ip=ip)
         db.add(sess); db.commit()
         resp = Response(content='{"ok":true}', media_type="application/json")
         _set_cookies(resp, sid, csrf)
@@ -53,6 +67,8 @@ def logout(request: Request):
         if sess:
             db.delete(sess)
             db.commit()
+        invalidate_session(sid)
+        session_touches.forget(sid)
         resp = Response(status_code=status.HTTP_204_NO_CONTENT)
         resp.delete_cookie(settings.SESSION_COOKIE_NAME, path="/")
         resp.delete_cookie(settings.CSRF_COOKIE_NAME, path="/")
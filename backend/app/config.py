@@ -10,19 +10,79 @@ class Settings:
     DB_USER = os.getenv("POSTGRES_USER", "lgs_user")
     DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "password")
     DB_NAME = os.getenv("POSTGRES_DB", "lgs_db")
+    # Serve the read-heavy routes from an asyncpg engine (see async_reads.py); writes stay sync.
+    DB_ASYNC = bool(int(os.getenv("DB_ASYNC", "0")))
+    # Per engine (the async engine gets its own pool of the same shape).
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = server default
+
+    # /metrics (Prometheus text format), off by default. Scrapers send METRICS_TOKEN as a
+    # bearer token; outside APP_ENV=development the endpoint is not served without one.
+    METRICS_ENABLED = bool(int(os.getenv("METRICS_ENABLED", "0")))
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+    # Per-request SQL profiling (Server-Timing + "app.profiler" log); not for production traffic.
+    SQL_PROFILING = bool(int(os.getenv("SQL_PROFILING", "0")))
+    SQL_PROFILING_REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILING_REPEAT_THRESHOLD", "5"))
 
     SESSION_COOKIE_NAME = os.getenv("SESSION_COOKIE_NAME", "lgs_session")
     CSRF_COOKIE_NAME = os.getenv("CSRF_COOKIE_NAME", "lgs_csrf")
     SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "2592000"))
+    SESSION_CACHE_TTL_SECONDS = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+    SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "4096"))
+    SESSION_REAP_INTERVAL_SECONDS = int(os.getenv("SESSION_REAP_INTERVAL_SECONDS", "3600"))  # 0 = off
+    SESSION_REAP_BATCH_SIZE = int(os.getenv("SESSION_REAP_BATCH_SIZE", "1000"))
+    SESSION_TOUCH_INTERVAL_SECONDS = int(os.getenv("SESSION_TOUCH_INTERVAL_SECONDS", "300"))
+    SESSION_SLIDING_EXPIRY = bool(int(os.getenv("SESSION_SLIDING_EXPIRY", "0")))
 
     RATE_LIMIT_WINDOW_SECONDS = int(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60"))
     RATE_LIMIT_MAX_AUTH_ATTEMPTS = int(os.getenv("RATE_LIMIT_MAX_AUTH_ATTEMPTS", "15"))
+    RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+    # Comma-separated IPs/CIDRs of reverse proxies (the frontend nginx) whose
+    # X-Forwarded-For is believed; requests from anywhere else use the socket peer.
+    TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "")
+
+    # Argon2 runs on its own small pool (each hash holds ~64 MB); calls beyond
+    # ARGON2_MAX_WORKERS + ARGON2_MAX_QUEUE in flight are rejected with 429.
+    ARGON2_MAX_WORKERS = int(os.getenv("ARGON2_MAX_WORKERS", "2"))
+    ARGON2_MAX_QUEUE = int(os.getenv("ARGON2_MAX_QUEUE", "16"))
 
     PASSWORD_MIN_LENGTH = int(os.getenv("PASSWORD_MIN_LENGTH", "10"))
     PASSWORD_REQUIRE_SYMBOL = bool(int(os.getenv("PASSWORD_REQUIRE_SYMBOL", "1")))
     PASSWORD_REQUIRE_NUMBER = bool(int(os.getenv("PASSWORD_REQUIRE_NUMBER", "1")))
     PASSWORD_REQUIRE_UPPER = bool(int(os.getenv("PASSWORD_REQUIRE_UPPER", "1")))
 
+    SCOPE_CACHE_TTL_SECONDS = int(os.getenv("SCOPE_CACHE_TTL_SECONDS", "300"))
+    SCOPE_CACHE_MAX_ENTRIES = int(os.getenv("SCOPE_CACHE_MAX_ENTRIES", "1024"))
+
+    AUDIT_ASYNC = bool(int(os.getenv("AUDIT_ASYNC", "1")))
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+    AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1.0"))
+    AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+    AUDIT_BACKPRESSURE = os.getenv("AUDIT_BACKPRESSURE", "block")  # block | spill | drop
+    AUDIT_BLOCK_TIMEOUT_SECONDS = float(os.getenv("AUDIT_BLOCK_TIMEOUT_SECONDS", "0.5"))
+    AUDIT_FALLBACK_PATH = os.getenv("AUDIT_FALLBACK_PATH", "/app/data/audit_fallback.ndjson")
+
+    AUDIT_PARTITIONS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "3"))
+    AUDIT_PARTITION_CHECK_INTERVAL_SECONDS = int(os.getenv("AUDIT_PARTITION_CHECK_INTERVAL_SECONDS", "3600"))  # 0 = off
+    AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "24"))
+    AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "/app/data/audit_archive")
+
+    STUDENT_COUNT_CACHE_TTL_SECONDS = int(os.getenv("STUDENT_COUNT_CACHE_TTL_SECONDS", "60"))
+
+    ANALYTICS_CACHE_TTL_SECONDS = int(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "3600"))
+
+    ROLLING_STATS_WINDOW = int(os.getenv("ROLLING_STATS_WINDOW", "5"))
+
+    # Edits through the ORM or Session.execute() invalidate at once; raw SQL (psql,
+    # database.sql, Connection.execute) is only picked up when this TTL expires.
+    SUBJECTS_CONFIG_CACHE_TTL_SECONDS = int(os.getenv("SUBJECTS_CONFIG_CACHE_TTL_SECONDS", "300"))
+
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
     TEACHER_GLOBAL_ACCESS = bool(int(os.getenv("TEACHER_GLOBAL_ACCESS", "1"))) #NEW!!!
 
     ROOTER_USERNAME = os.getenv("ROOTER_USERNAME", "rooter")
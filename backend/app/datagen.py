@@ -0,0 +1,352 @@
+import argparse, csv, io, json, random, sys, time, uuid
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import Session
+from .models import (ClassSection, Teacher, TeacherScope, Student, SubjectsConfig, TrialExam, TrialResult,
+                     TrialResultSubject, Workbook, StudentWorkbook, SubjectOutcome, ResourceBook, ResourceOutcomeCheck)
+from .search import fold_name
+
+# Synthetic school generator: grades 5-8 with sections, homeroom and subject teachers
+# (with teacher_scope rows), students with Turkish names, several academic years of
+# exams scored against the default-2025 subjects_config, workbooks, resource books and
+# outcome checks. iter_school() is a pure, seeded row generator (the same arguments
+# always give the same rows); Loader streams them into Postgres with COPY in chunks,
+# or as multi-row INSERTs on other databases.
+#
+#   python -m app.datagen --students 50000 --years 3 --seed 7
+
+CONFIG_NAME = "default-2025"
+SUBJECT_TITLES = {"TR": "Türkçe", "MAT": "Matematik", "FEN": "Fen Bilimleri", "INK": "İnkılap Tarihi",
+                  "DIN": "Din Kültürü", "ING": "İngilizce"}
+PUBLISHERS = ["Yıldız Yayınları", "Bilgi Sarmal", "Paraf", "Okyanus", "Hız Yayınları", "Palme"]
+MALE_NAMES = ["Ahmet", "Mehmet", "Mustafa", "Ali", "Hüseyin", "Hasan", "İbrahim", "Yusuf", "Ömer", "Emre",
+              "Burak", "Can", "Çağan", "Efe", "Eymen", "Göktuğ", "Kerem", "Mert", "Oğuz", "Selim",
+              "Tuna", "Umut", "Yiğit", "Berat", "Alperen", "Doruk", "Kaan", "Arda", "Furkan", "Şahin"]
+FEMALE_NAMES = ["Ayşe", "Fatma", "Zeynep", "Elif", "Emine", "Hatice", "Merve", "Büşra", "Özge", "Ece",
+                "Defne", "Duru", "Eylül", "Gülşah", "İrem", "Melis", "Nehir", "Öykü", "Sıla", "Şule",
+                "Yağmur", "Zehra", "Asya", "Azra", "Belinay", "Ceren", "Damla", "Ela", "Hira", "Nisa"]
+LAST_NAMES = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Yıldırım", "Öztürk", "Aydın", "Özdemir",
+              "Arslan", "Doğan", "Kılıç", "Aslan", "Çetin", "Kara", "Koç", "Kurt", "Özkan", "Şimşek",
+              "Polat", "Erdoğan", "Korkmaz", "Çakır", "Güneş", "Aktaş", "Bulut", "Keskin", "Ünal", "Güler"]
+
+# Column order of the generated tuples; also the COPY column lists. Dict order is FK order.
+COLUMNS = {
+    ClassSection: ("id", "grade", "label", "active"),
+    Teacher: ("id", "full_name", "email", "username", "password_hash", "must_change_password", "status",
+              "created_at", "updated_at"),
+    TeacherScope: ("teacher_id", "grade", "class_section"),
+    Student: ("id", "full_name", "grade", "class_section", "guardian_name", "guardian_phone", "guardian_email",
+              "status", "created_at", "updated_at"),
+    TrialExam: ("id", "name", "source", "date", "grade_scope", "subjects_config_id", "is_finalized", "created_at"),
+    TrialResult: ("id", "student_id", "trial_exam_id", "correct_total", "wrong_total", "blank_total", "net_total",
+                  "entered_by", "entered_at"),
+    TrialResultSubject: ("id", "trial_result_id", "subject_code", "correct", "wrong", "blank", "net"),
+    Workbook: ("id", "title", "subject_code", "grade", "publisher", "total_units", "total_pages"),
+    StudentWorkbook: ("id", "student_id", "workbook_id", "assigned_by", "assigned_at", "target_date", "status",
+                      "progress_percent"),
+    ResourceBook: ("id", "student_id", "name", "subject_code", "created_at", "checked_count", "outcome_total"),
+    ResourceOutcomeCheck: ("id", "resource_book_id", "outcome_id", "checked"),
+}
+
+# Tables with array/JSON values that plain str() would render wrongly for COPY.
+NEEDS_CONVERSION = {TrialExam}
+
+class Loader:
+    # Buffers generated rows per table and writes them in FK order every `chunk_rows`
+    # rows, so memory stays flat however large the school is.
+    def __init__(self, db: Session, chunk_rows: int = 50000):
+        self.db = db
+        self.chunk_rows = chunk_rows
+        self.copy = db.get_bind().dialect.name == "postgresql"
+        self.buffers = {model: [] for model in COLUMNS}
+        self.counts = {model.__tablename__: 0 for model in COLUMNS}
+        self._pending = 0
+
+    def add(self, model, row: tuple):
+        self.buffers[model].append(row)
+        self._pending += 1
+        if self._pending >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        for model, rows in self.buffers.items():
+            if rows:
+                (self._copy if self.copy else self._insert)(model, rows)
+                self.counts[model.__tablename__] += len(rows)
+                self.buffers[model] = []
+        self._pending = 0
+
+    def _insert(self, model, rows):
+        cols = COLUMNS[model]
+        # Ids are generated as text; the ORM's UUID type wants uuid.UUID objects.
+        ids = {i for i, c in enumerate(cols) if isinstance(model.__table__.c[c].type, PG_UUID)}
+        self.db.execute(insert(model), [{c: (uuid.UUID(v) if i in ids and v is not None else v)
+                                         for i, (c, v) in enumerate(zip(cols, r))} for r in rows])
+
+    def _copy(self, model, rows):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if model in NEEDS_CONVERSION:
+            writer.writerows([copy_value(v) for v in r] for r in rows)
+        else:
+            # str(), which csv applies to everything else, is already valid COPY input.
+            writer.writerows(rows)
+        buf.seek(0)
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {model.__tablename__} ({', '.join(COLUMNS[model])}) "
+                               f"FROM STDIN WITH (FORMAT csv)", buf)
+        finally:
+            cursor.close()
+
+def copy_value(value):
+    # CSV cell for COPY: an unquoted empty cell is NULL, so None maps to "".
+    if value is None:
+        return ""
+    if value is True or value is False:
+        return "t" if value else "f"
+    if isinstance(value, (list, tuple)):
+        return "{" + ",".join(str(v) for v in value) + "}"
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def _uuid(rng: random.Random) -> str:
+    # Version-4 UUID text built straight from the seeded generator; several times
+    # cheaper than uuid.UUID objects at millions of rows.
+    h = "%032x" % rng.getrandbits(128)
+    return f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}"
+
+def _ascii(name: str) -> str:
+    return fold_name(name).replace(" ", ".")
+
+def _academic_year(as_of: date) -> int:
+    return as_of.year if as_of.month >= 9 else as_of.year - 1
+
+def exam_dates(year: int, n: int, as_of: date) -> list[date]:
+    # n exams spread between October and May of the academic year starting in `year`,
+    # on Saturdays; dates after as_of are dropped.
+    start, end = date(year, 10, 1), date(year + 1, 5, 31)
+    step = (end - start).days / max(n, 1)
+    out = []
+    for i in range(n):
+        d = start + timedelta(days=int(i * step))
+        d += timedelta(days=(5 - d.weekday()) % 7)
+        if d <= as_of:
+            out.append(d)
+    return out
+
+def grade_max_questions(per_grade: dict) -> dict:
+    # grade -> {subject_code: max questions} from a subjects_config per_grade JSON.
+    return {g: {code: int(spec.get("max", 0)) for code, spec in (per_grade.get(str(g)) or {}).items()
+                if int(spec.get("max", 0)) > 0} for g in range(5, 9)}
+
+def score(rng: random.Random, ability: float, max_questions: dict, penalty: float):
+    # One student's sheet: per-subject (code, correct, wrong, blank, net) plus totals.
+    subjects, correct_t, wrong_t, blank_t, net_t = [], 0, 0, 0, 0.0
+    rand = rng.random
+    for code, maxq in max_questions.items():
+        p = ability + 0.3 * rand() - 0.15
+        correct = 0 if p <= 0 else maxq if p >= 1 else int(maxq * p + 0.5)
+        wrong = int((maxq - correct) * (0.3 + 0.6 * rand()) + 0.5)
+        blank = maxq - correct - wrong
+        net = round(correct - wrong * penalty, 3)
+        subjects.append((code, correct, wrong, blank, net))
+        correct_t += correct; wrong_t += wrong; blank_t += blank; net_t += net
+    return subjects, (correct_t, wrong_t, blank_t, round(net_t, 3))
+
+def iter_school(*, seed: int, students: int, years: int, exams_per_year: int, sections_per_grade: int,
+                books_per_student: int, workbooks_per_student: int, config_id, per_grade: dict, penalty: float,
+                outcomes: dict, existing_sections: frozenset, password_hash: str, as_of: date,
+                prefix: str = "gen", participation: float = 0.95):
+    # Yields (model, row tuple) in an order the Loader can write. `per_grade` is the
+    # subjects_config JSON, `outcomes` maps subject_code -> [outcome ids].
+    rng = random.Random(seed)
+    current = _academic_year(as_of)
+    stamp = datetime(current, 9, 1, 8, tzinfo=timezone.utc)
+    grades = range(5, 9)
+    max_questions = grade_max_questions(per_grade)
+    letters = "ABCDEFGHIJKLMNOPRSTUVYZ"[:sections_per_grade]
+    sections = {g: [f"{g}/{letter}" for letter in letters] for g in grades}
+
+    for g in grades:
+        for label in sections[g]:
+            if (g, label) not in existing_sections:
+                yield ClassSection, (_uuid(rng), g, label, True)
+
+    # Homeroom teacher per section (scoped to it), one teacher per grade and subject (whole grade).
+    homeroom = {}
+    teacher_no = 0
+
+    def teacher(scopes):
+        nonlocal teacher_no
+        teacher_no += 1
+        first = rng.choice(MALE_NAMES if rng.random() < 0.4 else FEMALE_NAMES)
+        last = rng.choice(LAST_NAMES)
+        tid = _uuid(rng)
+        username = f"{prefix}_t{teacher_no:04d}"
+        rows = [(Teacher, (tid, f"{first} {last}", f"{username}.{_ascii(last)}@example.edu.tr", username,
+                           password_hash, False, "active", stamp, stamp))]
+        rows += [(TeacherScope, (tid, g, cs)) for g, cs in scopes]
+        return tid, rows
+
+    for g in grades:
+        for label in sections[g]:
+            homeroom[label], rows = teacher([(g, label)])
+            yield from rows
+        for code in max_questions[g]:
+            _, rows = teacher([(g, None)])
+            yield from rows
+
+    roster = {g: [] for g in grades}   # grade -> [(student_id, ability, class_section)]
+    for i in range(students):
+        g = grades[i % 4]
+        cs = rng.choice(sections[g])
+        first = rng.choice(MALE_NAMES if rng.random() < 0.5 else FEMALE_NAMES)
+        last = rng.choice(LAST_NAMES)
+        parent = rng.choice(FEMALE_NAMES if rng.random() < 0.6 else MALE_NAMES)
+        sid = _uuid(rng)
+        roster[g].append((sid, min(0.95, max(0.1, rng.gauss(0.55, 0.15))), cs))
+        yield Student, (sid, f"{first} {last}", g, cs, f"{parent} {last}", f"05{rng.randrange(10**9):09d}",
+                        f"{_ascii(parent)}.{_ascii(last)}{i}@example.com", "active", stamp, stamp)
+
+    # Exams: year k back, grade g had today's grade g+k students. The latest exam of the
+    # current year stays open; everything else is finalized.
+    for k in range(years):
+        year = current - k
+        for g in grades:
+            cohort = roster.get(g + k)
+            if not cohort or not max_questions[g]:
+                continue
+            dates = exam_dates(year, exams_per_year, as_of)
+            for n, d in enumerate(dates):
+                exam_id = _uuid(rng)
+                publisher = PUBLISHERS[(n + g) % len(PUBLISHERS)]
+                finalized = k > 0 or n < len(dates) - 1
+                yield TrialExam, (exam_id, f"{publisher} LGS Deneme {n + 1} ({g}. sınıf)", publisher, d, [g],
+                                  config_id, finalized, datetime(d.year, d.month, d.day, 7, tzinfo=timezone.utc))
+                entered_at = datetime(d.year, d.month, d.day, 15, tzinfo=timezone.utc) + timedelta(days=rng.randint(1, 3))
+                for sid, ability, cs in cohort:
+                    if rng.random() >= participation:
+                        continue
+                    rid = _uuid(rng)
+                    subjects, (c, w, b, net) = score(rng, ability, max_questions[g], penalty)
+                    yield TrialResult, (rid, sid, exam_id, c, w, b, net, homeroom[cs], entered_at)
+                    for code, correct, wrong, blank, subj_net in subjects:
+                        yield TrialResultSubject, (_uuid(rng), rid, code, correct, wrong, blank, subj_net)
+
+    catalogue = {}   # grade -> [(workbook_id, subject_code)]
+    for g in grades:
+        for code in max_questions[g]:
+            for publisher in rng.sample(PUBLISHERS, 2):
+                wid = _uuid(rng)
+                catalogue.setdefault(g, []).append((wid, code))
+                yield Workbook, (wid, f"{g}. Sınıf {SUBJECT_TITLES.get(code, code)} Soru Bankası", code, g, publisher,
+                                 rng.randint(6, 12), rng.randrange(160, 400, 8))
+
+    for g in grades:
+        books = catalogue.get(g, [])
+        subject_codes = [c for c in max_questions[g] if outcomes.get(c)]
+        for sid, ability, cs in roster[g]:
+            for wid, _ in rng.sample(books, min(workbooks_per_student, len(books))):
+                progress = rng.randint(0, 100)
+                status = "completed" if progress == 100 else "in_progress" if progress else "assigned"
+                yield StudentWorkbook, (_uuid(rng), sid, wid, homeroom[cs], stamp + timedelta(days=rng.randint(0, 60)),
+                                        date(current + 1, 5, 31), status, progress)
+            for n in range(books_per_student if subject_codes else 0):
+                code = rng.choice(subject_codes)
+                ids = outcomes[code]
+                bid = _uuid(rng)
+                touched = rng.sample(ids, rng.randint(0, len(ids)))
+                checks = [(oid, rng.random() < ability + 0.2) for oid in touched]
+                yield ResourceBook, (bid, sid, f"{SUBJECT_TITLES.get(code, code)} Kaynak {n + 1}", code,
+                                     stamp + timedelta(days=rng.randint(0, 90)),
+                                     sum(1 for _, c in checks if c), len(ids))
+                for oid, checked in checks:
+                    yield ResourceOutcomeCheck, (_uuid(rng), bid, oid, checked)
+
+def ensure_outcomes(db: Session, subject_codes) -> dict:
+    # subject_code -> outcome ids ordered by code; seeds 20 generic outcomes for any
+    # subject that has none (same shape as the app's startup seed).
+    out = {}
+    for code in subject_codes:
+        ids = db.execute(select(SubjectOutcome.id).where(SubjectOutcome.subject_code == code)
+                         .order_by(SubjectOutcome.code)).scalars().all()
+        if not ids:
+            rows = [{"id": uuid.uuid4(), "subject_code": code, "code": i, "text": f"Kazanım {i}"} for i in range(1, 21)]
+            db.execute(insert(SubjectOutcome), rows)
+            ids = [r["id"] for r in rows]
+        out[code] = list(ids)
+    return out
+
+def generate(db: Session, *, seed: int = 1, students: int = 2000, years: int = 2, exams_per_year: int = 8,
+             sections_per_grade: int = 6, books_per_student: int = 2, workbooks_per_student: int = 2,
+             password: str = "Ogretmen-2025!", prefix: str = "gen", as_of: date | None = None,
+             chunk_rows: int = 50000, stats: bool = True) -> dict:
+    # Loads one school and commits. The rows bypass the entry paths, so
+    # student_subject_stats is rebuilt afterwards unless `stats` is off.
+    from .security import hash_password
+    conf = db.execute(select(SubjectsConfig).where(SubjectsConfig.name == CONFIG_NAME)).scalars().first()
+    if not conf:
+        raise ValueError(f"subjects_config_missing:{CONFIG_NAME}")
+    if db.execute(select(Teacher.id).where(Teacher.username == f"{prefix}_t0001")).first():
+        raise ValueError(f"prefix_in_use:{prefix}")
+    per_grade = conf.per_grade or {}
+    codes = sorted({code for g in range(5, 9) for code in (per_grade.get(str(g)) or {})})
+    outcomes = ensure_outcomes(db, codes)
+    existing = frozenset(db.execute(select(ClassSection.grade, ClassSection.label)).tuples().all())
+    loader = Loader(db, chunk_rows)
+    for model, row in iter_school(seed=seed, students=students, years=years, exams_per_year=exams_per_year,
+                                  sections_per_grade=sections_per_grade, books_per_student=books_per_student,
+                                  workbooks_per_student=workbooks_per_student, config_id=conf.id,
+                                  per_grade=per_grade, penalty=float(conf.penalty_factor), outcomes=outcomes,
+                                  existing_sections=existing, password_hash=hash_password(password),
+                                  as_of=as_of or date.today(), prefix=prefix):
+        loader.add(model, row)
+    loader.flush()
+    db.commit()
+    counts = dict(loader.counts)
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("ANALYZE"))
+        db.commit()
+    if stats:
+        from .subject_stats import rebuild_all
+        counts["student_subject_stats"] = rebuild_all(db)
+        db.commit()
+    return counts
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m app.datagen", description="Load a deterministic synthetic school.")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--students", type=int, default=2000)
+    p.add_argument("--years", type=int, default=2, help="academic years of exam history (current one included)")
+    p.add_argument("--exams-per-year", type=int, default=8)
+    p.add_argument("--sections", type=int, default=6, help="sections per grade")
+    p.add_argument("--books-per-student", type=int, default=2)
+    p.add_argument("--workbooks-per-student", type=int, default=2)
+    p.add_argument("--password", default="Ogretmen-2025!", help="password of every generated teacher")
+    p.add_argument("--prefix", default="gen", help="username prefix of generated teachers")
+    p.add_argument("--as-of", type=date.fromisoformat, help="generation date (YYYY-MM-DD); defaults to today")
+    p.add_argument("--no-stats", dest="stats", action="store_false",
+                   help="skip rebuilding student_subject_stats (run `python -m app.subject_stats rebuild` later)")
+    args = p.parse_args(argv)
+    from .db import SessionLocal
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        try:
+            counts = generate(db, seed=args.seed, students=args.students, years=args.years,
+                              exams_per_year=args.exams_per_year, sections_per_grade=args.sections,
+                              books_per_student=args.books_per_student,
+                              workbooks_per_student=args.workbooks_per_student, password=args.password,
+                              prefix=args.prefix, as_of=args.as_of, stats=args.stats)
+        except ValueError as e:
+            sys.exit(str(e))
+        for table, n in counts.items():
+            print(f"{table:24} {n:>10}")
+        print(f"loaded in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,27 @@ from sqlalchemy.orm import sessionmaker, declarative_base
 from .config import settings
 
 DATABASE_URL = f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
+POOL_OPTIONS = dict(pool_pre_ping=True, pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW,
+                    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS, pool_recycle=settings.DB_POOL_RECYCLE_SECONDS)
+
+def _connect_args(driver: str) -> dict:
+    # statement_timeout is set per connection so runaway queries are cancelled server-side.
+    if settings.DB_STATEMENT_TIMEOUT_MS <= 0:
+        return {}
+    if driver == "asyncpg":
+        return {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+    return {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+
+engine = create_engine(DATABASE_URL, future=True, connect_args=_connect_args("psycopg2"), **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 Base = declarative_base()
+
+# Optional second engine for the async read routes; asyncpg is only needed with DB_ASYNC=1.
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=_connect_args("asyncpg"), **POOL_OPTIONS)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -1,6 +1,11 @@
 from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session as DBSession
-from .db import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from .db import SessionLocal, AsyncSessionLocal
+from .config import settings
+from .session_cache import load_principal
+from .sessions import session_touches
+from .ratelimit import client_ip
 
 def get_db():
     db = SessionLocal()
@@ -9,6 +14,35 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("async engine disabled; set DB_ASYNC=1")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _session_id(request: Request) -> str:
+    sid = request.cookies.get(settings.SESSION_COOKIE_NAME)
+    if not sid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="no_session")
+    return sid
+
+def get_principal(request: Request, db: DBSession):
+    sid = _session_id(request)
+    principal = load_principal(db, sid)
+    session_touches.touch(sid, client_ip(request))
+    return principal
+
+def get_user(request: Request, db: DBSession):
+    principal = get_principal(request, db)
+    return principal.user, principal.session
+
+async def get_async_user(request: Request, db: AsyncSession):
+    # Same principal cache as the sync path; a miss loads through the async connection.
+    sid = _session_id(request)
+    principal = await db.run_sync(load_principal, sid)
+    session_touches.touch(sid, client_ip(request))
+    return principal.user, principal.session
+
 def require_csrf(request: Request):
     # Double submit: header must equal cookie value; cookie itself is not HttpOnly.
     token_header = request.headers.get("X-CSRF-Token")
@@ -0,0 +1,89 @@
+import csv, json
+from io import StringIO
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .models import Student, TrialResult, TrialResultSubject
+
+# Streaming exam export: one wide row per result, rows read through a server-side
+# cursor (yield_per) so memory stays flat regardless of exam size.
+
+BASE_FIELDS = ["student_id", "full_name", "grade", "class_section",
+               "correct_total", "wrong_total", "blank_total", "net_total", "entered_at"]
+SUBJECT_FIELDS = ["correct", "wrong", "blank", "net"]
+
+def export_subjects(per_grade: dict, grades) -> list[str]:
+    # Subject codes allowed for any of the exam's grades, in config order.
+    codes = []
+    for g in grades or per_grade.keys():
+        for code in (per_grade.get(str(g)) or {}):
+            if code not in codes:
+                codes.append(code)
+    return codes
+
+def export_fields(subjects: list[str]) -> list[str]:
+    return BASE_FIELDS + [f"{code}_{f}" for code in subjects for f in SUBJECT_FIELDS]
+
+def iter_exam_rows(db: Session, exam_id, scope_filter=None, yield_per: int = 1000):
+    # Yields flat dicts; subject rows for one result arrive adjacent thanks to the ORDER BY.
+    stmt = (select(TrialResult.id, TrialResult.student_id, Student.full_name, Student.grade, Student.class_section,
+                   TrialResult.correct_total, TrialResult.wrong_total, TrialResult.blank_total,
+                   TrialResult.net_total, TrialResult.entered_at,
+                   TrialResultSubject.subject_code, TrialResultSubject.correct, TrialResultSubject.wrong,
+                   TrialResultSubject.blank, TrialResultSubject.net)
+              .join(Student, Student.id == TrialResult.student_id)
+              .outerjoin(TrialResultSubject, TrialResultSubject.trial_result_id == TrialResult.id)
+              .where(TrialResult.trial_exam_id == exam_id)
+              .order_by(Student.grade, Student.class_section, Student.full_name, TrialResult.id)
+              .execution_options(yield_per=yield_per))
+    if scope_filter is not None:
+        stmt = stmt.where(scope_filter)
+    current_id, row = None, None
+    for r in db.execute(stmt):
+        if r.id != current_id:
+            if row is not None:
+                yield row
+            current_id = r.id
+            row = {
+                "student_id": str(r.student_id),
+                "full_name": r.full_name,
+                "grade": r.grade,
+                "class_section": r.class_section,
+                "correct_total": int(r.correct_total),
+                "wrong_total": int(r.wrong_total),
+                "blank_total": int(r.blank_total),
+                "net_total": float(r.net_total),
+                "entered_at": r.entered_at.isoformat() if r.entered_at else None,
+            }
+        if r.subject_code:
+            row.update({f"{r.subject_code}_correct": int(r.correct), f"{r.subject_code}_wrong": int(r.wrong),
+                        f"{r.subject_code}_blank": int(r.blank), f"{r.subject_code}_net": float(r.net)})
+    if row is not None:
+        yield row
+
+def csv_chunks(rows, fieldnames: list[str], chunk_rows: int = 500):
+    # Header goes out first so the client sees bytes before the query finishes.
+    buf = StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    yield buf.getvalue().encode("utf-8")
+    buf.seek(0); buf.truncate()
+    n = 0
+    for row in rows:
+        writer.writerow(row)
+        n += 1
+        if n % chunk_rows == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0); buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+def ndjson_chunks(rows, chunk_rows: int = 500):
+    lines, n = [], 0
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        n += 1
+        if n == 1 or len(lines) >= chunk_rows:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
@@ -1,29 +1,94 @@
-from fastapi import FastAPI, Request, Depends, HTTPException, status, UploadFile, Response
+from fastapi import FastAPI, Request, Depends, HTTPException, status, UploadFile, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
-from io import StringIO
+from sqlalchemy import or_, func, insert, literal
+from sqlalchemy.exc import IntegrityError
+from io import StringIO, TextIOWrapper
 import csv
 from uuid import UUID
 from datetime import datetime, timezone, date
+import time
 from typing import List
 
 from .config import settings
-from .db import Base, engine, SessionLocal
+from .db import Base, engine, async_engine, SessionLocal
 from .models import *
 from .schemas import *
-from .security import hash_password
-from .deps import get_db, require_csrf
-from .rbac import check_scope_teacher
-from .audit import audit
+from .security import hash_password, HashPoolBusy
+from .deps import get_db, require_csrf, get_principal, get_user as _get_user
+from .session_cache import invalidate_user
+from .sessions import session_janitor
+from .cache import CACHES
+from . import metrics, profiler
+from .search import fold_name, like_pattern
+from . import reads
+from .reads import student_count_cache
+from .subject_stats import apply_results
+from .resource_progress import progress_percent, outcome_total, lock_books, apply_toggles, outcome_catalogue
+from .exports import export_subjects, export_fields, iter_exam_rows, csv_chunks, ndjson_chunks
+from .analytics import analytics_cache, load_exam_frame, compute_exam_analytics, invalidate_exam_analytics
+from .rbac import check_scope_teacher, check_scope_students, get_scope, invalidate_scope
+from .audit import audit, audit_sink
+from .audit_partitions import is_partitioned, ensure_partitions, list_archives, iter_archived_rows
+from .audit_view import row_matches, audit_filters, audit_csv_row, iter_audit_rows, EXPORT_FIELDS
+from .trial_results import check_entry, insert_results, insert_new_results
+from .subjects_config import get_validator
+from .validation import validate_student_row
+from .workbook_assign import resolve_targets, insert_assignments
 
 from fastapi import FastAPI, Request, Depends, HTTPException, status, UploadFile, Response
 from .auth import router as auth_router
+from .async_reads import router as async_reads_router
 
 app = FastAPI(title="LGS Tracker API", version="0.1.0")
 
 app.include_router(auth_router)   
+if settings.DB_ASYNC:
+    # Registered before the sync routes below, so these paths resolve to the async handlers.
+    app.include_router(async_reads_router)
+
+METRIC_ENGINES = {"sync": engine}
+metrics.instrument_engine(engine)
+if async_engine is not None:
+    METRIC_ENGINES["async"] = async_engine.sync_engine
+    metrics.instrument_engine(async_engine.sync_engine)
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    # Latency is measured to the response start; streamed bodies are not included.
+    acc = metrics.RequestDb()
+    token = metrics.current_request_db.set(acc)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        metrics.current_request_db.reset(token)
+        route = request.scope.get("route")
+        metrics.observe_request(request.method, route.path if route else "unmatched", status_code,
+                                time.perf_counter() - started, acc)
+
+if settings.SQL_PROFILING:
+    for _engine in METRIC_ENGINES.values():
+        profiler.install(_engine)
+
+    @app.middleware("http")
+    async def sql_profile(request: Request, call_next):
+        started = time.perf_counter()
+        with profiler.profile_queries(settings.SQL_PROFILING_REPEAT_THRESHOLD) as prof:
+            response = await call_next(request)
+        response.headers["Server-Timing"] = profiler.report(request.method, request.url.path, prof,
+                                                            time.perf_counter() - started)
+        return response
+
+@app.exception_handler(HashPoolBusy)
+def hash_pool_busy(request: Request, exc: HashPoolBusy):
+    # Password hashing is saturated; shed load instead of queueing more Argon2 work.
+    return JSONResponse(status_code=status.HTTP_429_TOO_MANY_REQUESTS, content={"detail": "auth_busy"},
+                        headers={"Retry-After": "1"})
 
 SUBJECTS = [
     {"code": "TR",  "label": "Türkçe"},
@@ -45,12 +110,16 @@ def _ensure_subject_outcomes_seed(db: Session):
             items.append(SubjectOutcome(subject_code=s["code"], code=i, text=f"Kazanım {i}"))
     db.bulk_save_objects(items)
     db.commit()
+    outcome_catalogue.clear()
 
 @app.on_event("startup")
 def startup():
     Base.metadata.create_all(bind=engine)
     # --- ensure a rooter user exists ---
     with SessionLocal() as db:
+        if is_partitioned(db):
+            ensure_partitions(db)
+            db.commit()
         _ensure_subject_outcomes_seed(db)
         existing = db.query(Teacher).filter(Teacher.username == settings.ROOTER_USERNAME).first()
         if not existing:
@@ -63,29 +132,24 @@ def startup():
                 status="active",
             ))
             db.commit()
+    audit_sink.start()
+    audit_sink.replay_fallback()
+    session_janitor.start()
+
+@app.on_event("shutdown")
+def shutdown():
+    session_janitor.stop()
+    audit_sink.stop()
             
 @app.get("/healthz")
 def healthz():
     return {"status": "ok"}
 
-def _get_user(request: Request, db: Session) -> tuple[Teacher, Session]:
-    sid = request.cookies.get(settings.SESSION_COOKIE_NAME)
-    if not sid:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="no_session")
-    sess = db.query(Session).filter(Session.id == sid, Session.expires_at > datetime.now(timezone.utc)).first()
-    if not sess:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid_session")
-    user = db.query(Teacher).filter(Teacher.id == sess.user_id, Teacher.status == "active").first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="user_disabled")
-    return user, sess
-
 @app.get("/me", response_model=AuthMe)
 def me(request: Request, db: Session = Depends(get_db)):
-    user, sess = _get_user(request, db)
-    # Scopes
-    scopes = db.query(TeacherScope).filter(TeacherScope.teacher_id == user.id).all()
-    scope_items = [ {"grade": s.grade, "class_section": s.class_section} for s in scopes ]
+    principal = get_principal(request, db)
+    user = principal.user
+    scope_items = principal.scopes.items()
     role = "rooter" if user.username == "rooter" else "teacher"
     return {
         "id": str(user.id), "full_name": user.full_name, "role": role, "email": user.email,
@@ -94,38 +158,43 @@ def me(request: Request, db: Session = Depends(get_db)):
 
 @app.get("/students")
 def list_students(grade: int | None = None, q: str | None = None, page: int = 1, page_size: int = 20,
+                  cursor: str | None = None, total: str = "exact",
                   request: Request = None, db: Session = Depends(get_db)):
     user, sess = _get_user(request, db)
-    is_rooter = (user.username == "rooter")
-    query = db.query(Student)
-    if not is_rooter and not settings.TEACHER_GLOBAL_ACCESS:
-        # apply scope
-        scopes = db.query(TeacherScope).filter(TeacherScope.teacher_id == user.id).all()
-        if not scopes:
-            return {"items": [], "total": 0}
-        cond = []
-        for s in scopes:
-            if s.class_section is None:
-                cond.append((Student.grade == s.grade))
-            else:
-                cond.append((Student.grade == s.grade) & (Student.class_section == s.class_section))
-        from sqlalchemy import or_
-        query = query.filter(or_(*cond))
+    return reads.list_students(db, user, grade, q, page, page_size, cursor, total)
+
+@app.get("/students/search")
+def search_students(q: str, limit: int = 10, grade: int | None = None,
+                    request: Request = None, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    folded = fold_name(q)
+    if not folded:
+        return {"items": []}
+    limit = max(1, min(limit, 50))
+    query = db.query(Student.id, Student.full_name, Student.grade, Student.class_section, Student.status)
+    if user.username != "rooter" and not settings.TEACHER_GLOBAL_ACCESS:
+        scope = get_scope(db, user.id)
+        if not scope:
+            return {"items": []}
+        query = query.filter(scope.sql_filter())
     if grade:
         query = query.filter(Student.grade == grade)
-    if q:
-        like = f"%{q.lower()}%"
-        query = query.filter(func.lower(Student.full_name).like(like))
-    total = query.count()
-    items = query.order_by(Student.grade.desc(), Student.class_section.asc(), Student.full_name.asc()) \
-                 .offset((page-1)*page_size).limit(page_size).all()
-    def to_dict(s: Student):
-        return {
-            "id": str(s.id), "full_name": s.full_name, "grade": s.grade, "class_section": s.class_section,
-            "guardian_name": s.guardian_name, "guardian_phone": s.guardian_phone, "guardian_email": s.guardian_email,
-            "status": s.status, "created_at": s.created_at.isoformat(), "updated_at": s.updated_at.isoformat()
-        }
-    return {"items": [to_dict(s) for s in items], "total": total}
+    if len(folded) < 3:
+        # Too short for trigrams: word-prefix match, alphabetical.
+        prefix = like_pattern(folded)[1:]
+        query = query.filter(or_(Student.search_name.like(prefix, escape="\\"),
+                                 Student.search_name.like("% " + prefix, escape="\\")))
+        rank = literal(1.0)
+    else:
+        # Both predicates are served by idx_student_search_trgm; best matches first.
+        query = query.filter(or_(Student.search_name.like(like_pattern(folded), escape="\\"),
+                                 literal(folded).op("<%")(Student.search_name)))
+        rank = func.word_similarity(folded, Student.search_name)
+    rows = query.add_columns(rank.label("score")).order_by(rank.desc(), Student.full_name.asc()).limit(limit).all()
+    return {"items": [{
+        "id": str(r.id), "full_name": r.full_name, "grade": r.grade, "class_section": r.class_section,
+        "status": r.status, "score": round(float(r.score), 4)
+    } for r in rows]}
 
 @app.get("/students/{id}", response_model=StudentOut)
 def get_student(id: UUID, request: Request, db: Session = Depends(get_db)):
@@ -164,6 +233,7 @@ def update_student(id: UUID, body: StudentUpdate, request: Request, db: Session
 
     db.commit()
     db.refresh(st)
+    student_count_cache.clear()
 
     audit(
         db,
@@ -186,62 +256,55 @@ def update_student(id: UUID, body: StudentUpdate, request: Request, db: Session
 
     return st
 
+def _rejects_csv(rejects: list[dict], fieldnames: list[str]) -> StreamingResponse:
+    output = StringIO()
+    writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(rejects)
+    return StreamingResponse(iter([output.getvalue().encode("utf-8")]), media_type="text/csv")
+
 @app.post("/students/import")
-def import_students(csv_file: UploadFile, request: Request, db: Session = Depends(get_db)):
+def import_students(csv_file: UploadFile, request: Request, dry_run: bool = False, db: Session = Depends(get_db)):
     user, sess = _get_user(request, db)
     if user.username != "rooter":
         raise HTTPException(status_code=403, detail="forbidden")
-    content = csv_file.file.read().decode("utf-8")
-    reader = csv.DictReader(StringIO(content))
+    reader = csv.DictReader(TextIOWrapper(csv_file.file, encoding="utf-8-sig", newline=""))
+    now = datetime.now(timezone.utc)
     rejects = []
-    created = 0
+    batch = []
+    valid = 0
+    # One transaction for the whole file: batches are flushed as multi-row INSERTs.
     for row in reader:
         try:
-            full_name = row["full_name"].strip()
-            grade = int(row["grade"])
-            class_section = row["class_section"].strip()
-            if not (5 <= grade <= 8):
-                raise ValueError("grade_out_of_range")
-            s = Student(full_name=full_name, grade=grade, class_section=class_section,
-                        guardian_name=row.get("guardian_name") or None,
-                        guardian_phone=row.get("guardian_phone") or None,
-                        guardian_email=row.get("guardian_email") or None,
-                        status=row.get("status") or "active")
-            db.add(s); db.commit()
-            audit(db, actor_id=user.id, actor_role="rooter", action="import", entity_type="student", entity_id=s.id,
-                  after={"full_name": full_name, "grade": grade, "class_section": class_section})
-            created += 1
-        except Exception as e:
+            batch.append({**validate_student_row(row), "created_at": now, "updated_at": now})
+        except ValueError as e:
             row["reject_reason"] = str(e)
             rejects.append(row)
-    output = StringIO()
+            continue
+        valid += 1
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            if not dry_run:
+                db.execute(insert(Student), batch)
+            batch = []
+    if batch and not dry_run:
+        db.execute(insert(Student), batch)
+    created = 0 if dry_run else valid
+    if not dry_run:
+        db.commit()
+        student_count_cache.clear()
+        audit(db, actor_id=user.id, actor_role="rooter", action="import", entity_type="student",
+              after={"created": created, "rejects": len(rejects), "filename": csv_file.filename})
     if rejects:
-        fieldnames = list(rejects[0].keys())
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rejects)
-        resp = StreamingResponse(iter([output.getvalue().encode("utf-8")]), media_type="text/csv")
+        resp = _rejects_csv(rejects, list(reader.fieldnames or []) + ["reject_reason"])
+        resp.headers["X-Import-Created"] = str(created)
+        resp.headers["X-Import-Valid"] = str(valid)
         return resp
-    return {"created": created, "rejects": 0}
+    return {"created": created, "valid": valid, "rejects": 0, "dry_run": dry_run}
 
 @app.get("/trials")
 def list_trials(grade: int | None = None, request: Request = None, db: Session = Depends(get_db)):
     user, sess = _get_user(request, db)
-    q = db.query(TrialExam)
-    # FIX: proper Postgres ARRAY filtering
-    if grade is not None:
-        # matches rows where 'grade' is contained in the grade_scope array
-        q = q.filter(TrialExam.grade_scope.contains([grade]))
-    items = q.order_by(TrialExam.date.desc()).all()
-    return [{
-        "id": str(t.id),
-        "name": t.name,
-        "source": t.source,
-        "date": t.date.isoformat(),
-        "grade_scope": t.grade_scope,
-        "subjects_config_id": str(t.subjects_config_id),
-        "is_finalized": t.is_finalized
-    } for t in items]
+    return reads.list_trials(db, grade)
 
 @app.post("/trials")
 def create_trial(payload: TrialExamCreate, request: Request, db: Session = Depends(get_db), csrf: None = Depends(require_csrf)):
@@ -269,6 +332,52 @@ def finalize_trial(id: UUID, request: Request, db: Session = Depends(get_db), cs
           after={"is_finalized": True})
     return {"ok": True}
 
+@app.get("/trials/{id}/analytics")
+def trial_analytics(id: UUID, bins: int = 10, request: Request = None, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    exam = db.query(TrialExam).filter(TrialExam.id == str(id)).first()
+    if not exam:
+        raise HTTPException(404, "not_found")
+    bins = max(1, min(bins, 100))
+    key = (str(exam.id), bins)
+    data = analytics_cache.get(key)
+    if data is None:
+        data = compute_exam_analytics(load_exam_frame(db, exam.id), bins)
+        analytics_cache.set(key, data)
+    if user.username != "rooter" and not settings.TEACHER_GLOBAL_ACCESS:
+        # Aggregates stay school-wide; per-student rows are limited to the teacher's scope.
+        scope = get_scope(db, user.id)
+        data = {**data, "students": [s for s in data["students"] if scope.allows(s["grade"], s["class_section"])]}
+    return data
+
+@app.get("/trials/{id}/export")
+def export_trial(id: UUID, format: str = "csv", request: Request = None, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(400, "invalid_format")
+    exam = db.query(TrialExam).filter(TrialExam.id == str(id)).first()
+    if not exam:
+        raise HTTPException(404, "not_found")
+    conf = _get_subjects_config(db, exam.subjects_config_id)
+    fields = export_fields(export_subjects(conf.per_grade if conf else {}, exam.grade_scope))
+    scope_filter = None
+    if user.username != "rooter" and not settings.TEACHER_GLOBAL_ACCESS:
+        scope_filter = get_scope(db, user.id).sql_filter()
+    exam_id = exam.id
+
+    def rows():
+        # The request session is closed once the handler returns; stream from our own.
+        with SessionLocal() as stream_db:
+            yield from iter_exam_rows(stream_db, exam_id, scope_filter)
+
+    filename = f"trial-{exam_id}.{format}"
+    if format == "csv":
+        body, media_type = csv_chunks(rows(), fields), "text/csv"
+    else:
+        body, media_type = ndjson_chunks(rows()), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
 def _get_subjects_config(db: Session, conf_id: str):
     return db.query(SubjectsConfig).filter(SubjectsConfig.id == conf_id).first()
 
@@ -285,196 +394,281 @@ def create_trial_result(payload: TrialResultCreate, request: Request, db: Sessio
         raise HTTPException(404, "exam_not_found")
     if exam.is_finalized and user.username != "rooter":
         raise HTTPException(403, "finalized")
-    # validation against subjects_config
-    conf = _get_subjects_config(db, str(exam.subjects_config_id))
-    if not conf:
-        raise HTTPException(422, "subjects_config_missing")
-    per_grade = conf.per_grade.get(str(st.grade))
-    if not per_grade:
-        raise HTTPException(422, "subjects_config_grade_missing")
-    penalty = float(conf.penalty_factor)
-
-    correct_total = wrong_total = blank_total = 0
-    net_total = 0.0
-    subjects_out = []
-    for item in payload.subjects:
-        scode = item.subject_code
-        maxq = int(per_grade.get(scode, {}).get("max", 0))
-        if maxq <= 0:
-            raise HTTPException(422, f"subject_not_allowed:{scode}")
-        if (item.correct + item.wrong + item.blank) != maxq:
-            raise HTTPException(422, f"invalid_total:{scode}:{maxq}")
-        net = float(item.correct - (item.wrong * penalty))
-        correct_total += item.correct
-        wrong_total += item.wrong
-        blank_total += item.blank
-        net_total += net
-        subjects_out.append({"subject_code": scode, "correct": item.correct, "wrong": item.wrong, "blank": item.blank, "net": round(net,3)})
-
-    tr = TrialResult(student_id=str(st.id), trial_exam_id=str(exam.id), correct_total=correct_total,
-                     wrong_total=wrong_total, blank_total=blank_total, net_total=round(net_total,3),
-                     entered_by=user.id)
-    db.add(tr); db.commit()
-    for so in subjects_out:
-        trs = TrialResultSubject(trial_result_id=tr.id, subject_code=so["subject_code"], correct=so["correct"],
-                                 wrong=so["wrong"], blank=so["blank"], net=so["net"])
-        db.add(trs)
+    # validation against the compiled subjects_config (cached per config and grade)
+    try:
+        scored = get_validator(db, exam.subjects_config_id, st.grade).score(
+            [(i.subject_code, i.correct, i.wrong, i.blank) for i in payload.subjects])
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    try:
+        (result_id,) = insert_results(db, [{"student_id": st.id, "trial_exam_id": exam.id, **scored}], user.id)
+    except IntegrityError:
+        # UNIQUE(student_id, trial_exam_id): an earlier or concurrent entry won.
+        db.rollback()
+        raise HTTPException(409, "result_exists")
+    apply_results(db, [(st.id, so["subject_code"], so["net"], result_id) for so in scored["subjects"]])
     db.commit()
+    invalidate_exam_analytics(exam.id)
     audit(db, actor_id=user.id, actor_role=("rooter" if user.username=="rooter" else "teacher"),
-          action="create", entity_type="trial_result", entity_id=tr.id,
-          after={"student_id": str(st.id), "trial_exam_id": str(exam.id), "net_total": float(tr.net_total)})
-    return {"id": str(tr.id), "student_id": str(st.id), "trial_exam_id": str(exam.id),
-            "correct_total": tr.correct_total, "wrong_total": tr.wrong_total, "blank_total": tr.blank_total,
-            "net_total": float(tr.net_total), "subjects": subjects_out}
+          action="create", entity_type="trial_result", entity_id=result_id,
+          after={"student_id": str(st.id), "trial_exam_id": str(exam.id), "net_total": scored["net_total"]})
+    return {"id": str(result_id), "student_id": str(st.id), "trial_exam_id": str(exam.id),
+            "correct_total": scored["correct_total"], "wrong_total": scored["wrong_total"],
+            "blank_total": scored["blank_total"], "net_total": scored["net_total"], "subjects": scored["subjects"]}
 
 
-@app.get("/students/{id}/trial-results", response_model=List[TrialResultOut])
-def list_trial_results_for_student(id: UUID, request: Request, db: Session = Depends(get_db)):
+@app.post("/trials/{id}/results/batch")
+def create_trial_results_batch(id: UUID, payload: TrialResultBatchIn, request: Request, db: Session = Depends(get_db), csrf: None = Depends(require_csrf)):
     user, sess = _get_user(request, db)
-    st = db.query(Student).filter(Student.id == str(id)).first()
-    if not st:
-        raise HTTPException(status_code=404, detail="student_not_found")
-    if user.username != "rooter":
-        check_scope_teacher(db, user.id, st)
+    is_rooter = (user.username == "rooter")
+    exam = db.query(TrialExam).filter(TrialExam.id == str(id)).first()
+    if not exam:
+        raise HTTPException(404, "exam_not_found")
+    if exam.is_finalized and not is_rooter:
+        raise HTTPException(403, "finalized")
+    # Compiled once per (config, grade) and shared by every row of the grid.
+    validator_for = lambda grade: get_validator(db, exam.subjects_config_id, grade)
+    student_ids = {item.student_id for item in payload.items}
+    students = {s.id: s for s in db.query(Student.id, Student.grade, Student.class_section)
+                                   .filter(Student.id.in_(student_ids)).all()} if student_ids else {}
+    existing = set(db.query(TrialResult.student_id, TrialResult.trial_exam_id)
+                     .filter(TrialResult.trial_exam_id == exam.id, TrialResult.student_id.in_(students.keys()))
+                     .all()) if students else set()
+    scope = None if is_rooter or settings.TEACHER_GLOBAL_ACCESS else get_scope(db, user.id)
+
+    valid, errors, seen = [], [], set()
+    for item in payload.items:
+        try:
+            if item.student_id in seen:
+                raise ValueError("duplicate_student")
+            seen.add(item.student_id)
+            valid.append(check_entry(students.get(item.student_id), exam,
+                                     [(s.subject_code, s.correct, s.wrong, s.blank) for s in item.subjects],
+                                     validator_for=validator_for, is_rooter=is_rooter, scope=scope,
+                                     existing=existing))
+        except ValueError as e:
+            errors.append({"student_id": str(item.student_id), "error": str(e)})
+
+    ids, valid, taken = insert_new_results(db, valid, user.id, settings.IMPORT_BATCH_SIZE)
+    errors += [{"student_id": str(r["student_id"]), "error": "already_exists"} for r in taken]
+    db.commit()
+    if valid:
+        invalidate_exam_analytics(exam.id)
+    audit(db, actor_id=user.id, actor_role=("rooter" if is_rooter else "teacher"),
+          action="batch_create", entity_type="trial_result",
+          after={"trial_exam_id": str(exam.id), "created": len(valid), "errors": len(errors)})
+    return {
+        "trial_exam_id": str(exam.id),
+        "created": len(valid),
+        "results": [{"id": str(rid), "student_id": str(r["student_id"]), "net_total": r["net_total"]}
+                    for rid, r in zip(ids, valid)],
+        "errors": errors,
+    }
 
-    results = (
-        db.query(TrialResult)
-        .filter(TrialResult.student_id == str(st.id))
-        .order_by(TrialResult.entered_at.desc())
-        .all()
-    )
+@app.post("/trial-results/import")
+def import_trial_results(csv_file: UploadFile, request: Request, db: Session = Depends(get_db), csrf: None = Depends(require_csrf)):
+    user, sess = _get_user(request, db)
+    is_rooter = (user.username == "rooter")
+    # Long format (one row per student/exam/subject); pivot to one result per (student, exam).
+    reader = csv.DictReader(TextIOWrapper(csv_file.file, encoding="utf-8-sig", newline=""))
+    groups: dict[tuple, list[dict]] = {}
+    rejects = []
+    for row in reader:
+        try:
+            key = (UUID(row["student_id"].strip()), UUID(row["trial_exam_id"].strip()))
+        except (KeyError, ValueError, AttributeError):
+            row["reject_reason"] = "invalid_id"
+            rejects.append(row)
+            continue
+        groups.setdefault(key, []).append(row)
+    fieldnames = list(reader.fieldnames or []) + ["reject_reason"]
+
+    student_ids = {k[0] for k in groups}
+    exam_ids = {k[1] for k in groups}
+    students = {s.id: s for s in db.query(Student.id, Student.grade, Student.class_section)
+                                   .filter(Student.id.in_(student_ids)).all()} if student_ids else {}
+    exams = {e.id: e for e in db.query(TrialExam).filter(TrialExam.id.in_(exam_ids)).all()} if exam_ids else {}
+    existing = set()
+    if exams and students:
+        existing = set(db.query(TrialResult.student_id, TrialResult.trial_exam_id)
+                         .filter(TrialResult.trial_exam_id.in_(exams.keys()),
+                                 TrialResult.student_id.in_(students.keys())).all())
+    scope = None if is_rooter or settings.TEACHER_GLOBAL_ACCESS else get_scope(db, user.id)
+
+    valid = []
+    for (student_id, exam_id), rows in groups.items():
+        exam = exams.get(exam_id)
+        try:
+            # Generator: cells are only parsed once the row passes the lookup checks.
+            subjects = ((r["subject_code"].strip(), int(r["correct"]), int(r["wrong"]), int(r["blank"]))
+                        for r in rows)
+            valid.append(check_entry(students.get(student_id), exam, subjects,
+                                     validator_for=lambda grade: get_validator(db, exam.subjects_config_id, grade),
+                                     is_rooter=is_rooter, scope=scope, existing=existing))
+        except (KeyError, ValueError, AttributeError, TypeError) as e:
+            for r in rows:
+                r["reject_reason"] = str(e)
+                rejects.append(r)
+
+    ids, valid, taken = insert_new_results(db, valid, user.id, settings.IMPORT_BATCH_SIZE)
+    for t in taken:
+        for r in groups[(t["student_id"], t["trial_exam_id"])]:
+            r["reject_reason"] = "already_exists"
+            rejects.append(r)
+    db.commit()
+    for exam_id in {r["trial_exam_id"] for r in valid}:
+        invalidate_exam_analytics(exam_id)
+    audit(db, actor_id=user.id, actor_role=("rooter" if is_rooter else "teacher"),
+          action="import", entity_type="trial_result",
+          after={"created": len(valid), "rejects": len(rejects), "trial_exam_ids": sorted(str(e) for e in exam_ids)})
+    if rejects:
+        resp = _rejects_csv(rejects, fieldnames)
+        resp.headers["X-Import-Created"] = str(len(valid))
+        return resp
+    return {"created": len(valid), "rejects": 0}
 
-    out = []
-    for r in results:
-        subjects = (
-            db.query(TrialResultSubject)
-            .filter(TrialResultSubject.trial_result_id == str(r.id))
-            .order_by(TrialResultSubject.subject_code.asc())
-            .all()
-        )
-        out.append({
-            "id": r.id,
-            "student_id": r.student_id,
-            "trial_exam_id": r.trial_exam_id,
-            "correct_total": r.correct_total,
-            "wrong_total": r.wrong_total,
-            "blank_total": r.blank_total,
-            "net_total": float(r.net_total),
-            "subjects": [
-                {
-                    "subject_code": s.subject_code,
-                    "correct": s.correct,
-                    "wrong": s.wrong,
-                    "blank": s.blank,
-                    "net": float(s.net),
-                }
-                for s in subjects
-            ],
-        })
-    return out
+@app.get("/students/{id}/trial-results", response_model=List[TrialResultOut])
+def list_trial_results_for_student(id: UUID, request: Request, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    return reads.student_trials(db, user, id, newest_first=True, not_found="student_not_found")
 
 # Backwards-compat alias for older frontends/components:
 @app.get("/students/{id}/trials", response_model=List[TrialResultOut])
 def list_trial_results_for_student_alias(id: UUID, request: Request, db: Session = Depends(get_db)):
     return list_trial_results_for_student(id, request, db)
 
+@app.get("/reports/below-target")
+def students_below_target(subject_code: str, threshold: float, grade: int | None = None, min_samples: int = 1,
+                          limit: int = 200, request: Request = None, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    # Served from student_subject_stats (idx_subject_stats_avg), not from the raw results.
+    query = (db.query(StudentSubjectStats, Student.full_name, Student.grade, Student.class_section)
+               .join(Student, Student.id == StudentSubjectStats.student_id)
+               .filter(StudentSubjectStats.subject_code == subject_code,
+                       StudentSubjectStats.recent_avg < threshold,
+                       StudentSubjectStats.sample_count >= min_samples))
+    if user.username != "rooter" and not settings.TEACHER_GLOBAL_ACCESS:
+        scope = get_scope(db, user.id)
+        if not scope:
+            return {"items": [], "window": settings.ROLLING_STATS_WINDOW}
+        query = query.filter(scope.sql_filter())
+    if grade:
+        query = query.filter(Student.grade == grade)
+    rows = query.order_by(StudentSubjectStats.recent_avg.asc()).limit(max(1, min(limit, 1000))).all()
+    return {"window": settings.ROLLING_STATS_WINDOW, "items": [{
+        "student_id": str(st.student_id), "full_name": full_name, "grade": g, "class_section": cs,
+        "subject_code": st.subject_code, "recent_avg": float(st.recent_avg), "recent_nets": st.recent_nets,
+        "best": float(st.best), "worst": float(st.worst), "trend": float(st.trend), "sample_count": st.sample_count,
+    } for st, full_name, g, cs in rows]}
+
 @app.get("/workbooks")
 def list_workbooks(grade: int | None = None, request: Request = None, db: Session = Depends(get_db)):
     user, sess = _get_user(request, db)
-    q = db.query(Workbook)
-    if grade:
-        q = q.filter(Workbook.grade == grade)
-    items = q.order_by(Workbook.grade.desc(), Workbook.title.asc()).all()
-    return [{"id": str(w.id), "title": w.title, "subject_code": w.subject_code, "grade": w.grade,
-             "publisher": w.publisher, "total_units": w.total_units, "total_pages": w.total_pages} for w in items]
+    return reads.list_workbooks(db, grade)
 
 @app.post("/students/{id}/workbooks", response_model=StudentWorkbookOut)
 def assign_workbook(id: UUID, payload: StudentWorkbookCreate, request: Request, db: Session = Depends(get_db), csrf: None = Depends(require_csrf)):
     user, sess = _get_user(request, db)
-    st = db.query(Student).filter(Student.id == str(id)).first()
+    st = db.query(Student).filter(Student.id == id).first()
     if not st:
         raise HTTPException(404, "student_not_found")
     if user.username != "rooter":
         check_scope_teacher(db, user.id, st)
-    wb = db.query(Workbook).filter(Workbook.id == str(payload.workbook_id)).first()
+    # Same workbook lock as the bulk path, so the existence check holds against
+    # concurrent single and bulk assignments.
+    wb = db.query(Workbook).filter(Workbook.id == payload.workbook_id).with_for_update().first()
     if not wb:
         raise HTTPException(404, "workbook_not_found")
-    sw = StudentWorkbook(student_id=str(st.id), workbook_id=str(wb.id), assigned_by=user.id, target_date=payload.target_date)
+    if db.query(StudentWorkbook.id).filter(StudentWorkbook.student_id == st.id,
+                                           StudentWorkbook.workbook_id == wb.id).first():
+        db.rollback()
+        raise HTTPException(409, "already_assigned")
+    sw = StudentWorkbook(student_id=st.id, workbook_id=wb.id, assigned_by=user.id, target_date=payload.target_date)
     db.add(sw); db.commit()
     audit(db, actor_id=user.id, actor_role=("rooter" if user.username=="rooter" else "teacher"),
           action="create", entity_type="student_workbook", entity_id=sw.id,
           after={"student_id": str(st.id), "workbook_id": str(wb.id)})
     return sw
 
+@app.post("/workbooks/{workbook_id}/assignments")
+def assign_workbook_bulk(workbook_id: UUID, payload: WorkbookBulkAssign, request: Request, db: Session = Depends(get_db), csrf: None = Depends(require_csrf)):
+    user, sess = _get_user(request, db)
+    if (payload.student_ids is None) == (payload.grade is None):
+        raise HTTPException(422, "target_required:grade_or_student_ids")
+    # Locking the workbook serializes concurrent bulk assignments, so the existence check holds.
+    wb = db.query(Workbook).filter(Workbook.id == str(workbook_id)).with_for_update().first()
+    if not wb:
+        raise HTTPException(404, "workbook_not_found")
+    is_rooter = user.username == "rooter"
+    scope = None if is_rooter or settings.TEACHER_GLOBAL_ACCESS else get_scope(db, user.id)
+    targets, summary = resolve_targets(db, wb.id, grade=payload.grade, class_section=payload.class_section,
+                                       student_ids=payload.student_ids, scope=scope)
+    assigned = insert_assignments(db, wb.id, targets, user.id, payload.target_date, settings.IMPORT_BATCH_SIZE)
+    db.commit()
+    summary = {"workbook_id": str(wb.id), "assigned": assigned, **summary}
+    audit(db, actor_id=user.id, actor_role=("rooter" if is_rooter else "teacher"),
+          action="bulk_assign", entity_type="workbook", entity_id=wb.id,
+          after={**summary, "grade": payload.grade, "class_section": payload.class_section})
+    return summary
+
 @app.get("/students/{id}/trials")
 def student_trial_history(id: UUID, request: Request, db: Session = Depends(get_db)):
     user, sess = _get_user(request, db)
-    st = db.query(Student).filter(Student.id == str(id)).first()
-    if not st:
-        raise HTTPException(404, "not_found")
-    if user.username != "rooter":
-        check_scope_teacher(db, user.id, st)
-
-    results = (
-        db.query(TrialResult)
-          .filter(TrialResult.student_id == str(id))
-          .order_by(TrialResult.entered_at.asc())
-          .all()
-    )
-
-    out = []
-    for r in results:
-        subs = (
-            db.query(TrialResultSubject)
-              .filter(TrialResultSubject.trial_result_id == str(r.id))
-              .order_by(TrialResultSubject.subject_code.asc())
-              .all()
-        )
-        out.append({
-            "id": str(r.id),
-            "student_id": str(r.student_id),
-            "trial_exam_id": str(r.trial_exam_id),
-            "correct_total": int(r.correct_total),
-            "wrong_total": int(r.wrong_total),
-            "blank_total": int(r.blank_total),
-            "net_total": float(r.net_total),
-            "entered_at": r.entered_at.isoformat() if r.entered_at else None,
-            "subjects": [
-                {
-                    "subject_code": s.subject_code,
-                    "correct": int(s.correct),
-                    "wrong": int(s.wrong),
-                    "blank": int(s.blank),
-                    "net": float(s.net),
-                } for s in subs
-            ],
-        })
-    return out
+    return reads.student_trials(db, user, id)
 
 @app.get("/audit")
 def audit_view(actor_id: UUID | None = None, action: str | None = None, entity_type: str | None = None,
-               from_: datetime | None = None, to: datetime | None = None, request: Request = None, db: Session = Depends(get_db)):
+               entity_id: UUID | None = None, from_: datetime | None = Query(None, alias="from"),
+               to: datetime | None = None, cursor: str | None = None, limit: int = 200,
+               request: Request = None, db: Session = Depends(get_db)):
     user, sess = _get_user(request, db)
     if user.username != "rooter":
         raise HTTPException(403, "forbidden")
-    q = db.query(AuditLog)
-    if actor_id:
-        q = q.filter(AuditLog.actor_id == str(actor_id))
-    if action:
-        q = q.filter(AuditLog.action == action)
-    if entity_type:
-        q = q.filter(AuditLog.entity_type == entity_type)
-    if from_:
-        q = q.filter(AuditLog.ts >= from_)
-    if to:
-        q = q.filter(AuditLog.ts <= to)
-    rows = q.order_by(AuditLog.ts.desc()).limit(200).all()
-    return {"items": [{
-        "id": str(a.id), "actor_id": str(a.actor_id), "actor_role": a.actor_role, "action": a.action,
-        "entity_type": a.entity_type, "entity_id": (str(a.entity_id) if a.entity_id else None),
-        "ts": a.ts.isoformat(), "before": a.before, "after": a.after, "ip": a.ip, "user_agent": a.user_agent
-    } for a in rows]}
+    return reads.audit_page(db, audit_filters(actor_id, action, entity_type, entity_id, from_, to), cursor, limit)
 
+@app.get("/audit/export")
+def audit_export(actor_id: UUID | None = None, action: str | None = None, entity_type: str | None = None,
+                 entity_id: UUID | None = None, from_: datetime | None = Query(None, alias="from"),
+                 to: datetime | None = None, format: str = "ndjson", archived: bool = False,
+                 request: Request = None, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    if user.username != "rooter":
+        raise HTTPException(403, "forbidden")
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(400, "invalid_format")
+    filters = audit_filters(actor_id, action, entity_type, entity_id, from_, to)
+
+    def rows():
+        if archived:
+            # Months already moved out of the database by the retention job.
+            for row in iter_archived_rows(from_, to):
+                if row_matches(row, actor_id, action, entity_type, entity_id):
+                    yield row
+            return
+        # The request session is closed once the handler returns; stream from our own.
+        with SessionLocal() as stream_db:
+            yield from iter_audit_rows(stream_db, filters)
+
+    if format == "csv":
+        body, media_type = csv_chunks(map(audit_csv_row, rows()), EXPORT_FIELDS), "text/csv"
+    else:
+        body, media_type = ndjson_chunks(rows()), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="audit.{format}"'})
+
+@app.get("/audit/archives")
+def audit_archives(request: Request, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    if user.username != "rooter":
+        raise HTTPException(403, "forbidden")
+    return {"items": list_archives()}
+
+@app.get("/audit/stats")
+def audit_stats(request: Request, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    if user.username != "rooter":
+        raise HTTPException(403, "forbidden")
+    return audit_sink.stats()
 
 
 # ==== Rooter management endpoints ====
@@ -522,10 +716,91 @@ def get_teacher(teacher_id: UUID, request: Request, db: Session = Depends(get_db
     t = db.query(Teacher).filter(Teacher.id == teacher_id).first()
     if not t:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not_found")
-    scopes = db.query(TeacherScope).filter(TeacherScope.teacher_id == t.id).all()
-    scope_items = [{"grade": s.grade, "class_section": s.class_section} for s in scopes]
+    scope_items = get_scope(db, t.id).items()
     return {"id": str(t.id), "full_name": t.full_name, "email": t.email, "username": t.username, "must_change_password": t.must_change_password, "scope": scope_items}
 
+@app.put("/teachers/{teacher_id}/scope", dependencies=[Depends(require_csrf)])
+def set_teacher_scope(teacher_id: UUID, body: TeacherScopeUpdate, request: Request, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    if user.username != "rooter":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="forbidden")
+    t = db.query(Teacher).filter(Teacher.id == teacher_id).first()
+    if not t:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not_found")
+    before = get_scope(db, t.id).items()
+    db.query(TeacherScope).filter(TeacherScope.teacher_id == t.id).delete(synchronize_session=False)
+    rows = [{"teacher_id": t.id, "grade": g, "class_section": cs}
+            for g, cs in {(i.grade, i.class_section) for i in body.items}]
+    if rows:
+        db.execute(insert(TeacherScope), rows)
+    db.commit()
+    invalidate_scope(t.id)
+    invalidate_user(t.id)
+    after = get_scope(db, t.id).items()
+    audit(db, actor_id=user.id, actor_role="rooter", action="update", entity_type="teacher", entity_id=t.id,
+          before={"scope": before}, after={"scope": after})
+    return {"id": str(t.id), "scope": after}
+
+def _revoke_teacher_sessions(db: Session, teacher_id):
+    db.query(Session).filter(Session.user_id == teacher_id).delete(synchronize_session=False)
+    db.commit()
+    invalidate_user(teacher_id)
+
+@app.post("/teachers/{teacher_id}/reset-temp-password", dependencies=[Depends(require_csrf)])
+def reset_teacher_password(teacher_id: UUID, body: TeacherPasswordReset, request: Request, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    if user.username != "rooter":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="forbidden")
+    t = db.query(Teacher).filter(Teacher.id == teacher_id).first()
+    if not t:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not_found")
+    t.password_hash = hash_password(body.temp_password)
+    t.must_change_password = True
+    t.updated_at = datetime.now(timezone.utc)
+    db.commit()
+    _revoke_teacher_sessions(db, t.id)
+    audit(db, actor_id=user.id, actor_role="rooter", action="reset_password", entity_type="teacher", entity_id=t.id,
+          after={"must_change_password": True})
+    return {"ok": True}
+
+@app.put("/teachers/{teacher_id}/status", dependencies=[Depends(require_csrf)])
+def set_teacher_status(teacher_id: UUID, body: TeacherStatusUpdate, request: Request, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    if user.username != "rooter":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="forbidden")
+    t = db.query(Teacher).filter(Teacher.id == teacher_id).first()
+    if not t:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not_found")
+    if t.id == user.id and body.status != "active":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="cannot_disable_self")
+    before = {"status": t.status}
+    t.status = body.status
+    t.updated_at = datetime.now(timezone.utc)
+    db.commit()
+    if body.status == "disabled":
+        _revoke_teacher_sessions(db, t.id)
+    audit(db, actor_id=user.id, actor_role="rooter", action="update", entity_type="teacher", entity_id=t.id,
+          before=before, after={"status": body.status})
+    return {"ok": True, "status": body.status}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint(request: Request):
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(404, "not_found")
+    if not settings.METRICS_TOKEN and settings.APP_ENV != "development":
+        # Route templates, status mix and pool state are not for anonymous callers.
+        raise HTTPException(404, "metrics_token_required")
+    if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid_token")
+    return PlainTextResponse(metrics.render(METRIC_ENGINES), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def cache_stats(request: Request, db: Session = Depends(get_db)):
+    user, sess = _get_user(request, db)
+    if user.username != "rooter":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="forbidden")
+    return {name: c.stats() for name, c in CACHES.items()}
+
 @app.post("/students", dependencies=[Depends(require_csrf)])
 def create_student(body: StudentCreate, request: Request, db: Session = Depends(get_db)):
     user, sess = _get_user(request, db)
@@ -542,6 +817,7 @@ def create_student(body: StudentCreate, request: Request, db: Session = Depends(
         status=body.status
     )
     db.add(st); db.commit(); db.refresh(st)
+    student_count_cache.clear()
     audit(db, actor_id=user.id, actor_role="rooter", action="create", entity_type="student", entity_id=st.id,
           after={"full_name": st.full_name, "grade": st.grade, "class_section": st.class_section})
     return {
@@ -555,24 +831,12 @@ def create_student(body: StudentCreate, request: Request, db: Session = Depends(
 @app.get("/students/{id}/resource-books", response_model=List[ResourceBookOut])
 def list_resource_books_for_student(id: UUID, request: Request, db: Session = Depends(get_db)):
     user, sess = _get_user(request, db)
-    st = db.query(Student).filter(Student.id == str(id)).first()
-    if not st:
-        raise HTTPException(status_code=404, detail="student_not_found")
+    # Progress comes from the maintained counters, so this is a single query.
     books = db.query(ResourceBook).filter(ResourceBook.student_id == str(id)).order_by(ResourceBook.created_at.asc()).all()
-    out = []
-    for b in books:
-        total = db.query(func.count(SubjectOutcome.id)).filter(SubjectOutcome.subject_code == b.subject_code).scalar() or 0
-        checked = (
-            db.query(func.count(ResourceOutcomeCheck.id))
-              .join(SubjectOutcome, ResourceOutcomeCheck.outcome_id == SubjectOutcome.id)
-              .filter(ResourceOutcomeCheck.resource_book_id == b.id)
-              .filter(ResourceOutcomeCheck.checked == True)
-              .filter(SubjectOutcome.subject_code == b.subject_code)
-              .scalar()
-        ) or 0
-        progress = int(round((checked / total) * 100)) if total > 0 else 0
-        out.append({"id": str(b.id), "name": b.name, "subject_code": b.subject_code, "progress_percent": progress})
-    return out
+    if not books and not db.query(Student.id).filter(Student.id == str(id)).first():
+        raise HTTPException(status_code=404, detail="student_not_found")
+    return [{"id": str(b.id), "name": b.name, "subject_code": b.subject_code, "progress_percent": progress_percent(b)}
+            for b in books]
 
 @app.post("/students/{id}/resource-books", response_model=ResourceBookOut)
 def create_resource_book_for_student(id: UUID, body: ResourceBookCreate, request: Request, db: Session = Depends(get_db)):
@@ -582,13 +846,11 @@ def create_resource_book_for_student(id: UUID, body: ResourceBookCreate, request
         raise HTTPException(status_code=404, detail="student_not_found")
     if body.subject_code not in [s["code"] for s in SUBJECTS]:
         raise HTTPException(status_code=400, detail="invalid_subject")
-    rb = ResourceBook(student_id=str(id), name=body.name.strip(), subject_code=body.subject_code)
+    rb = ResourceBook(student_id=str(id), name=body.name.strip(), subject_code=body.subject_code,
+                      checked_count=0, outcome_total=outcome_total(db, body.subject_code))
     db.add(rb); db.commit(); db.refresh(rb)
-    try:
-        audit(db, actor_id=user.id, actor_role="teacher", action="create", entity_type="resource_book", entity_id=rb.id,
-              after={"student_id": str(id), "name": rb.name, "subject_code": rb.subject_code})
-    except Exception:
-        pass
+    audit(db, actor_id=user.id, actor_role="teacher", action="create", entity_type="resource_book", entity_id=rb.id,
+          after={"student_id": str(id), "name": rb.name, "subject_code": rb.subject_code})
     return {"id": str(rb.id), "name": rb.name, "subject_code": rb.subject_code, "progress_percent": 0}
 
 @app.get("/resource-books/{book_id}/outcomes", response_model=List[OutcomeWithCheck])
@@ -612,48 +874,47 @@ def get_outcomes_for_resource_book(book_id: UUID, request: Request, db: Session
     return out
 
 @app.post("/resource-books/{book_id}/outcomes/toggle")
-def toggle_outcomes_for_resource_book(book_id: UUID, body: ToggleOutcomeBulkIn, request: Request, db: Session = Depends(get_db)):
+def toggle_outcomes_for_resource_book(book_id: UUID, body: ToggleOutcomeBulkIn, request: Request, db: Session = Depends(get_db), csrf: None = Depends(require_csrf)):
     user, sess = _get_user(request, db)
-    rb = db.query(ResourceBook).filter(ResourceBook.id == str(book_id)).first()
-    if not rb:
+    books = lock_books(db, [book_id])
+    if not books:
         raise HTTPException(status_code=404, detail="resource_book_not_found")
-    # validate outcome ids belong to rb.subject_code
-    valid_ids = set(x.id for x in db.query(SubjectOutcome.id).filter(SubjectOutcome.subject_code == rb.subject_code).all())
-    for item in body.items:
-        if item.outcome_id not in valid_ids:
-            continue
-        rec = db.query(ResourceOutcomeCheck).filter(
-            ResourceOutcomeCheck.resource_book_id == rb.id,
-            ResourceOutcomeCheck.outcome_id == item.outcome_id
-        ).first()
-        if not rec:
-            rec = ResourceOutcomeCheck(resource_book_id=rb.id, outcome_id=item.outcome_id, checked=item.checked)
-            db.add(rec)
-        else:
-            rec.checked = item.checked
+    rb = books[0]
+    if user.username != "rooter":
+        check_scope_students(db, user.id, [rb.student_id])
+    apply_toggles(db, [(rb, item.outcome_id, item.checked) for item in body.items])
+    progress = progress_percent(rb)
     db.commit()
-    # return fresh progress
-    total = db.query(func.count(SubjectOutcome.id)).filter(SubjectOutcome.subject_code == rb.subject_code).scalar() or 0
-    checked = (
-        db.query(func.count(ResourceOutcomeCheck.id))
-          .join(SubjectOutcome, ResourceOutcomeCheck.outcome_id == SubjectOutcome.id)
-          .filter(ResourceOutcomeCheck.resource_book_id == rb.id, ResourceOutcomeCheck.checked == True)
-          .filter(SubjectOutcome.subject_code == rb.subject_code)
-          .scalar()
-    ) or 0
-    progress = int(round((checked / total) * 100)) if total > 0 else 0
     return {"ok": True, "progress_percent": progress}
 
+@app.post("/resource-books/outcomes/toggle")
+def toggle_outcomes_for_resource_books(body: ToggleOutcomeMultiIn, request: Request, db: Session = Depends(get_db), csrf: None = Depends(require_csrf)):
+    user, sess = _get_user(request, db)
+    books = {b.id: b for b in lock_books(db, [x.resource_book_id for x in body.books])}
+    if any(x.resource_book_id not in books for x in body.books):
+        raise HTTPException(status_code=404, detail="resource_book_not_found")
+    if user.username != "rooter":
+        # One out-of-scope book rejects the whole request.
+        check_scope_students(db, user.id, {b.student_id for b in books.values()})
+    apply_toggles(db, [(books[x.resource_book_id], item.outcome_id, item.checked)
+                       for x in body.books for item in x.items])
+    progress = [{"resource_book_id": str(b.id), "progress_percent": progress_percent(b)} for b in books.values()]
+    db.commit()
+    return {"ok": True, "books": progress}
+
 @app.get("/students/{id}/workbooks")
 def list_student_workbooks(id: UUID, request: Request, db: Session = Depends(get_db)):
     user, sess = _get_user(request, db)
-    st = db.query(Student).filter(Student.id == str(id)).first()
+    st = db.query(Student).filter(Student.id == id).first()
     if not st:
         raise HTTPException(status_code=404, detail="student_not_found")
-    rows = db.query(StudentWorkbook).filter(StudentWorkbook.student_id == str(id)).order_by(StudentWorkbook.assigned_at.asc()).all()
+    # Workbooks come in on the same query (outer join keeps assignments whose workbook is gone).
+    rows = (db.query(StudentWorkbook, Workbook)
+              .outerjoin(Workbook, Workbook.id == StudentWorkbook.workbook_id)
+              .filter(StudentWorkbook.student_id == id)
+              .order_by(StudentWorkbook.assigned_at.asc()).all())
     out = []
-    for sw in rows:
-        w = db.query(Workbook).filter(Workbook.id == sw.workbook_id).first()
+    for sw, w in rows:
         out.append({
             "id": str(sw.id),
             "status": sw.status,
@@ -670,111 +931,3 @@ def list_student_workbooks(id: UUID, request: Request, db: Session = Depends(get
             }
         })
     return out
-
-@app.get("/students/{id}/resource-books", response_model=List[ResourceBookOut])
-def list_resource_books_for_student(id: UUID, request: Request, db: Session = Depends(get_db)):
-    user, sess = _get_user(request, db)
-    st = db.query(Student).filter(Student.id == str(id)).first()
-    if not st:
-        raise HTTPException(status_code=404, detail="student_not_found")
-    books = (db.query(ResourceBook)
-               .filter(ResourceBook.student_id == str(id))
-               .order_by(ResourceBook.created_at.asc())
-               .all())
-    out = []
-    for b in books:
-        total = (db.query(func.count(SubjectOutcome.id))
-                   .filter(SubjectOutcome.subject_code == b.subject_code)
-                   .scalar()) or 0
-        checked = (db.query(func.count(ResourceOutcomeCheck.id))
-                     .join(SubjectOutcome, ResourceOutcomeCheck.outcome_id == SubjectOutcome.id)
-                     .filter(ResourceOutcomeCheck.resource_book_id == b.id)
-                     .filter(ResourceOutcomeCheck.checked == True)
-                     .filter(SubjectOutcome.subject_code == b.subject_code)
-                     .scalar()) or 0
-        progress = int(round((checked / total) * 100)) if total > 0 else 0
-        out.append({"id": b.id, "name": b.name, "subject_code": b.subject_code, "progress_percent": progress})
-    return out
-
-@app.post("/students/{id}/resource-books", response_model=ResourceBookOut)
-def create_resource_book_for_student(id: UUID, body: ResourceBookCreate, request: Request, db: Session = Depends(get_db)):
-    user, sess = _get_user(request, db)
-    st = db.query(Student).filter(Student.id == str(id)).first()
-    if not st:
-        raise HTTPException(status_code=404, detail="student_not_found")
-    if body.subject_code not in [s["code"] for s in SUBJECTS]:
-        raise HTTPException(status_code=400, detail="invalid_subject")
-    rb = ResourceBook(student_id=str(id), name=body.name.strip(), subject_code=body.subject_code)
-    db.add(rb); db.commit(); db.refresh(rb)
-    try:
-        audit(db, actor_id=user.id, actor_role="teacher", action="create", entity_type="resource_book", entity_id=rb.id,
-              after={"student_id": str(id), "name": rb.name, "subject_code": rb.subject_code})
-    except Exception:
-        pass
-    return {"id": rb.id, "name": rb.name, "subject_code": rb.subject_code, "progress_percent": 0}
-
-@app.get("/resource-books/{book_id}/outcomes", response_model=List[OutcomeWithCheck])
-def get_outcomes_for_resource_book(book_id: UUID, request: Request, db: Session = Depends(get_db)):
-    user, sess = _get_user(request, db)
-    rb = db.query(ResourceBook).filter(ResourceBook.id == str(book_id)).first()
-    if not rb:
-        raise HTTPException(status_code=404, detail="resource_book_not_found")
-    outcomes = (db.query(SubjectOutcome)
-                  .filter(SubjectOutcome.subject_code == rb.subject_code)
-                  .order_by(SubjectOutcome.code.asc())
-                  .all())
-    checks = {
-        str(x.outcome_id): x
-        for x in db.query(ResourceOutcomeCheck)
-                   .filter(ResourceOutcomeCheck.resource_book_id == rb.id)
-                   .all()
-    }
-    out = []
-    for o in outcomes:
-        oc = checks.get(str(o.id))
-        out.append({
-            "outcome_id": o.id,
-            "subject_code": o.subject_code,
-            "code": o.code,
-            "text": o.text,
-            "checked": bool(oc.checked) if oc else False
-        })
-    return out
-
-@app.post("/resource-books/{book_id}/outcomes/toggle")
-def toggle_outcomes_for_resource_book(book_id: UUID, body: ToggleOutcomeBulkIn, request: Request, db: Session = Depends(get_db)):
-    user, sess = _get_user(request, db)
-    rb = db.query(ResourceBook).filter(ResourceBook.id == str(book_id)).first()
-    if not rb:
-        raise HTTPException(status_code=404, detail="resource_book_not_found")
-
-    # IMPORTANT FIX: querying a single column returns rows (tuples). Use row[0].
-    valid_id_rows = (db.query(SubjectOutcome.id)
-                       .filter(SubjectOutcome.subject_code == rb.subject_code)
-                       .all())
-    valid_ids = set(str(row[0]) for row in valid_id_rows)
-
-    for item in body.items:
-        if str(item.outcome_id) not in valid_ids:
-            continue
-        rec = (db.query(ResourceOutcomeCheck)
-                 .filter(ResourceOutcomeCheck.resource_book_id == rb.id,
-                         ResourceOutcomeCheck.outcome_id == item.outcome_id)
-                 .first())
-        if not rec:
-            rec = ResourceOutcomeCheck(resource_book_id=rb.id, outcome_id=item.outcome_id, checked=item.checked)
-            db.add(rec)
-        else:
-            rec.checked = item.checked
-    db.commit()
-
-    total = (db.query(func.count(SubjectOutcome.id))
-               .filter(SubjectOutcome.subject_code == rb.subject_code)
-               .scalar()) or 0
-    checked = (db.query(func.count(ResourceOutcomeCheck.id))
-                 .join(SubjectOutcome, ResourceOutcomeCheck.outcome_id == SubjectOutcome.id)
-                 .filter(ResourceOutcomeCheck.resource_book_id == rb.id, ResourceOutcomeCheck.checked == True)
-                 .filter(SubjectOutcome.subject_code == rb.subject_code)
-                 .scalar()) or 0
-    progress = int(round((checked / total) * 100)) if total > 0 else 0
-    return {"ok": True, "progress_percent": progress}
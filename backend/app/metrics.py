@@ -0,0 +1,132 @@
+import threading, time
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Prometheus text exposition (format 0.0.4) without a client library: a couple of
+# labelled histograms/counters for requests plus pool gauges read at scrape time.
+# DB time is attributed to the current request through a ContextVar holding a
+# mutable RequestDb; it survives the hop into the threadpool (sync routes) and
+# into AsyncSession.run_sync() greenlets (async routes).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RequestDb:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+current_request_db: ContextVar[RequestDb | None] = ContextVar("current_request_db", default=None)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(value) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        out += [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+        return out
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bounds = [f'le="{_num(b)}"' for b in self.buckets] + ['le="+Inf"']
+        for labels, series in items:
+            for le, n in zip(bounds, series[:-2] + [series[-1]]):
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {n}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(series[-2])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return out
+
+http_requests = Counter("lgs_http_requests_total", "HTTP requests by route and status.",
+                        ("method", "route", "status"))
+http_latency = Histogram("lgs_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+http_db_time = Histogram("lgs_http_request_db_seconds", "Time spent in database calls per request.",
+                         ("method", "route"))
+
+def observe_request(method: str, route: str, status: int, seconds: float, db: RequestDb):
+    http_requests.inc((method, route, str(status)))
+    http_latency.observe((method, route), seconds)
+    http_db_time.observe((method, route), db.seconds)
+
+def instrument_engine(engine) -> None:
+    # Cursor-level timing, so ORM and Core statements alike are counted. Takes a sync
+    # Engine; for an AsyncEngine pass async_engine.sync_engine.
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        acc = current_request_db.get()
+        if acc is not None:
+            acc.queries += 1
+            acc.seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+def pool_lines(engines: dict) -> list[str]:
+    # engines: label -> sync Engine. Only QueuePool-style pools report these figures.
+    gauges = [("lgs_db_pool_size", "Configured pool size.", "size"),
+              ("lgs_db_pool_checked_out", "Connections currently checked out.", "checkedout"),
+              ("lgs_db_pool_checked_in", "Idle connections held by the pool.", "checkedin"),
+              ("lgs_db_pool_overflow", "Connections open beyond pool_size (negative while below it).", "overflow")]
+    out = []
+    for name, help, attr in gauges:
+        out += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        for label, engine in engines.items():
+            fn = getattr(engine.pool, attr, None)
+            if callable(fn):
+                out.append(f"{name}{_labels(('engine',), (label,))} {fn()}")
+    return out
+
+def render(engines: dict) -> str:
+    lines = pool_lines(engines)
+    for metric in (http_requests, http_latency, http_db_time):
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
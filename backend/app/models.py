@@ -1,10 +1,11 @@
 import uuid
-from sqlalchemy import Column, String, Integer, Text, Enum, Boolean, Date, DateTime, ForeignKey, UniqueConstraint, JSON, Numeric, ARRAY
+from sqlalchemy import Column, String, Integer, Text, Enum, Boolean, Date, DateTime, ForeignKey, UniqueConstraint, JSON, Numeric, ARRAY, Computed, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 
 from .db import Base
+from .search import SEARCH_NAME_SQL
 
 class Teacher(Base):
     __tablename__ = "teacher"
@@ -38,6 +39,8 @@ class Student(Base):
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
     updated_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
+    # Folded full_name for trigram search (see search.py); maintained by Postgres.
+    search_name = Column(Text, Computed(SEARCH_NAME_SQL, persisted=True))
 
 class TeacherScope(Base):
     __tablename__ = "teacher_scope"
@@ -71,6 +74,7 @@ class TrialExam(Base):
 
 class TrialResult(Base):
     __tablename__ = "trial_result"
+    __table_args__ = (UniqueConstraint("student_id", "trial_exam_id"),)
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     student_id = Column(UUID(as_uuid=True), ForeignKey("student.id", ondelete="CASCADE"), nullable=False)
     trial_exam_id = Column(UUID(as_uuid=True), ForeignKey("trial_exam.id", ondelete="CASCADE"), nullable=False)
@@ -92,6 +96,20 @@ class TrialResultSubject(Base):
     net = Column(Numeric(6,3), default=0, nullable=False)
     __table_args__ = (UniqueConstraint("trial_result_id", "subject_code", name="uq_trs_result_subject"),)
 
+class StudentSubjectStats(Base):
+    # Rolling per-student, per-subject summary maintained on result entry (see subject_stats.py).
+    __tablename__ = "student_subject_stats"
+    student_id = Column(UUID(as_uuid=True), ForeignKey("student.id", ondelete="CASCADE"), primary_key=True)
+    subject_code = Column(Text, primary_key=True)
+    sample_count = Column(Integer, default=0, nullable=False)
+    recent_nets = Column(JSON, nullable=False)      # last N nets, oldest first
+    recent_avg = Column(Numeric(6,3), nullable=False)
+    best = Column(Numeric(6,3), nullable=False)
+    worst = Column(Numeric(6,3), nullable=False)
+    trend = Column(Numeric(6,3), default=0, nullable=False)  # least-squares slope over recent_nets, net/exam
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    __table_args__ = (Index("idx_subject_stats_avg", "subject_code", "recent_avg"),)
+
 class Workbook(Base):
     __tablename__ = "workbook"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -113,6 +131,7 @@ class StudentWorkbook(Base):
     status = Column(Text, default="assigned", nullable=False)
     progress_percent = Column(Integer, default=0, nullable=False)
     progress_breakdown = Column(JSON)
+    __table_args__ = (Index("idx_student_workbook_student", "student_id", "workbook_id"),)
 
 class Note(Base):
     __tablename__ = "note"
@@ -130,11 +149,13 @@ class AuditLog(Base):
     action = Column(Text, nullable=False)
     entity_type = Column(Text, nullable=False)
     entity_id = Column(UUID(as_uuid=True))
-    ts = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
+    # Partition key, so part of the primary key (see audit_partitions.py).
+    ts = Column(DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc))
     before = Column(JSON)
     after = Column(JSON)
     ip = Column(Text)
     user_agent = Column(Text)
+    __table_args__ = {"postgresql_partition_by": "RANGE (ts)"}
 
 class Session(Base):
     __tablename__ = "session"
@@ -167,6 +188,10 @@ class ResourceBook(Base):
     name = Column(Text, nullable=False)
     subject_code = Column(Text, nullable=False)  # TR, MAT, FEN, INK, DIN, ING
     created_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
+    # Maintained by app.resource_progress on every toggle.
+    checked_count = Column(Integer, nullable=False, default=0, server_default="0")
+    outcome_total = Column(Integer, nullable=False, default=0, server_default="0")
+    __table_args__ = (Index("idx_resource_book_student", "student_id", "created_at"),)
 
 class ResourceOutcomeCheck(Base):
     __tablename__ = "resource_outcome_check"
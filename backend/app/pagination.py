@@ -0,0 +1,38 @@
+import base64, json
+from sqlalchemy import and_, or_, tuple_
+
+# Opaque keyset cursors: base64url(JSON list of the last row's sort-key values).
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("invalid_cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("invalid_cursor")
+    return values
+
+def keyset_after(keys: list, values: list):
+    # keys: [(column, "asc" | "desc"), ...]; rows strictly after `values` in that order.
+    # Consecutive keys with the same direction are compared as one row value, so
+    # (grade DESC, class_section, full_name, id) becomes
+    #   grade < :g OR (grade = :g AND (class_section, full_name, id) > (:cs, :name, :id))
+    # which the planner can use as an index range condition on a matching index.
+    runs = []
+    for (col, direction), value in zip(keys, values):
+        if runs and runs[-1][0] == direction:
+            runs[-1][1].append(col)
+            runs[-1][2].append(value)
+        else:
+            runs.append((direction, [col], [value]))
+    cond = None
+    for direction, cols, vals in reversed(runs):
+        left, right = (cols[0], vals[0]) if len(cols) == 1 else (tuple_(*cols), tuple(vals))
+        step = left > right if direction == "asc" else left < right
+        cond = step if cond is None else or_(step, and_(*[c == v for c, v in zip(cols, vals)], cond))
+    return cond
@@ -0,0 +1,113 @@
+import logging, re, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Opt-in SQL profiling (SQL_PROFILING=1): every statement executed while a profile is
+# active is counted under a fingerprint (whitespace collapsed, literals and bind
+# parameters replaced by ?, IN lists folded), so a query issued once per row shows up
+# as one fingerprint with a high count. The HTTP middleware in main.py reports each
+# request through Server-Timing and the "app.profiler" logger; tests use
+# profile_queries() directly to hold endpoints to a query budget.
+
+log = logging.getLogger("app.profiler")
+
+_PARAM = re.compile(r"%\(\w+\)s|\$\d+|\?|(?<![:\w]):[A-Za-z_]\w*")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+def fingerprint(statement: str) -> str:
+    s = _STRING.sub("?", statement)
+    s = _PARAM.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    s = _IN_LIST.sub("(?)", s)
+    return _SPACE.sub(" ", s).strip()
+
+class QueryProfile:
+    def __init__(self, repeat_threshold: int = 5):
+        self.repeat_threshold = repeat_threshold
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements: dict[str, list] = {}   # fingerprint -> [count, seconds]
+
+    def record(self, statement: str, elapsed: float):
+        self.queries += 1
+        self.seconds += elapsed
+        entry = self.statements.setdefault(fingerprint(statement), [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def repeated(self, threshold: int | None = None) -> list[tuple[str, int]]:
+        # Fingerprints executed more than `threshold` times, most frequent first.
+        threshold = self.repeat_threshold if threshold is None else threshold
+        hits = [(fp, n) for fp, (n, _) in self.statements.items() if n > threshold]
+        return sorted(hits, key=lambda h: -h[1])
+
+    def assert_budget(self, max_queries: int | None = None, max_repeats: int | None = None):
+        # For tests: fails with the offending fingerprints listed.
+        problems = []
+        if max_queries is not None and self.queries > max_queries:
+            problems.append(f"{self.queries} queries > budget {max_queries}")
+        if max_repeats is not None:
+            problems += [f"{n}x {fp}" for fp, n in self.repeated(max_repeats)]
+        if problems:
+            raise AssertionError("query budget exceeded:\n  " + "\n  ".join(problems + self.summary_lines()))
+
+    def summary_lines(self) -> list[str]:
+        ranked = sorted(self.statements.items(), key=lambda kv: -kv[1][0])
+        return [f"{n}x {secs * 1000:.1f}ms {fp}" for fp, (n, secs) in ranked]
+
+    def server_timing(self, app_seconds: float | None = None) -> str:
+        parts = [f'db;dur={self.seconds * 1000:.1f};desc="{self.queries} queries"']
+        for fp, n in self.repeated()[:3]:
+            desc = fp[:80].replace("\\", "").replace('"', "'").encode("ascii", "replace").decode()
+            parts.append(f'sql-repeat;desc="{n}x {desc}"')
+        if app_seconds is not None:
+            parts.append(f"app;dur={app_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+current_profile: ContextVar[QueryProfile | None] = ContextVar("current_profile", default=None)
+
+@contextmanager
+def profile_queries(repeat_threshold: int = 5):
+    # Records statements on installed engines for the duration of the block.
+    prof = QueryProfile(repeat_threshold)
+    token = current_profile.set(prof)
+    try:
+        yield prof
+    finally:
+        current_profile.reset(token)
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    prof = current_profile.get()
+    if prof is not None and conn.info.get("profile_start"):
+        prof.record(statement, time.perf_counter() - conn.info["profile_start"].pop())
+
+def _error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("profile_start"):
+        conn.info["profile_start"].pop()
+
+def install(engine) -> None:
+    # Idempotent. Takes a sync Engine (async_engine.sync_engine for the async one).
+    if not event.contains(engine, "before_cursor_execute", _before):
+        event.listen(engine, "before_cursor_execute", _before)
+        event.listen(engine, "after_cursor_execute", _after)
+        event.listen(engine, "handle_error", _error)
+
+def report(method: str, path: str, prof: QueryProfile, app_seconds: float) -> str:
+    # Logs the request's profile and returns the Server-Timing header value.
+    repeated = prof.repeated()
+    if repeated:
+        log.warning("possible N+1 on %s %s: %s", method, path,
+                    "; ".join(f"{n}x {fp}" for fp, n in repeated))
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("%s %s: %d queries, %.1fms db, %.1fms total\n  %s", method, path, prof.queries,
+                  prof.seconds * 1000, app_seconds * 1000, "\n  ".join(prof.summary_lines()))
+    return prof.server_timing(app_seconds)
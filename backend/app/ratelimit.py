@@ -0,0 +1,72 @@
+import ipaddress, math, threading, time
+from collections import OrderedDict
+from .config import settings
+
+class TokenBucketLimiter:
+    # One bucket per key: `capacity` requests burst, refilled continuously at
+    # capacity / window_seconds. Least-recently-used keys are dropped past max_keys
+    # (a dropped key simply starts again with a full bucket).
+    def __init__(self, name: str, capacity: int, window_seconds: float, max_keys: int = 10000):
+        self.name = name
+        self.capacity = float(capacity)
+        self.rate = capacity / float(window_seconds)
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, now: float | None = None) -> float:
+        # Returns 0 when allowed, else the seconds until a token is available.
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+                self.rejected += 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"keys": len(self._buckets), "capacity": self.capacity, "rejected": self.rejected}
+
+def _networks(spec: str) -> tuple:
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip())
+
+TRUSTED_PROXIES = _networks(settings.TRUSTED_PROXIES)
+
+def _trusted(host: str | None) -> bool:
+    try:
+        addr = ipaddress.ip_address(host)
+    except (TypeError, ValueError):
+        return False
+    return any(addr in net for net in TRUSTED_PROXIES)
+
+def client_ip(request) -> str | None:
+    # The socket peer, unless it is a trusted proxy: then the nearest X-Forwarded-For
+    # hop that is not itself a trusted proxy (hops further left are client-supplied).
+    host = request.client.host if request.client else None
+    if not _trusted(host):
+        return host
+    hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop):
+            return hop
+    return hops[0] if hops else host
+
+def retry_after(wait: float) -> str:
+    return str(max(1, math.ceil(wait)))
+
+login_ip_limiter = TokenBucketLimiter("login_ip", settings.RATE_LIMIT_MAX_AUTH_ATTEMPTS,
+                                      settings.RATE_LIMIT_WINDOW_SECONDS, settings.RATE_LIMIT_MAX_KEYS)
+login_user_limiter = TokenBucketLimiter("login_user", settings.RATE_LIMIT_MAX_AUTH_ATTEMPTS,
+                                        settings.RATE_LIMIT_WINDOW_SECONDS, settings.RATE_LIMIT_MAX_KEYS)
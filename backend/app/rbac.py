@@ -1,17 +1,66 @@
 from fastapi import HTTPException, status
+from sqlalchemy import or_, tuple_, false
 from sqlalchemy.orm import Session
 from .models import TeacherScope, Student
-from .config import settings 
+from .config import settings
+from .cache import TTLCache
+
+class ScopeSet:
+    # Compiled form of a teacher's teacher_scope rows: whole grades plus
+    # (grade, section) pairs. Immutable once built; shared across requests.
+    __slots__ = ("grades", "sections", "_filter")
+
+    def __init__(self, rows):
+        rows = list(rows)
+        self.grades = frozenset(g for g, cs in rows if cs is None)
+        self.sections = frozenset((g, cs) for g, cs in rows if cs is not None and g not in self.grades)
+        cond = []
+        if self.grades:
+            cond.append(Student.grade.in_(sorted(self.grades)))
+        if self.sections:
+            cond.append(tuple_(Student.grade, Student.class_section).in_(sorted(self.sections)))
+        self._filter = or_(*cond) if cond else false()
+
+    def allows(self, grade: int, class_section: str) -> bool:
+        return grade in self.grades or (grade, class_section) in self.sections
+
+    def sql_filter(self):
+        return self._filter
+
+    def items(self) -> list[dict]:
+        out = [{"grade": g, "class_section": None} for g in sorted(self.grades)]
+        out += [{"grade": g, "class_section": cs} for g, cs in sorted(self.sections)]
+        return out
+
+    def __bool__(self):
+        return bool(self.grades or self.sections)
+
+# teacher_id -> ScopeSet
+scope_cache = TTLCache("teacher_scope", settings.SCOPE_CACHE_MAX_ENTRIES, settings.SCOPE_CACHE_TTL_SECONDS)
+
+def get_scope(db: Session, teacher_id) -> ScopeSet:
+    key = str(teacher_id)
+    scope = scope_cache.get(key)
+    if scope is None:
+        rows = db.query(TeacherScope.grade, TeacherScope.class_section).filter(TeacherScope.teacher_id == teacher_id).all()
+        scope = ScopeSet(rows)
+        scope_cache.set(key, scope)
+    return scope
+
+def invalidate_scope(teacher_id) -> None:
+    scope_cache.pop(str(teacher_id))
 
 def check_scope_teacher(db: Session, teacher_id, student: Student) -> None:
     if settings.TEACHER_GLOBAL_ACCESS:
         return
+    if not get_scope(db, teacher_id).allows(student.grade, student.class_section):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="out_of_scope")
 
-    scopes = db.query(TeacherScope).filter(TeacherScope.teacher_id == teacher_id).all()
-    allowed = False
-    for sc in scopes:
-        if sc.grade == student.grade and (sc.class_section is None or sc.class_section == student.class_section):
-            allowed = True
-            break
-    if not allowed:
+def check_scope_students(db: Session, teacher_id, student_ids) -> None:
+    # check_scope_teacher for a set of students, loaded in one query.
+    if settings.TEACHER_GLOBAL_ACCESS:
+        return
+    scope = get_scope(db, teacher_id)
+    rows = db.query(Student.grade, Student.class_section).filter(Student.id.in_(set(student_ids))).all()
+    if not all(scope.allows(grade, section) for grade, section in rows):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="out_of_scope")
@@ -0,0 +1,129 @@
+from uuid import UUID
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from .cache import TTLCache
+from .config import settings
+from .models import Student, TrialExam, Workbook, AuditLog
+from .pagination import encode_cursor, decode_cursor, keyset_after
+from .rbac import check_scope_teacher, get_scope
+from .search import fold_name, like_pattern
+from .trial_results import load_trial_history
+from .audit_view import after_cursor, audit_cursor, audit_row
+
+# Bodies of the read endpoints, written against a plain Session. The sync routes in
+# main.py call them directly; the async routes (async_reads.py) run the very same
+# functions through AsyncSession.run_sync(), so both engines return identical payloads.
+# Access checks that depend only on the principal stay in the route handlers.
+
+STUDENT_SORT = [(Student.grade, "desc"), (Student.class_section, "asc"), (Student.full_name, "asc"), (Student.id, "asc")]
+
+# (scope key, grade, q) -> total, for total=cached
+student_count_cache = TTLCache("student_count", 1024, settings.STUDENT_COUNT_CACHE_TTL_SECONDS)
+
+def student_total(db: Session, query, mode: str, cache_key: tuple, filtered: bool):
+    if mode == "none":
+        return None
+    if mode == "estimate" and not filtered:
+        # Planner statistics; only meaningful for the unfiltered table.
+        est = db.execute(text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'student'::regclass")).scalar()
+        if est is not None and est >= 0:
+            return int(est)
+    if mode in ("cached", "estimate"):
+        total = student_count_cache.get(cache_key)
+        if total is None:
+            total = query.count()
+            student_count_cache.set(cache_key, total)
+        return total
+    return query.count()
+
+def student_dict(s: Student) -> dict:
+    return {
+        "id": str(s.id), "full_name": s.full_name, "grade": s.grade, "class_section": s.class_section,
+        "guardian_name": s.guardian_name, "guardian_phone": s.guardian_phone, "guardian_email": s.guardian_email,
+        "status": s.status, "created_at": s.created_at.isoformat(), "updated_at": s.updated_at.isoformat()
+    }
+
+def list_students(db: Session, user, grade=None, q=None, page: int = 1, page_size: int = 20,
+                  cursor: str | None = None, total: str = "exact") -> dict:
+    if total not in ("exact", "cached", "estimate", "none"):
+        raise HTTPException(status_code=400, detail="invalid_total_mode")
+    page, page_size = max(1, page), max(1, min(page_size, 100))
+    is_rooter = (user.username == "rooter")
+    query = db.query(Student)
+    scope_key = "all"
+    if not is_rooter and not settings.TEACHER_GLOBAL_ACCESS:
+        # apply scope
+        scope = get_scope(db, user.id)
+        if not scope:
+            return {"items": [], "total": 0, "next_cursor": None}
+        query = query.filter(scope.sql_filter())
+        scope_key = str(user.id)
+    if grade:
+        query = query.filter(Student.grade == grade)
+    if q:
+        query = query.filter(Student.search_name.like(like_pattern(fold_name(q)), escape="\\"))
+    count = student_total(db, query, total, (scope_key, grade, q), filtered=bool(grade or q or scope_key != "all"))
+    # Keyset mode when a cursor is given; otherwise the legacy page/offset mode.
+    ordered = query.order_by(*[col.desc() if d == "desc" else col.asc() for col, d in STUDENT_SORT])
+    if cursor:
+        try:
+            g, cs, name, sid = decode_cursor(cursor, len(STUDENT_SORT))
+            ordered = ordered.filter(keyset_after(STUDENT_SORT, [int(g), cs, name, UUID(sid)]))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="invalid_cursor")
+    else:
+        ordered = ordered.offset((page-1)*page_size)
+    rows = ordered.limit(page_size + 1).all()
+    items, more = rows[:page_size], len(rows) > page_size
+    next_cursor = None
+    if more and items:
+        last = items[-1]
+        next_cursor = encode_cursor([last.grade, last.class_section, last.full_name, str(last.id)])
+    return {"items": [student_dict(s) for s in items], "total": count, "next_cursor": next_cursor}
+
+def student_trials(db: Session, user, student_id: UUID, newest_first: bool = False,
+                   not_found: str = "not_found") -> list[dict]:
+    st = db.query(Student).filter(Student.id == str(student_id)).first()
+    if not st:
+        raise HTTPException(status_code=404, detail=not_found)
+    if user.username != "rooter":
+        check_scope_teacher(db, user.id, st)
+    return load_trial_history(db, st.id, newest_first=newest_first)
+
+def list_trials(db: Session, grade=None) -> list[dict]:
+    q = db.query(TrialExam)
+    # FIX: proper Postgres ARRAY filtering
+    if grade is not None:
+        # matches rows where 'grade' is contained in the grade_scope array
+        q = q.filter(TrialExam.grade_scope.contains([grade]))
+    items = q.order_by(TrialExam.date.desc()).all()
+    return [{
+        "id": str(t.id),
+        "name": t.name,
+        "source": t.source,
+        "date": t.date.isoformat(),
+        "grade_scope": t.grade_scope,
+        "subjects_config_id": str(t.subjects_config_id),
+        "is_finalized": t.is_finalized
+    } for t in items]
+
+def list_workbooks(db: Session, grade=None) -> list[dict]:
+    q = db.query(Workbook)
+    if grade:
+        q = q.filter(Workbook.grade == grade)
+    items = q.order_by(Workbook.grade.desc(), Workbook.title.asc()).all()
+    return [{"id": str(w.id), "title": w.title, "subject_code": w.subject_code, "grade": w.grade,
+             "publisher": w.publisher, "total_units": w.total_units, "total_pages": w.total_pages} for w in items]
+
+def audit_page(db: Session, filters: list, cursor: str | None = None, limit: int = 200) -> dict:
+    limit = max(1, min(limit, 1000))
+    q = db.query(AuditLog).filter(*filters)
+    if cursor:
+        try:
+            q = q.filter(after_cursor(cursor))
+        except ValueError:
+            raise HTTPException(400, "invalid_cursor")
+    rows = q.order_by(AuditLog.ts.desc(), AuditLog.id.desc()).limit(limit + 1).all()
+    items, more = rows[:limit], len(rows) > limit
+    return {"items": [audit_row(a) for a in items], "next_cursor": audit_cursor(items[-1]) if more else None}
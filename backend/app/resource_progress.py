@@ -0,0 +1,98 @@
+import sys, uuid
+from sqlalchemy import func, select, update, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from .cache import TTLCache
+from .models import ResourceBook, ResourceOutcomeCheck, SubjectOutcome
+
+# Resource-book progress is kept as counters on resource_book (checked_count,
+# outcome_total). Toggles recount them in the same transaction as the checks;
+# `python -m app.resource_progress rebuild` recomputes them from scratch.
+
+# subject_code -> frozenset of outcome ids (str); the catalogue only changes on seed.
+outcome_catalogue = TTLCache("outcome_catalogue", 64, 3600)
+
+_UPSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+def subject_outcome_ids(db: Session, subject_code: str) -> frozenset:
+    ids = outcome_catalogue.get(subject_code)
+    if ids is None:
+        ids = frozenset(str(row[0]) for row in
+                        db.query(SubjectOutcome.id).filter(SubjectOutcome.subject_code == subject_code).all())
+        outcome_catalogue.set(subject_code, ids)
+    return ids
+
+def progress_percent(book: ResourceBook) -> int:
+    total = book.outcome_total or 0
+    return int(round((book.checked_count / total) * 100)) if total > 0 else 0
+
+def outcome_total(db: Session, subject_code: str) -> int:
+    return len(subject_outcome_ids(db, subject_code))
+
+def lock_books(db: Session, book_ids) -> list:
+    # Row locks serialize concurrent toggles on the same books; ordered to avoid deadlocks.
+    return (db.query(ResourceBook)
+              .filter(ResourceBook.id.in_(sorted(set(book_ids), key=str)))
+              .order_by(ResourceBook.id)
+              .with_for_update().all())
+
+def apply_toggles(db: Session, toggles: list[tuple]) -> int:
+    # toggles: (book, outcome_id, checked) with books loaded via lock_books(). Outcomes
+    # outside the book's subject are ignored; for repeats the last toggle wins. The
+    # whole batch is one INSERT ... ON CONFLICT (resource_book_id, outcome_id) DO UPDATE
+    # followed by one counter recount. Returns the number of rows written; caller commits.
+    rows = {}
+    books = {}
+    for book, outcome_id, checked in toggles:
+        if str(outcome_id) not in subject_outcome_ids(db, book.subject_code):
+            continue
+        books[book.id] = book
+        rows[(book.id, str(outcome_id))] = {"id": uuid.uuid4(), "resource_book_id": book.id,
+                                            "outcome_id": uuid.UUID(str(outcome_id)), "checked": bool(checked)}
+    if rows:
+        stmt = _UPSERTS[db.get_bind().dialect.name](ResourceOutcomeCheck).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(index_elements=["resource_book_id", "outcome_id"],
+                                          set_={"checked": stmt.excluded.checked})
+        db.execute(stmt)
+        recount(db, books)
+    return len(rows)
+
+def _counter_values():
+    checked = (select(func.count(ResourceOutcomeCheck.id))
+                 .join(SubjectOutcome, ResourceOutcomeCheck.outcome_id == SubjectOutcome.id)
+                 .where(ResourceOutcomeCheck.resource_book_id == ResourceBook.id,
+                        ResourceOutcomeCheck.checked == True,
+                        SubjectOutcome.subject_code == ResourceBook.subject_code)
+                 .scalar_subquery())
+    total = (select(func.count(SubjectOutcome.id))
+               .where(SubjectOutcome.subject_code == ResourceBook.subject_code)
+               .scalar_subquery())
+    return {"checked_count": checked, "outcome_total": total}
+
+def recount(db: Session, books: dict) -> None:
+    # books: id -> loaded ResourceBook; the new counters are copied back via RETURNING.
+    stmt = (update(ResourceBook.__table__).values(**_counter_values())
+              .where(ResourceBook.id.in_(list(books)))
+              .returning(ResourceBook.id, ResourceBook.checked_count, ResourceBook.outcome_total))
+    for book_id, checked, total in db.execute(stmt):
+        set_committed_value(books[book_id], "checked_count", checked)
+        set_committed_value(books[book_id], "outcome_total", total)
+
+def rebuild_all(db: Session) -> int:
+    outcome_catalogue.clear()
+    return db.execute(update(ResourceBook.__table__).values(**_counter_values())).rowcount
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m app.resource_progress rebuild")
+    from .db import SessionLocal
+    with SessionLocal() as db:
+        # Upgrades databases created before the counters existed.
+        db.execute(text("ALTER TABLE resource_book ADD COLUMN IF NOT EXISTS checked_count INT NOT NULL DEFAULT 0"))
+        db.execute(text("ALTER TABLE resource_book ADD COLUMN IF NOT EXISTS outcome_total INT NOT NULL DEFAULT 0"))
+        db.execute(text("CREATE INDEX IF NOT EXISTS idx_resource_book_student ON resource_book (student_id, created_at)"))
+        n = rebuild_all(db)
+        db.commit()
+    print(f"rebuilt progress for {n} resource books")
@@ -18,6 +18,9 @@ class ScopeItem(BaseModel):
     grade: int
     class_section: Optional[str] = None
 
+class TeacherScopeUpdate(BaseModel):
+    items: List[ScopeItem]
+
 class AuthMe(BaseModel):
     id: UUID
     full_name: str
@@ -69,6 +72,20 @@ class TrialResultCreate(BaseModel):
     trial_exam_id: UUID
     subjects: List[TrialSubjectInput]
 
+class TrialGridSubject(BaseModel):
+    # Unconstrained ints: range problems are reported per student, not as a request-level 422.
+    subject_code: str
+    correct: int
+    wrong: int
+    blank: int
+
+class TrialGridRow(BaseModel):
+    student_id: UUID
+    subjects: List[TrialGridSubject]
+
+class TrialResultBatchIn(BaseModel):
+    items: List[TrialGridRow] = Field(max_length=1000)
+
 class TrialSubjectOut(BaseModel):
     subject_code: str
     correct: int
@@ -99,6 +116,13 @@ class StudentWorkbookCreate(BaseModel):
     workbook_id: UUID
     target_date: Optional[date] = None
 
+class WorkbookBulkAssign(BaseModel):
+    # Either student_ids, or grade with an optional class_section.
+    grade: Optional[int] = None
+    class_section: Optional[str] = None
+    student_ids: Optional[List[UUID]] = Field(default=None, max_length=2000)
+    target_date: Optional[date] = None
+
 class StudentWorkbookOut(BaseModel):
     id: UUID
     student_id: UUID
@@ -120,6 +144,12 @@ class TeacherCreate(BaseModel):
     temp_password: str
     must_change_password: bool = True
 
+class TeacherPasswordReset(BaseModel):
+    temp_password: str
+
+class TeacherStatusUpdate(BaseModel):
+    status: str = Field(pattern="^(active|disabled)$")
+
 class TeacherListItem(BaseModel):
     id: UUID
     full_name: str
@@ -178,3 +208,10 @@ class ToggleOutcomeIn(BaseModel):
 
 class ToggleOutcomeBulkIn(BaseModel):
     items: List[ToggleOutcomeIn]
+
+class ToggleOutcomeBookIn(BaseModel):
+    resource_book_id: UUID
+    items: List[ToggleOutcomeIn]
+
+class ToggleOutcomeMultiIn(BaseModel):
+    books: List[ToggleOutcomeBookIn]
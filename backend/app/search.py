@@ -0,0 +1,18 @@
+# Turkish-aware folding for name search. Turkish letters and circumflexes are
+# mapped to ASCII *before* lowercasing, so İ/I/ı all become "i" (plain lower()
+# turns "İ" into "i̇" and leaves "I" as "i" in non-Turkish locales).
+# The same mapping backs the generated student.search_name column, so the
+# Python and SQL sides always agree.
+
+FOLD_FROM = "İIıÇçĞğÖöŞşÜüÂâÎîÛû"
+FOLD_TO = "iiiccggoossuuaaiiuu"
+_FOLD_TABLE = str.maketrans(FOLD_FROM, FOLD_TO)
+
+SEARCH_NAME_SQL = f"lower(translate(full_name, '{FOLD_FROM}', '{FOLD_TO}'))"
+
+def fold_name(value: str) -> str:
+    return " ".join(value.translate(_FOLD_TABLE).lower().split())
+
+def like_pattern(folded: str) -> str:
+    escaped = folded.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
@@ -1,17 +1,54 @@
-import secrets, re
+import secrets, re, threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from passlib.hash import argon2
 from .config import settings
 
-def hash_password(password: str) -> str:
-    return argon2.using(time_cost=3, memory_cost=65536, parallelism=2).hash(password)
+class HashPoolBusy(Exception):
+    # Mapped to 429 + Retry-After by the app's exception handler.
+    pass
 
-def verify_password(password: str, hashval: str) -> bool:
+class HashPool:
+    # Argon2 runs here instead of on the request threads so that at most
+    # max_workers hashes (64 MB each) are in memory at once. Up to max_queue more
+    # callers may wait; anything beyond that fails fast with HashPoolBusy.
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="argon2")
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashPoolBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def stats(self) -> dict:
+        return {"workers": self.max_workers, "queue": self.max_queue, "rejected": self.rejected}
+
+hash_pool = HashPool(settings.ARGON2_MAX_WORKERS, settings.ARGON2_MAX_QUEUE)
+_argon2 = argon2.using(time_cost=3, memory_cost=65536, parallelism=2)
+
+def _verify(password: str, hashval: str) -> bool:
     try:
         return argon2.verify(password, hashval)
     except Exception:
         return False
 
+def hash_password(password: str) -> str:
+    return hash_pool.run(_argon2.hash, password)
+
+def verify_password(password: str, hashval: str) -> bool:
+    return hash_pool.run(_verify, password, hashval)
+
 def validate_password(pw: str) -> list[str]:
     errors = []
     if len(pw) < settings.PASSWORD_MIN_LENGTH:
@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session as DBSession
+from .cache import TTLCache
+from .config import settings
+from .models import Teacher, Session
+from .rbac import ScopeSet, get_scope
+
+# sid -> Principal. Entries never outlive the session row's expires_at.
+session_cache = TTLCache("session", settings.SESSION_CACHE_MAX_ENTRIES, settings.SESSION_CACHE_TTL_SECONDS)
+
+@dataclass(frozen=True)
+class Principal:
+    user: Teacher       # detached; read-only
+    session: Session    # detached; read-only
+    role: str
+    scopes: ScopeSet
+
+def load_principal(db: DBSession, sid: str) -> Principal:
+    cached = session_cache.get(sid)
+    if cached is not None:
+        return cached
+    sess = db.query(Session).filter(Session.id == sid, Session.expires_at > datetime.now(timezone.utc)).first()
+    if not sess:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid_session")
+    user = db.query(Teacher).filter(Teacher.id == sess.user_id, Teacher.status == "active").first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="user_disabled")
+    scopes = get_scope(db, user.id)
+    # Detach so a later commit in the request session can't expire the shared copies.
+    db.expunge(sess)
+    db.expunge(user)
+    principal = Principal(user=user, session=sess, role=sess.role, scopes=scopes)
+    session_cache.set(sid, principal, expires_at=sess.expires_at.timestamp())
+    return principal
+
+def invalidate_session(sid: str) -> None:
+    session_cache.pop(sid)
+
+def invalidate_user(user_id) -> int:
+    user_id = str(user_id)
+    return session_cache.pop_where(lambda p: str(p.user.id) == user_id)
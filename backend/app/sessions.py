@@ -0,0 +1,145 @@
+import threading, time, uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.orm import Session as DBSession
+from .audit_partitions import ensure_partitions, is_partitioned
+from .config import settings
+from .models import Session
+
+# Session-table maintenance off the request path:
+# - reap_expired() deletes expired rows in small batches (SKIP LOCKED on Postgres).
+# - SessionTouches records "seen" marks per request and writes last_seen_ip (and,
+#   with SESSION_SLIDING_EXPIRY, a pushed-out expires_at) at most once per
+#   SESSION_TOUCH_INTERVAL_SECONDS per session, as one executemany UPDATE per flush.
+# SessionJanitor runs both from a daemon thread, along with ensure_partitions() so a
+# long-running process keeps creating audit_log months ahead of time.
+
+def reap_expired(db: DBSession, batch_size: int = 1000, now: datetime | None = None) -> int:
+    now = now or datetime.now(timezone.utc)
+    total = 0
+    while True:
+        ids = (select(Session.id).where(Session.expires_at <= now)
+                 .limit(batch_size).with_for_update(skip_locked=True).scalar_subquery())
+        deleted = db.execute(delete(Session).where(Session.id.in_(ids)),
+                             execution_options={"synchronize_session": False}).rowcount
+        db.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+class SessionTouches:
+    def __init__(self, interval: float, sliding: bool, ttl_seconds: int):
+        self.interval = interval
+        self.sliding = sliding
+        self.ttl_seconds = ttl_seconds
+        self._pending: dict[str, str | None] = {}
+        self._last: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, sid: str, ip: str | None) -> bool:
+        # Cheap enough for every request; True when this call queued a write.
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last.get(sid, float("-inf")) < self.interval:
+                return False
+            self._last[sid] = now
+            self._pending[sid] = ip
+            return True
+
+    def forget(self, sid: str) -> None:
+        with self._lock:
+            self._pending.pop(sid, None)
+            self._last.pop(sid, None)
+
+    def flush(self, db: DBSession) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            cutoff = time.monotonic() - self.interval
+            self._last = {sid: t for sid, t in self._last.items() if t >= cutoff}
+        if not pending:
+            return 0
+        now = datetime.now(timezone.utc)
+        values = {"last_seen_ip": bindparam("ip")}
+        if self.sliding:
+            values["expires_at"] = now + timedelta(seconds=self.ttl_seconds)
+        # Expired rows are left alone so a late flush cannot resurrect a session.
+        stmt = (update(Session.__table__)
+                  .where(Session.id == bindparam("sid"), Session.expires_at > now)
+                  .values(**values))
+        db.execute(stmt, [{"sid": uuid.UUID(sid), "ip": ip} for sid, ip in pending.items()])
+        db.commit()
+        return len(pending)
+
+class SessionJanitor:
+    def __init__(self, session_factory, touches: SessionTouches, *, reap_interval: float, batch_size: int,
+                 partition_interval: float = 0, tick: float = 5.0):
+        self.session_factory = session_factory
+        self.touches = touches
+        self.reap_interval = reap_interval
+        self.batch_size = batch_size
+        self.partition_interval = partition_interval
+        self.tick = tick
+        self.reaped = self.touched = self.errors = self.partitions_created = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._next_reap = self._next_partitions = 0.0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="session-janitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.run_once(reap=False)
+
+    def stats(self) -> dict:
+        return {"reaped": self.reaped, "touched": self.touched, "errors": self.errors,
+                "partitions_created": self.partitions_created}
+
+    def run_once(self, reap: bool = True):
+        try:
+            with self.session_factory() as db:
+                self.touched += self.touches.flush(db)
+                if reap:
+                    self.reaped += reap_expired(db, self.batch_size)
+        except Exception:
+            # Maintenance is best-effort; the next tick retries.
+            self.errors += 1
+
+    def ensure_partitions(self):
+        # Separate session, so a failed flush or reap does not hold this back.
+        try:
+            with self.session_factory() as db:
+                if is_partitioned(db):
+                    self.partitions_created += len(ensure_partitions(db))
+                    db.commit()
+        except Exception:
+            self.errors += 1
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            due = self.reap_interval > 0 and time.monotonic() >= self._next_reap
+            if due:
+                self._next_reap = time.monotonic() + self.reap_interval
+            self.run_once(reap=due)
+            if self.partition_interval > 0 and time.monotonic() >= self._next_partitions:
+                self._next_partitions = time.monotonic() + self.partition_interval
+                self.ensure_partitions()
+
+session_touches = SessionTouches(settings.SESSION_TOUCH_INTERVAL_SECONDS, settings.SESSION_SLIDING_EXPIRY,
+                                 settings.SESSION_TTL_SECONDS)
+
+def _janitor():
+    from .db import SessionLocal
+    return SessionJanitor(SessionLocal, session_touches,
+                          reap_interval=settings.SESSION_REAP_INTERVAL_SECONDS,
+                          batch_size=settings.SESSION_REAP_BATCH_SIZE,
+                          partition_interval=settings.AUDIT_PARTITION_CHECK_INTERVAL_SECONDS)
+
+session_janitor = _janitor()
@@ -0,0 +1,113 @@
+import sys
+from datetime import datetime, timezone
+from sqlalchemy import select, delete, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from .config import settings
+from .models import StudentSubjectStats, TrialResult, TrialResultSubject
+
+# Rolling per-student subject statistics. Result entry paths call apply_results()
+# inside their transaction; `python -m app.subject_stats rebuild` recomputes the
+# table from trial_result_subject (e.g. after changing ROLLING_STATS_WINDOW).
+
+_UPSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+def _slope(values: list[float]) -> float:
+    m = len(values)
+    if m < 2:
+        return 0.0
+    mean_x = (m - 1) / 2
+    mean_y = sum(values) / m
+    num = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    den = sum((x - mean_x) ** 2 for x in range(m))
+    return num / den
+
+def roll(state: dict | None, net: float, window: int) -> dict:
+    # state keys mirror StudentSubjectStats columns; returns the new state.
+    if state is None:
+        recent, count, best, worst = [net], 1, net, net
+    else:
+        recent = (list(state["recent_nets"]) + [net])[-window:]
+        count = state["sample_count"] + 1
+        best, worst = max(float(state["best"]), net), min(float(state["worst"]), net)
+    return {"recent_nets": recent, "sample_count": count, "best": round(best, 3), "worst": round(worst, 3),
+            "recent_avg": round(sum(recent) / len(recent), 3), "trend": round(_slope(recent), 3)}
+
+def _lock_rows(db: Session, student_ids) -> dict:
+    rows = {}
+    student_ids = sorted(student_ids, key=str)
+    for start in range(0, len(student_ids), 1000):
+        for r in (db.query(StudentSubjectStats)
+                    .filter(StudentSubjectStats.student_id.in_(student_ids[start:start + 1000]))
+                    .order_by(StudentSubjectStats.student_id, StudentSubjectStats.subject_code)
+                    .with_for_update().all()):
+            rows[(str(r.student_id), r.subject_code)] = r
+    return rows
+
+def apply_results(db: Session, items: list[tuple], window: int | None = None) -> None:
+    # items: (student_id, subject_code, net, result_id). Rows are locked so concurrent
+    # entries for the same student serialize; keys without a row first get an empty
+    # one via INSERT ... ON CONFLICT DO NOTHING, which waits for a concurrent first
+    # entry to commit instead of failing on the primary key, and are then locked too.
+    # Samples are rolled in (entered_at, result id) order, as rebuild_all() does;
+    # everything in one call shares entered_at, so that is result id order here.
+    window = window or settings.ROLLING_STATS_WINDOW
+    if not items:
+        return
+    now = datetime.now(timezone.utc)
+    rows = _lock_rows(db, {sid for sid, _, _, _ in items})
+    missing = sorted({(str(sid), code): sid for sid, code, _, _ in items if (str(sid), code) not in rows}.items())
+    if missing:
+        stmt = _UPSERTS[db.get_bind().dialect.name](StudentSubjectStats).values(
+            [{"student_id": sid, "subject_code": code, "sample_count": 0, "recent_nets": [], "recent_avg": 0,
+              "best": 0, "worst": 0, "trend": 0, "updated_at": now} for (_, code), sid in missing])
+        db.execute(stmt.on_conflict_do_nothing(index_elements=["student_id", "subject_code"]))
+        rows.update(_lock_rows(db, {sid for _, sid in missing}))
+    for sid, code, net, _ in sorted(items, key=lambda item: str(item[3])):
+        row = rows[(str(sid), code)]
+        state = roll(_state(row) if row.sample_count else None, float(net), window)
+        for field, value in state.items():
+            setattr(row, field, value)
+        row.updated_at = now
+
+def _state(row: StudentSubjectStats) -> dict:
+    return {"recent_nets": row.recent_nets, "sample_count": row.sample_count, "best": row.best, "worst": row.worst}
+
+def rebuild_all(db: Session, window: int | None = None, batch_size: int = 1000) -> int:
+    window = window or settings.ROLLING_STATS_WINDOW
+    now = datetime.now(timezone.utc)
+    # Same sample order as apply_results(): entered_at, ties (one import) by result id.
+    stmt = (select(TrialResult.student_id, TrialResultSubject.subject_code, TrialResultSubject.net)
+              .join(TrialResult, TrialResult.id == TrialResultSubject.trial_result_id)
+              .order_by(TrialResult.student_id, TrialResultSubject.subject_code, TrialResult.entered_at, TrialResult.id)
+              .execution_options(yield_per=5000))
+    db.execute(delete(StudentSubjectStats))
+    batch, written = [], 0
+    key, state = None, None
+    def flush_state():
+        if state is not None:
+            batch.append({"student_id": key[0], "subject_code": key[1], **state, "updated_at": now})
+    for sid, code, net in db.execute(stmt):
+        if (sid, code) != key:
+            flush_state()
+            key, state = (sid, code), None
+            if len(batch) >= batch_size:
+                db.execute(insert(StudentSubjectStats), batch)
+                written += len(batch)
+                batch = []
+        state = roll(state, float(net), window)
+    flush_state()
+    if batch:
+        db.execute(insert(StudentSubjectStats), batch)
+        written += len(batch)
+    return written
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m app.subject_stats rebuild")
+    from .db import SessionLocal
+    with SessionLocal() as db:
+        n = rebuild_all(db)
+        db.commit()
+    print(f"rebuilt {n} student_subject_stats rows")
@@ -0,0 +1,82 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .cache import TTLCache
+from .config import settings
+from .models import SubjectsConfig
+
+class GradeValidator:
+    # Compiled per_grade entry of one subjects_config row: max questions per
+    # subject and the penalty as a plain float. Immutable; shared across requests.
+    __slots__ = ("config_id", "grade", "penalty", "max_questions", "subjects")
+
+    def __init__(self, config_id, grade, per_grade: dict, penalty: float):
+        self.config_id = config_id
+        self.grade = grade
+        self.penalty = float(penalty)
+        self.max_questions = {code: int((spec or {}).get("max", 0)) for code, spec in per_grade.items()}
+        self.subjects = frozenset(code for code, maxq in self.max_questions.items() if maxq > 0)
+
+    def score(self, subjects) -> dict:
+        # subjects: iterable of (subject_code, correct, wrong, blank).
+        # Raises ValueError with the same machine-readable codes the API returns.
+        correct_total = wrong_total = blank_total = 0
+        net_total = 0.0
+        seen = set()
+        out = []
+        for scode, correct, wrong, blank in subjects:
+            if scode in seen:
+                raise ValueError(f"duplicate_subject:{scode}")
+            seen.add(scode)
+            maxq = self.max_questions.get(scode, 0)
+            if maxq <= 0:
+                raise ValueError(f"subject_not_allowed:{scode}")
+            if min(correct, wrong, blank) < 0:
+                raise ValueError(f"negative_value:{scode}")
+            if (correct + wrong + blank) != maxq:
+                raise ValueError(f"invalid_total:{scode}:{maxq}")
+            net = float(correct - (wrong * self.penalty))
+            correct_total += correct
+            wrong_total += wrong
+            blank_total += blank
+            net_total += net
+            out.append({"subject_code": scode, "correct": correct, "wrong": wrong, "blank": blank, "net": round(net, 3)})
+        return {"correct_total": correct_total, "wrong_total": wrong_total, "blank_total": blank_total,
+                "net_total": round(net_total, 3), "subjects": out}
+
+# (config_id, grade) -> GradeValidator; grades the config does not cover are cached
+# as validators without subjects.
+validator_cache = TTLCache("subjects_config", 512, settings.SUBJECTS_CONFIG_CACHE_TTL_SECONDS)
+
+def get_validator(db: Session, config_id, grade: int) -> GradeValidator:
+    key = (str(config_id), int(grade))
+    validator = validator_cache.get(key)
+    if validator is None:
+        conf = db.query(SubjectsConfig).filter(SubjectsConfig.id == config_id).first()
+        if not conf:
+            raise ValueError("subjects_config_missing")
+        per_grade = conf.per_grade or {}
+        for g in {int(g) for g in per_grade} | {key[1]}:
+            compiled = GradeValidator(conf.id, g, per_grade.get(str(g)) or {}, conf.penalty_factor)
+            validator_cache.set((key[0], compiled.grade), compiled)
+            if compiled.grade == key[1]:
+                validator = compiled
+    if not validator.subjects:
+        raise ValueError("subjects_config_grade_missing")
+    return validator
+
+def invalidate_config(config_id) -> None:
+    config_id = str(config_id)
+    validator_cache.pop_where(lambda v: str(v.config_id) == config_id)
+
+@event.listens_for(SubjectsConfig, "after_update")
+@event.listens_for(SubjectsConfig, "after_delete")
+def _config_changed(mapper, connection, target):
+    invalidate_config(target.id)
+
+@event.listens_for(Session, "do_orm_execute")
+def _config_statement(state):
+    # update()/delete() run through a Session skip the per-object events above and
+    # may match any number of rows, so drop every cached validator. Statements sent
+    # on a bare Connection or from psql are not seen; those wait out the TTL.
+    if (state.is_update or state.is_delete) and state.statement.table.name == SubjectsConfig.__tablename__:
+        validator_cache.clear()
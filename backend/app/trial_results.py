@@ -0,0 +1,109 @@
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .models import TrialResult, TrialResultSubject
+from .subjects_config import GradeValidator
+from .subject_stats import apply_results
+
+def score_subjects(per_grade: dict, penalty: float, subjects) -> dict:
+    # Uncached convenience wrapper; entry paths use subjects_config.get_validator().
+    return GradeValidator(None, None, per_grade, penalty).score(subjects)
+
+def check_entry(student, exam, subjects, *, validator_for, is_rooter: bool, scope=None, existing=frozenset()) -> dict:
+    # Shared by single entry, the class-grid batch and the CSV import. `validator_for(grade)`
+    # returns the exam's compiled GradeValidator; `existing` holds (student_id, exam_id)
+    # pairs that already have a result. Returns a row for insert_results() or raises ValueError.
+    if not student:
+        raise ValueError("student_not_found")
+    if not exam:
+        raise ValueError("exam_not_found")
+    if exam.is_finalized and not is_rooter:
+        raise ValueError("finalized")
+    if scope is not None and not scope.allows(student.grade, student.class_section):
+        raise ValueError("out_of_scope")
+    if (student.id, exam.id) in existing:
+        raise ValueError("already_exists")
+    return {"student_id": student.id, "trial_exam_id": exam.id,
+            **validator_for(student.grade).score(subjects)}
+
+def insert_results(db: Session, rows: list[dict], entered_by, batch_size: int = 500) -> list:
+    # rows: [{"student_id", "trial_exam_id", **score_subjects(...)}]. Writes headers and
+    # subject rows with multi-row INSERTs; the caller owns the transaction.
+    now = datetime.now(timezone.utc)
+    ids = []
+    for start in range(0, len(rows), batch_size):
+        chunk = rows[start:start + batch_size]
+        headers, subjects = [], []
+        for r in chunk:
+            rid = uuid.uuid4()
+            ids.append(rid)
+            headers.append({"id": rid, "student_id": r["student_id"], "trial_exam_id": r["trial_exam_id"],
+                            "correct_total": r["correct_total"], "wrong_total": r["wrong_total"],
+                            "blank_total": r["blank_total"], "net_total": r["net_total"],
+                            "entered_by": entered_by, "entered_at": now})
+            for s in r["subjects"]:
+                subjects.append({"id": uuid.uuid4(), "trial_result_id": rid, **s})
+        db.execute(insert(TrialResult), headers)
+        if subjects:
+            db.execute(insert(TrialResultSubject), subjects)
+    return ids
+
+def insert_new_results(db: Session, rows: list[dict], entered_by, batch_size: int = 500,
+                       attempts: int = 3) -> tuple[list, list, list]:
+    # insert_results() + apply_results() under a savepoint. check_entry() only sees
+    # results committed before the request started; when a concurrent entry takes a
+    # (student, exam) pair first, UNIQUE(student_id, trial_exam_id) fails the INSERT,
+    # the pairs that now exist are set aside and the rest retried.
+    # Returns (ids, inserted rows, rows that already had a result).
+    taken = []
+    for attempt in range(attempts):
+        try:
+            with db.begin_nested():
+                ids = insert_results(db, rows, entered_by, batch_size)
+                apply_results(db, [(r["student_id"], so["subject_code"], so["net"], rid)
+                                   for rid, r in zip(ids, rows) for so in r["subjects"]])
+            return ids, rows, taken
+        except IntegrityError:
+            pairs = {(r["student_id"], r["trial_exam_id"]) for r in rows}
+            existing = set(db.query(TrialResult.student_id, TrialResult.trial_exam_id)
+                             .filter(TrialResult.student_id.in_({sid for sid, _ in pairs}),
+                                     TrialResult.trial_exam_id.in_({eid for _, eid in pairs})).all()) & pairs
+            if not existing or attempt == attempts - 1:
+                raise
+            taken += [r for r in rows if (r["student_id"], r["trial_exam_id"]) in existing]
+            rows = [r for r in rows if (r["student_id"], r["trial_exam_id"]) not in existing]
+    return [], rows, taken
+
+def load_trial_history(db: Session, student_id, newest_first: bool = False) -> list[dict]:
+    # Headers and all subject rows for one student in exactly two queries.
+    order = TrialResult.entered_at.desc() if newest_first else TrialResult.entered_at.asc()
+    results = db.query(TrialResult).filter(TrialResult.student_id == student_id).order_by(order).all()
+    if not results:
+        return []
+    subjects: dict = {}
+    rows = (db.query(TrialResultSubject)
+              .join(TrialResult, TrialResultSubject.trial_result_id == TrialResult.id)
+              .filter(TrialResult.student_id == student_id)
+              .order_by(TrialResultSubject.subject_code.asc())
+              .all())
+    for s in rows:
+        subjects.setdefault(s.trial_result_id, []).append({
+            "subject_code": s.subject_code,
+            "correct": int(s.correct),
+            "wrong": int(s.wrong),
+            "blank": int(s.blank),
+            "net": float(s.net),
+        })
+    return [{
+        "id": str(r.id),
+        "student_id": str(r.student_id),
+        "trial_exam_id": str(r.trial_exam_id),
+        "correct_total": int(r.correct_total),
+        "wrong_total": int(r.wrong_total),
+        "blank_total": int(r.blank_total),
+        "net_total": float(r.net_total),
+        "entered_at": r.entered_at.isoformat() if r.entered_at else None,
+        "subjects": subjects.get(r.id, []),
+    } for r in results]
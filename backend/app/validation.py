@@ -0,0 +1,67 @@
+import re
+from email_validator import validate_email, EmailNotValidError
+
+# Field rules from validation_rules.md. Validators raise ValueError with a
+# machine-readable code so import rejects and API errors read the same.
+
+PHONE_RE = re.compile(r"^(\+[1-9]\d{7,14}|05\d{9})$")
+SECTION_RE = re.compile(r"^([5-8])/([A-ZÇĞİÖŞÜ])$")
+STUDENT_STATUSES = ("active", "inactive", "graduated")
+
+def validate_full_name(value: str) -> str:
+    value = " ".join((value or "").split())
+    if not (2 <= len(value) <= 120):
+        raise ValueError("full_name_length")
+    if not all(c.isalpha() or c == " " for c in value):
+        raise ValueError("full_name_invalid_chars")
+    return value
+
+def validate_grade(value) -> int:
+    try:
+        grade = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("grade_not_integer")
+    if not (5 <= grade <= 8):
+        raise ValueError("grade_out_of_range")
+    return grade
+
+def validate_class_section(value: str, grade: int) -> str:
+    value = (value or "").strip()
+    m = SECTION_RE.match(value)
+    if not m:
+        raise ValueError("class_section_invalid")
+    if int(m.group(1)) != grade:
+        raise ValueError("class_section_grade_mismatch")
+    return value
+
+def validate_phone(value: str | None) -> str | None:
+    value = (value or "").replace(" ", "")
+    if not value:
+        return None
+    if not PHONE_RE.match(value):
+        raise ValueError("guardian_phone_invalid")
+    return value
+
+def validate_email_optional(value: str | None) -> str | None:
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return validate_email(value, check_deliverability=False).normalized
+    except EmailNotValidError:
+        raise ValueError("guardian_email_invalid")
+
+def validate_student_row(row: dict) -> dict:
+    grade = validate_grade(row.get("grade"))
+    status = (row.get("status") or "active").strip()
+    if status not in STUDENT_STATUSES:
+        raise ValueError("status_invalid")
+    return {
+        "full_name": validate_full_name(row.get("full_name")),
+        "grade": grade,
+        "class_section": validate_class_section(row.get("class_section"), grade),
+        "guardian_name": (row.get("guardian_name") or "").strip() or None,
+        "guardian_phone": validate_phone(row.get("guardian_phone")),
+        "guardian_email": validate_email_optional(row.get("guardian_email")),
+        "status": status,
+    }
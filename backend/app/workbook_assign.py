@@ -0,0 +1,45 @@
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import exists, insert
+from sqlalchemy.orm import Session
+from .models import Student, StudentWorkbook
+
+def resolve_targets(db: Session, workbook_id, *, grade=None, class_section=None, student_ids=None, scope=None):
+    # One query: the candidate students plus whether each already has the workbook.
+    # `scope` is a ScopeSet (None = unrestricted). Explicit lists are checked against the
+    # scope in Python so out-of-scope ids can be reported instead of silently dropped.
+    already = exists().where(StudentWorkbook.student_id == Student.id, StudentWorkbook.workbook_id == workbook_id)
+    q = db.query(Student.id, Student.grade, Student.class_section, already.label("assigned"))
+    if student_ids is not None:
+        q = q.filter(Student.id.in_(student_ids))
+    else:
+        q = q.filter(Student.grade == grade, Student.status == "active")
+        if class_section:
+            q = q.filter(Student.class_section == class_section)
+        if scope is not None:
+            q = q.filter(scope.sql_filter())
+    summary = {"matched": 0, "skipped_existing": 0, "not_found": 0, "out_of_scope": 0}
+    targets = []
+    for r in q.all():
+        if scope is not None and not scope.allows(r.grade, r.class_section):
+            summary["out_of_scope"] += 1
+            continue
+        summary["matched"] += 1
+        if r.assigned:
+            summary["skipped_existing"] += 1
+        else:
+            targets.append(r.id)
+    if student_ids is not None:
+        summary["not_found"] = len(set(student_ids)) - summary["matched"] - summary["out_of_scope"]
+    return targets, summary
+
+def insert_assignments(db: Session, workbook_id, student_ids: list, assigned_by, target_date=None,
+                       batch_size: int = 500) -> int:
+    # Multi-row INSERTs; the caller owns the transaction.
+    now = datetime.now(timezone.utc)
+    for start in range(0, len(student_ids), batch_size):
+        db.execute(insert(StudentWorkbook), [
+            {"id": uuid.uuid4(), "student_id": sid, "workbook_id": workbook_id, "assigned_by": assigned_by,
+             "assigned_at": now, "target_date": target_date, "status": "assigned", "progress_percent": 0}
+            for sid in student_ids[start:start + batch_size]])
+    return len(student_ids)
@@ -0,0 +1 @@
+# Load and latency benchmarks for the hot API paths; run with `python -m bench --help`.
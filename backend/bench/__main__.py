@@ -0,0 +1,193 @@
+import argparse, json, os, random, re, subprocess, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Query counts come from the profiler's Server-Timing header, so it has to be on
+# before the app is imported (in-process mode) or on the target server (--base-url).
+os.environ.setdefault("SQL_PROFILING", "1")
+
+from .stats import summarize, compare, save_baseline, load_baseline
+from .seed import BENCH_USERNAME, BENCH_PASSWORD, is_seeded, seed, load_fixture
+
+SERVER_TIMING = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+def _csrf(client) -> dict:
+    from app.config import settings
+    return {"X-CSRF-Token": client.cookies.get(settings.CSRF_COOKIE_NAME) or ""}
+
+def _login(client):
+    return client.post("/auth/login", json={"username": BENCH_USERNAME, "password": BENCH_PASSWORD})
+
+# Each scenario takes (client, fixture, i, rng) and returns the response of one request.
+
+def sc_login(client, fx, i, rng):
+    return _login(client)
+
+def sc_students_page(client, fx, i, rng):
+    # Walks the keyset pages; restarts from the first page when the walk ends.
+    cursor = fx.get("_cursor")
+    r = client.get("/students", params={"page_size": 50, "total": "cached", **({"cursor": cursor} if cursor else {})})
+    fx["_cursor"] = r.json().get("next_cursor") if r.status_code == 200 else None
+    return r
+
+def sc_students_search(client, fx, i, rng):
+    terms = fx["search_terms"]
+    return client.get("/students", params={"q": terms[i % len(terms)], "page_size": 20, "total": "cached"})
+
+def sc_trial_history(client, fx, i, rng):
+    ids = fx["student_ids"]
+    return client.get(f"/students/{ids[i % len(ids)]}/trials")
+
+def sc_result_entry(client, fx, i, rng):
+    student_id, exam_id, grade = fx["entry_targets"].pop()
+    subjects = []
+    for code, maxq in fx["max_questions"][grade].items():
+        correct = rng.randint(0, maxq)
+        wrong = rng.randint(0, maxq - correct)
+        subjects.append({"subject_code": code, "correct": correct, "wrong": wrong, "blank": maxq - correct - wrong})
+    return client.post("/trial-results", json={"student_id": student_id, "trial_exam_id": exam_id, "subjects": subjects},
+                       headers=_csrf(client))
+
+def sc_outcome_toggle(client, fx, i, rng):
+    books, outcomes = fx["book_ids"], fx["outcome_ids"]
+    items = [{"outcome_id": o, "checked": rng.random() < 0.7} for o in rng.sample(outcomes, min(3, len(outcomes)))]
+    return client.post("/resource-books/outcomes/toggle",
+                       json={"books": [{"resource_book_id": books[i % len(books)], "items": items}]},
+                       headers=_csrf(client))
+
+SCENARIOS = {
+    "login": sc_login,
+    "students_page": sc_students_page,
+    "students_search": sc_students_search,
+    "trial_history": sc_trial_history,
+    "result_entry": sc_result_entry,
+    "outcome_toggle": sc_outcome_toggle,
+}
+
+def run_scenario(client, fn, fx, requests: int, concurrency: int, warmup: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    for i in range(warmup):
+        fn(client, fx, i, rng)
+    latencies, queries, errors = [], [], 0
+
+    def one(i):
+        started = time.perf_counter()
+        r = fn(client, fx, warmup + i, random.Random(seed + i))
+        return time.perf_counter() - started, r
+
+    wall = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(one, range(requests)))
+    else:
+        outcomes = [one(i) for i in range(requests)]
+    wall = time.perf_counter() - wall
+    for elapsed, r in outcomes:
+        latencies.append(elapsed)
+        if r.status_code >= 400:
+            errors += 1
+        m = SERVER_TIMING.search(r.headers.get("server-timing", ""))
+        if m:
+            queries.append(int(m.group(1)))
+    return summarize(latencies, queries, wall, errors)
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _client(base_url: str | None):
+    if base_url:
+        import httpx
+        return httpx.Client(base_url=base_url, timeout=60)
+    from fastapi.testclient import TestClient
+    from app import auth
+    from app.main import app
+    from app.ratelimit import TokenBucketLimiter
+    # In-process the login scenario would otherwise trip the login rate limiter.
+    auth.login_ip_limiter = TokenBucketLimiter("login_ip", 10**9, 1)
+    auth.login_user_limiter = TokenBucketLimiter("login_user", 10**9, 1)
+    return TestClient(app)
+
+def cmd_seed(args):
+    from app.db import Base, SessionLocal, engine
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if is_seeded(db):
+            print(f"already seeded (teacher '{BENCH_USERNAME}' exists)")
+            return 0
+        started = time.perf_counter()
+        try:
+            counts = seed(db, students=args.students, years=args.years, exams_per_year=args.exams_per_year,
+                          seed=args.seed)
+        except ValueError as e:
+            sys.exit(str(e))
+    print(json.dumps(counts), f"in {time.perf_counter() - started:.1f}s")
+    return 0
+
+def cmd_run(args):
+    from app.db import SessionLocal
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        sys.exit(f"unknown scenarios: {', '.join(unknown)} (known: {', '.join(SCENARIOS)})")
+    with SessionLocal() as db:
+        if not is_seeded(db):
+            sys.exit("no benchmark data; run `python -m bench seed` first")
+        fixture = load_fixture(db, limit=max(args.requests + args.warmup, 50))
+    client = _client(args.base_url)
+    with client:
+        r = _login(client)
+        if r.status_code != 200:
+            sys.exit(f"login failed: {r.status_code} {r.text}")
+        results = {}
+        for name in names:
+            if name == "result_entry" and len(fixture["entry_targets"]) < args.requests + args.warmup:
+                print(f"skipping {name}: not enough students without a result on the open exams (re-seed)")
+                continue
+            results[name] = run_scenario(client, SCENARIOS[name], fixture, args.requests, args.concurrency,
+                                         args.warmup, args.seed)
+            s = results[name]
+            print(f"{name:16} p50 {s['p50_ms']:8.2f}ms  p95 {s['p95_ms']:8.2f}ms  p99 {s['p99_ms']:8.2f}ms  "
+                  f"{s['rps']:8.1f} req/s  queries {s['queries_mean']}  errors {s['errors']}")
+    result = {"meta": {"date": datetime.now(timezone.utc).isoformat(timespec="seconds"), "git": _git_rev(),
+                       "target": args.base_url or "in-process", "requests": args.requests,
+                       "concurrency": args.concurrency, "warmup": args.warmup},
+              "scenarios": results}
+    if args.save:
+        print("saved", save_baseline(args.save, result))
+    if args.compare:
+        rows = compare(result, load_baseline(args.compare), args.tolerance)
+        for row in rows:
+            flag = "REGRESSED" if row["regressed"] else "ok"
+            print(f"{row['scenario']:16} p95 {row['baseline_p95_ms']:8.2f} -> {row['p95_ms']:8.2f}ms "
+                  f"({row['p95_delta']:+.0%})  queries {row['baseline_queries_mean']} -> {row['queries_mean']}  {flag}")
+        if any(row["regressed"] for row in rows):
+            return 1
+    return 0
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench", description="Seed benchmark data and time the hot endpoints.")
+    sub = p.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("seed", help="load the deterministic benchmark dataset (an app.datagen school)")
+    s.add_argument("--students", type=int, default=2000)
+    s.add_argument("--years", type=int, default=2, help="academic years of exam history")
+    s.add_argument("--exams-per-year", type=int, default=8)
+    s.add_argument("--seed", type=int, default=42)
+    r = sub.add_parser("run", help="run scenarios and report latency percentiles, throughput and query counts")
+    r.add_argument("--scenarios", help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    r.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    r.add_argument("--warmup", type=int, default=10)
+    r.add_argument("--concurrency", type=int, default=1)
+    r.add_argument("--base-url", help="drive a running server instead of the app in-process")
+    r.add_argument("--seed", type=int, default=42)
+    r.add_argument("--save", metavar="NAME", help="store the result as bench/baselines/NAME.json")
+    r.add_argument("--compare", metavar="NAME", help="compare against a stored baseline; exit 1 on regression")
+    r.add_argument("--tolerance", type=float, default=0.15, help="allowed relative p95 growth (default 0.15)")
+    args = p.parse_args(argv)
+    return cmd_seed(args) if args.command == "seed" else cmd_run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import random, uuid
+from datetime import date, datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import datagen
+from app.models import Teacher, TeacherScope, SubjectsConfig, Student, TrialExam, TrialResult, ResourceBook, SubjectOutcome
+from app.security import hash_password
+
+# Benchmark dataset: an app.datagen school (teachers bench_t0001...) plus what the
+# scenarios need on top of it: the `bench` login scoped to every grade, and one open
+# exam per grade without results for the entry scenario. Generated as of a fixed
+# date so a seed gives the same data whenever it is run. Everything is keyed off
+# BENCH_USERNAME, so seeding is skipped when that teacher already exists.
+
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "Bench-pass-2025!"
+BENCH_PREFIX = "bench"
+AS_OF = date(2026, 6, 1)
+
+def is_seeded(db: Session) -> bool:
+    return db.execute(select(Teacher.id).where(Teacher.username == BENCH_USERNAME)).first() is not None
+
+def seed(db: Session, students: int = 2000, years: int = 2, exams_per_year: int = 8, seed: int = 42) -> dict:
+    # datagen also seeds missing outcomes and rebuilds student_subject_stats.
+    counts = datagen.generate(db, seed=seed, students=students, years=years, exams_per_year=exams_per_year,
+                              password=BENCH_PASSWORD, prefix=BENCH_PREFIX, as_of=AS_OF)
+    now = datetime.now(timezone.utc)
+    conf = db.execute(select(SubjectsConfig).where(SubjectsConfig.name == datagen.CONFIG_NAME)).scalars().one()
+    teacher = Teacher(id=uuid.uuid4(), full_name="Bench Öğretmen", email="bench@example.edu.tr",
+                      username=BENCH_USERNAME, password_hash=hash_password(BENCH_PASSWORD),
+                      must_change_password=False, status="active")
+    db.add(teacher)
+    db.flush()
+    db.add_all([TeacherScope(teacher_id=teacher.id, grade=g, class_section=None) for g in range(5, 9)])
+    for grade in range(5, 9):
+        # Open exam without results: the entry scenario writes into these.
+        db.add(TrialExam(id=uuid.uuid4(), name=f"Bench Açık {grade}", source="bench-open", date=AS_OF,
+                         grade_scope=[grade], subjects_config_id=conf.id, is_finalized=False, created_at=now))
+    db.commit()
+    return {**counts, "open_exams": 4}
+
+def load_fixture(db: Session, limit: int = 500) -> dict:
+    # Ids the scenarios draw from; fresh per run so the entry scenario only targets
+    # students that have no result for the open exam yet.
+    rng = random.Random(7)
+    students = db.execute(select(Student.id, Student.grade).order_by(Student.id).limit(limit * 4)).all()
+    open_exams = {scope[0]: eid for scope, eid in db.execute(
+        select(TrialExam.grade_scope, TrialExam.id).where(TrialExam.source == "bench-open"))}
+    entered = {sid for (sid,) in db.execute(select(TrialResult.student_id)
+                                            .where(TrialResult.trial_exam_id.in_(list(open_exams.values()))))}
+    books = db.execute(select(ResourceBook.id).where(ResourceBook.subject_code == "MAT")
+                       .order_by(ResourceBook.id).limit(limit)).scalars().all()
+    outcomes = db.execute(select(SubjectOutcome.id).where(SubjectOutcome.subject_code == "MAT")).scalars().all()
+    names = db.execute(select(Student.full_name).order_by(Student.id).limit(200)).scalars().all()
+    terms = sorted({n.split()[0][:4] for n in names})
+    rng.shuffle(terms)
+    per_grade = db.execute(select(SubjectsConfig.per_grade)
+                           .where(SubjectsConfig.name == datagen.CONFIG_NAME)).scalar_one()
+    return {
+        "student_ids": [str(sid) for sid, _ in students[:limit]],
+        "entry_targets": [(str(sid), str(open_exams[g]), g) for sid, g in students
+                          if g in open_exams and sid not in entered][:limit],
+        "max_questions": datagen.grade_max_questions(per_grade),
+        "book_ids": [str(b) for b in books],
+        "outcome_ids": [str(o) for o in outcomes],
+        "search_terms": terms,
+    }
@@ -0,0 +1,54 @@
+import json, math, os
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+def percentile(sorted_values: list, p: float) -> float:
+    # Nearest-rank percentile of an already sorted list.
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies: list[float], queries: list[int], wall_seconds: float, errors: int = 0) -> dict:
+    # latencies in seconds; reported in milliseconds.
+    lat = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2)
+    return {
+        "requests": len(lat), "errors": errors,
+        "p50_ms": ms(percentile(lat, 50)), "p95_ms": ms(percentile(lat, 95)), "p99_ms": ms(percentile(lat, 99)),
+        "mean_ms": ms(sum(lat) / len(lat)) if lat else 0.0, "max_ms": ms(lat[-1]) if lat else 0.0,
+        "rps": round(len(lat) / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+        "queries_mean": round(sum(queries) / len(queries), 2) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.15) -> list[dict]:
+    # One row per scenario present in both runs. A scenario regresses when p95 grows by
+    # more than `tolerance` (relative) or it issues more queries per request than before.
+    rows = []
+    for name, cur in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base:
+            continue
+        delta = (cur["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        more_queries = (cur.get("queries_mean") or 0) > (base.get("queries_mean") or 0) + 0.01
+        rows.append({"scenario": name, "p95_ms": cur["p95_ms"], "baseline_p95_ms": base["p95_ms"],
+                     "p95_delta": round(delta, 3), "queries_mean": cur.get("queries_mean"),
+                     "baseline_queries_mean": base.get("queries_mean"),
+                     "regressed": delta > tolerance or more_queries})
+    return rows
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def save_baseline(name: str, result: dict) -> str:
+    path = baseline_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+def load_baseline(name: str) -> dict:
+    with open(baseline_path(name), encoding="utf-8") as f:
+        return json.load(f)
@@ -1,9 +1,53 @@
-import os, sys, pytest
+import os, sys, uuid, pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace as NS
 from fastapi.testclient import TestClient
+from starlette.requests import Request
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from app.main import app
+from app.rbac import ScopeSet
+from app.session_cache import Principal, session_cache
 
 @pytest.fixture(scope="session")
 def client():
     return TestClient(app)
+
+@pytest.fixture()
+def sqlite_db():
+    # Lightweight stand-in for Postgres; tables using PG-only types (ARRAY) are skipped.
+    from sqlalchemy import create_engine, event, ARRAY
+    from sqlalchemy.orm import sessionmaker
+    from app.db import Base
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _register_functions(conn, record):
+        conn.create_function("translate", 3, lambda s, a, b: None if s is None else s.translate(str.maketrans(a, b)),
+                             deterministic=True)
+    tables = [t for t in Base.metadata.sorted_tables if not any(isinstance(c.type, ARRAY) for c in t.columns)]
+    Base.metadata.create_all(engine, tables=tables)
+    db = sessionmaker(bind=engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+        engine.dispose()
+
+@pytest.fixture()
+def session_request():
+    # For calling handlers directly: returns a factory for Requests whose session
+    # cookie resolves, through the session cache, to the given user (a rooter by default).
+    sids = []
+
+    def make(user=None, role="rooter", scopes=()):
+        sid = str(uuid.uuid4())
+        user = user or NS(id=uuid.uuid4(), username="rooter")
+        sess = NS(id=sid, expires_at=datetime.now(timezone.utc) + timedelta(hours=1))
+        session_cache.set(sid, Principal(user=user, session=sess, role=role, scopes=ScopeSet(list(scopes))))
+        sids.append(sid)
+        return Request({"type": "http", "method": "POST", "path": "/", "client": ("10.0.0.9", 1),
+                        "headers": [(b"cookie", f"lgs_session={sid}".encode())]})
+    yield make
+    for sid in sids:
+        session_cache.pop(sid)
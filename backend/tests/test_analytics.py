@@ -0,0 +1,43 @@
+import math
+import uuid
+from app.analytics import ExamFrame, compute_exam_analytics, load_exam_frame
+from app.models import Student, TrialResult, TrialResultSubject
+
+def _frame():
+    nan = math.nan
+    return ExamFrame("e1", ["s1", "s2", "s3", "s4"], ["A", "B", "C", "D"], [8, 8, 8, 7],
+                     ["8/A", "8/A", "8/B", "7/A"], [50.0, 70.0, 70.0, 30.0], ["MAT", "TR"],
+                     [[10.0, 12.0], [15.0, 18.0], [20.0, nan], [5.0, 8.0]])
+
+def test_ranks_percentiles_and_groups():
+    out = compute_exam_analytics(_frame(), bins=4)
+    by_id = {s["student_id"]: s for s in out["students"]}
+    assert [s["student_id"] for s in out["students"]][:2] == ["s2", "s3"]
+    assert by_id["s2"]["rank"] == by_id["s3"]["rank"] == 1
+    assert by_id["s1"]["rank"] == 3 and by_id["s4"]["rank"] == 4
+    assert by_id["s4"]["percentile"] == 12.5
+    assert by_id["s1"]["section_rank"] == 2
+    assert "TR" not in by_id["s3"]["subjects"]
+    assert out["grades"]["8"]["count"] == 3
+    assert out["sections"]["8/B"]["subjects"] == {"MAT": 20.0, "TR": None}
+    assert out["per_subject"]["TR"]["count"] == 3
+    assert sum(out["histogram"]["counts"]) == 4
+
+def test_empty_exam():
+    frame = ExamFrame("e2", [], [], [], [], [], [], [])
+    out = compute_exam_analytics(frame)
+    assert out["participants"] == 0 and out["students"] == []
+
+def test_load_exam_frame_pivots_subject_rows(sqlite_db):
+    exam_id = uuid.uuid4()
+    st = Student(id=uuid.uuid4(), full_name="Elif Demir", grade=8, class_section="8/B")
+    tr = TrialResult(id=uuid.uuid4(), student_id=st.id, trial_exam_id=exam_id, net_total=25,
+                     entered_by=uuid.uuid4())
+    sqlite_db.add_all([st, tr,
+                       TrialResultSubject(id=uuid.uuid4(), trial_result_id=tr.id, subject_code="TR", net=12),
+                       TrialResultSubject(id=uuid.uuid4(), trial_result_id=tr.id, subject_code="MAT", net=13)])
+    sqlite_db.commit()
+    frame = load_exam_frame(sqlite_db, exam_id)
+    assert frame.subjects == ["MAT", "TR"]
+    assert frame.nets.tolist() == [[13.0, 12.0]]
+    assert frame.totals.tolist() == [25.0]
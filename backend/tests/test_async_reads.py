@@ -0,0 +1,60 @@
+import asyncio, uuid
+from datetime import datetime, timedelta, timezone
+from starlette.requests import Request
+from app import async_reads
+from app.main import app
+from app.models import Teacher, Session, Workbook, AuditLog
+from app.rbac import ScopeSet
+from app.session_cache import Principal, session_cache
+
+class FakeAsyncSession:
+    # AsyncSession.run_sync() hands the wrapped sync Session to fn; that is all the routes use.
+    def __init__(self, sync):
+        self.sync = sync
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.sync, *args, **kwargs)
+
+def _request(sid):
+    return Request({"type": "http", "method": "GET", "path": "/", "client": ("10.0.0.9", 1),
+                    "headers": [(b"cookie", f"lgs_session={sid}".encode())]})
+
+def _principal(username):
+    user = Teacher(id=uuid.uuid4(), full_name="U", email=f"{username}@x", username=username, password_hash="x")
+    sess = Session(id=uuid.uuid4(), user_id=user.id, role="teacher", csrf_token="x",
+                   expires_at=datetime.now(timezone.utc) + timedelta(hours=1))
+    sid = str(sess.id)
+    session_cache.set(sid, Principal(user=user, session=sess, role="teacher", scopes=ScopeSet([])))
+    return sid
+
+def test_async_routes_shadow_sync_paths():
+    sync_paths = {(r.path, m) for r in app.routes if hasattr(r, "methods") for m in r.methods}
+    async_paths = {(r.path, m) for r in async_reads.router.routes for m in r.methods}
+    assert async_paths == {("/students", "GET"), ("/students/{id}/trials", "GET"), ("/trials", "GET"),
+                           ("/workbooks", "GET"), ("/audit", "GET")}
+    assert async_paths <= sync_paths
+
+def test_async_handlers_run_shared_reads(sqlite_db):
+    sqlite_db.add_all([Workbook(title="B", subject_code="MAT", grade=8), Workbook(title="A", subject_code="TR", grade=8),
+                       Workbook(title="C", subject_code="FEN", grade=7)])
+    sqlite_db.commit()
+    db = FakeAsyncSession(sqlite_db)
+    sid = _principal("teacher1")
+    items = asyncio.run(async_reads.list_workbooks(grade=8, request=_request(sid), db=db))
+    assert [w["title"] for w in items] == ["A", "B"]
+    session_cache.pop(sid)
+
+def test_async_audit_requires_rooter(sqlite_db):
+    import pytest
+    from fastapi import HTTPException
+    sqlite_db.add(AuditLog(id=uuid.uuid4(), actor_id=uuid.uuid4(), actor_role="rooter", action="login",
+                           entity_type="session", ts=datetime.now(timezone.utc)))
+    sqlite_db.commit()
+    db = FakeAsyncSession(sqlite_db)
+    teacher, rooter = _principal("teacher2"), _principal("rooter")
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(async_reads.audit_view(from_=None, request=_request(teacher), db=db))
+    assert e.value.status_code == 403
+    page = asyncio.run(async_reads.audit_view(from_=None, request=_request(rooter), db=db))
+    assert [a["action"] for a in page["items"]] == ["login"] and page["next_cursor"] is None
+    session_cache.pop(teacher); session_cache.pop(rooter)
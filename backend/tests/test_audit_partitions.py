@@ -0,0 +1,132 @@
+import gzip, re, uuid
+import pytest
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+from app import audit_partitions
+from app.audit_partitions import (add_months, month_floor, partition_name, archive_path, encode_row,
+                                  list_archives, iter_archived_rows, archive_partition, count_archive,
+                                  publish_orphans, ensure_partitions)
+from app.sessions import SessionJanitor, SessionTouches
+
+def test_month_arithmetic_and_names():
+    assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert month_floor(datetime(2026, 10, 18, 23, 59, tzinfo=timezone.utc)) == date(2026, 10, 1)
+    assert partition_name(date(2026, 3, 1)) == "audit_log_y2026m03"
+
+def _row(ts, action="login"):
+    return SimpleNamespace(id=uuid.uuid4(), actor_id=uuid.uuid4(), actor_role="teacher", action=action,
+                           entity_type="session", entity_id=None, ts=ts, before=None, after={"success": True},
+                           ip="10.0.0.1", user_agent="ua")
+
+def test_archives_are_read_back_by_range(tmp_path):
+    for month, rows in [(date(2024, 1, 1), [_row(datetime(2024, 1, 5, tzinfo=timezone.utc)),
+                                            _row(datetime(2024, 1, 20, tzinfo=timezone.utc), "logout")]),
+                        (date(2024, 2, 1), [_row(datetime(2024, 2, 2, tzinfo=timezone.utc))])]:
+        with gzip.open(archive_path(month, str(tmp_path)), "wt", encoding="utf-8") as f:
+            for r in rows:
+                f.write(encode_row(r) + "\n")
+    assert [a["month"] for a in list_archives(str(tmp_path))] == ["2024-01", "2024-02"]
+    all_rows = list(iter_archived_rows(archive_dir=str(tmp_path)))
+    assert len(all_rows) == 3 and all_rows[0]["after"] == {"success": True}
+    ranged = list(iter_archived_rows(datetime(2024, 1, 10), datetime(2024, 1, 31), archive_dir=str(tmp_path)))
+    assert [r["action"] for r in ranged] == ["logout"]
+
+class FakeDB:
+    # Just enough of a Session for archive_partition(): records statements and
+    # serves the partition's rows and count.
+    def __init__(self, rows, fail_commit_after_drop=False):
+        self.rows, self.fail = rows, fail_commit_after_drop
+        self.log = []
+
+    def execute(self, stmt):
+        sql = str(stmt)
+        self.log.append(sql.split()[0] + (" " + sql.split()[3] if sql.startswith("ALTER") else ""))
+        if "count(*)" in sql:
+            return SimpleNamespace(scalar=lambda: len(self.rows))
+        return iter(self.rows)
+
+    def commit(self):
+        if self.fail and "DROP" in self.log:
+            raise RuntimeError("connection lost")
+        self.log.append("COMMIT")
+
+    def rollback(self):
+        self.log.append("ROLLBACK")
+
+def test_archive_is_written_before_detach_and_published_after_commit(tmp_path):
+    month = date(2024, 1, 1)
+    rows = [_row(datetime(2024, 1, d, tzinfo=timezone.utc)) for d in (3, 9)]
+    db = FakeDB(rows)
+    assert archive_partition(db, month, str(tmp_path)) == 2
+    assert db.log == ["SELECT", "COMMIT", "SET", "ALTER DETACH", "SELECT", "DROP", "COMMIT"]
+    assert count_archive(archive_path(month, str(tmp_path))) == 2
+    assert [p.name for p in tmp_path.iterdir()] == ["audit_log_y2024m01.ndjson.gz"]
+
+def test_failed_drop_leaves_no_archive_and_retry_succeeds(tmp_path):
+    month = date(2024, 1, 1)
+    rows = [_row(datetime(2024, 1, 3, tzinfo=timezone.utc))]
+    with pytest.raises(RuntimeError):
+        archive_partition(FakeDB(rows, fail_commit_after_drop=True), month, str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+    assert archive_partition(FakeDB(rows), month, str(tmp_path)) == 1
+
+def test_existing_archive_is_reused_only_when_complete(tmp_path):
+    month = date(2024, 1, 1)
+    rows = [_row(datetime(2024, 1, d, tzinfo=timezone.utc)) for d in (3, 9)]
+    with gzip.open(archive_path(month, str(tmp_path)), "wt", encoding="utf-8") as f:
+        f.write(encode_row(rows[0]) + "\n")
+    db = FakeDB(rows)
+    with pytest.raises(FileExistsError):
+        archive_partition(db, month, str(tmp_path))
+    assert db.log[-1] == "ROLLBACK"
+    db = FakeDB(rows[:1])
+    assert archive_partition(db, month, str(tmp_path)) == 1
+    assert "DROP" in db.log
+
+def test_orphaned_tmp_is_published_once_its_partition_is_gone(tmp_path, monkeypatch):
+    for month in (date(2024, 1, 1), date(2024, 2, 1)):
+        with gzip.open(archive_path(month, str(tmp_path)) + ".tmp", "wt", encoding="utf-8") as f:
+            f.write(encode_row(_row(datetime(month.year, month.month, 2, tzinfo=timezone.utc))) + "\n")
+    monkeypatch.setattr(audit_partitions, "list_partitions", lambda db: [date(2024, 2, 1)])
+    assert publish_orphans(None, str(tmp_path)) == [archive_path(date(2024, 1, 1), str(tmp_path))]
+    assert [a["month"] for a in list_archives(str(tmp_path))] == ["2024-01"]
+
+class PartitionDB:
+    # A partitioned audit_log as far as ensure_partitions() can tell.
+    def __init__(self, partitions):
+        self.partitions = set(partitions)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, stmt):
+        sql = str(stmt)
+        if "relkind" in sql:
+            return SimpleNamespace(scalar=lambda: "p")
+        if "pg_inherits" in sql:
+            return SimpleNamespace(scalars=lambda: iter(sorted(self.partitions)))
+        self.partitions.add(re.search(r"CREATE TABLE IF NOT EXISTS (\w+)", sql).group(1))
+
+    def commit(self):
+        pass
+
+def test_janitor_keeps_partitions_ahead_of_a_long_running_process(monkeypatch):
+    db = PartitionDB([])
+    boot = datetime(2025, 1, 15, tzinfo=timezone.utc)
+    assert ensure_partitions(db, ahead=3, now=boot) == [partition_name(date(2025, m, 1)) for m in (1, 2, 3, 4)]
+
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2025, 7, 2, tzinfo=tz)
+    monkeypatch.setattr(audit_partitions, "datetime", Later)
+    monkeypatch.setattr(audit_partitions.settings, "AUDIT_PARTITIONS_AHEAD", 3)
+    janitor = SessionJanitor(lambda: db, SessionTouches(60, False, 60), reap_interval=0, batch_size=10,
+                             partition_interval=3600)
+    janitor.ensure_partitions()
+    assert janitor.errors == 0 and janitor.partitions_created == 4
+    assert {partition_name(date(2025, m, 1)) for m in range(7, 11)} <= db.partitions
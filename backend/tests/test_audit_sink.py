@@ -0,0 +1,104 @@
+import json, threading, time, uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace as NS
+from app.audit import AuditSink
+
+class FakeDB:
+    def __init__(self, sink_rows, fail, gate=None, entered=None):
+        self.sink_rows, self.fail, self.gate, self.entered = sink_rows, fail, gate, entered
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+    def execute(self, stmt, rows):
+        if self.fail:
+            raise RuntimeError("db_unreachable")
+        if self.gate is not None:
+            self.entered.set()
+            self.gate.wait()
+        self.sink_rows.append(list(rows))
+    def commit(self):
+        pass
+
+def _event(n=0):
+    return {"id": uuid.uuid4(), "actor_id": uuid.uuid4(), "actor_role": "teacher", "action": "create",
+            "entity_type": "student", "entity_id": None, "ts": datetime.now(timezone.utc),
+            "before": None, "after": {"n": n}, "ip": None, "user_agent": None}
+
+def _sink(tmp_path, batches, fail=False, gate=None, entered=None, **kw):
+    opts = dict(batch_size=50, flush_interval=0.05, queue_max=200, backpressure="block",
+                block_timeout=0.01, fallback_path=str(tmp_path / "audit.ndjson"))
+    opts.update(kw)
+    return AuditSink(lambda: FakeDB(batches, fail, gate, entered), **opts)
+
+def _blocked_sink(tmp_path, batches):
+    # The writer thread takes the first event and hangs in execute() until the gate
+    # opens, so everything submitted afterwards is still queued when stop() runs.
+    gate, entered = threading.Event(), threading.Event()
+    sink = _sink(tmp_path, batches, gate=gate, entered=entered)
+    sink.submit(_event(0))
+    assert entered.wait(5)
+    for i in range(1, 121):
+        sink.submit(_event(i))
+    assert sink.pending() == 120
+    return sink, gate
+
+def test_sink_flushes_in_batches_on_stop(tmp_path):
+    batches = []
+    sink, gate = _blocked_sink(tmp_path, batches)
+    threading.Timer(0.1, gate.set).start()
+    sink.stop(timeout=5)
+    assert sum(len(b) for b in batches) == 121
+    assert max(len(b) for b in batches) <= 50
+    assert sink.written == 121 and sink.pending() == 0
+
+def test_sink_stop_spills_when_writer_is_stuck(tmp_path):
+    batches = []
+    sink, gate = _blocked_sink(tmp_path, batches)
+    try:
+        sink.stop(timeout=0.1)
+        lines = (tmp_path / "audit.ndjson").read_text().splitlines()
+        assert len(lines) == 120 and sink.pending() == 0
+    finally:
+        gate.set()
+
+def test_sink_spills_to_fallback_and_replays(tmp_path):
+    sink = _sink(tmp_path, [], fail=True)
+    sink.submit(_event())
+    sink.stop()
+    lines = (tmp_path / "audit.ndjson").read_text().splitlines()
+    assert len(lines) == 1 and json.loads(lines[0])["after"] == {"n": 0}
+
+    batches = []
+    replayed = _sink(tmp_path, batches).replay_fallback()
+    assert replayed == 1
+    assert isinstance(batches[0][0]["actor_id"], uuid.UUID)
+    assert not (tmp_path / "audit.ndjson").exists()
+
+def test_sink_drop_backpressure(tmp_path):
+    sink = _sink(tmp_path, [], queue_max=1, backpressure="drop")
+    sink._thread = NS(is_alive=lambda: True)  # pretend running so nothing drains the queue
+    sink.submit(_event()); sink.submit(_event())
+    assert sink.dropped == 1 and sink.pending() == 1
+
+def test_sink_survives_unwritable_fallback(tmp_path):
+    (tmp_path / "blocker").write_text("")  # a file where the fallback directory should be
+    sink = _sink(tmp_path, [], fail=True, fallback_path=str(tmp_path / "blocker" / "audit.ndjson"))
+    sink.submit(_event(0))
+    deadline = time.monotonic() + 5
+    while sink.spill_failures == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    thread = sink._thread
+    assert sink.spill_failures == 1 and thread.is_alive()
+    sink.submit(_event(1))
+    sink.stop()
+    assert sink.spill_failures == 2 and sink.spilled == 0 and sink.pending() == 0
+    assert not thread.is_alive()
+
+def test_sink_restarts_dead_writer_on_submit(tmp_path):
+    batches = []
+    sink = _sink(tmp_path, batches)
+    sink._thread = NS(is_alive=lambda: False)  # a writer thread that has died
+    sink.submit(_event())
+    sink.stop()
+    assert sink.written == 1
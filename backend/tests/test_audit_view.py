@@ -0,0 +1,37 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from app.audit_view import audit_filters, after_cursor, audit_cursor, iter_audit_rows, audit_csv_row
+from app.models import AuditLog
+
+def _seed(db, n=5):
+    t0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    actor = uuid.uuid4()
+    rows = [AuditLog(id=uuid.uuid4(), actor_id=actor, actor_role="teacher", action="create" if i % 2 else "update",
+                     entity_type="student", ts=t0 + timedelta(minutes=i // 2), after={"i": i}) for i in range(n)]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+def _page(db, filters, cursor=None, limit=2):
+    q = db.query(AuditLog).filter(*filters)
+    if cursor:
+        q = q.filter(after_cursor(cursor))
+    rows = q.order_by(AuditLog.ts.desc(), AuditLog.id.desc()).limit(limit + 1).all()
+    return rows[:limit], (audit_cursor(rows[limit - 1]) if len(rows) > limit else None)
+
+def test_cursor_walks_ties_without_gaps_or_repeats(sqlite_db):
+    rows = _seed(sqlite_db)
+    seen, cursor = [], None
+    while True:
+        items, cursor = _page(sqlite_db, audit_filters(), cursor)
+        seen += [a.id for a in items]
+        if not cursor:
+            break
+    expected = [a.id for a in sorted(rows, key=lambda a: (a.ts, a.id), reverse=True)]
+    assert seen == expected
+
+def test_filters_and_export_rows(sqlite_db):
+    _seed(sqlite_db)
+    exported = list(iter_audit_rows(sqlite_db, audit_filters(action="create"), yield_per=1))
+    assert [r["after"]["i"] for r in exported] == [1, 3]
+    assert audit_csv_row(exported[0])["after"] == '{"i": 1}'
@@ -0,0 +1,35 @@
+from bench.stats import percentile, summarize, compare
+from bench.__main__ import run_scenario
+
+def test_percentiles_are_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]   # 1..100 ms
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 99) == 0.099
+    s = summarize(values, [3, 3, 5], wall_seconds=2.0, errors=1)
+    assert (s["p50_ms"], s["p95_ms"], s["p99_ms"], s["max_ms"]) == (50.0, 95.0, 99.0, 100.0)
+    assert s["rps"] == 50.0 and s["queries_mean"] == 3.67 and s["queries_max"] == 5 and s["errors"] == 1
+
+def test_compare_flags_latency_and_query_regressions():
+    base = {"scenarios": {"a": {"p95_ms": 10.0, "queries_mean": 2}, "b": {"p95_ms": 10.0, "queries_mean": 2},
+                          "c": {"p95_ms": 10.0, "queries_mean": 2}}}
+    cur = {"scenarios": {"a": {"p95_ms": 11.0, "queries_mean": 2}, "b": {"p95_ms": 13.0, "queries_mean": 2},
+                         "c": {"p95_ms": 9.0, "queries_mean": 7}, "new": {"p95_ms": 1.0}}}
+    rows = {r["scenario"]: r for r in compare(cur, base, tolerance=0.15)}
+    assert set(rows) == {"a", "b", "c"}
+    assert [rows[k]["regressed"] for k in "abc"] == [False, True, True]
+
+class FakeResponse:
+    def __init__(self, status_code, queries):
+        self.status_code = status_code
+        self.headers = {"server-timing": f'db;dur=1.5;desc="{queries} queries", app;dur=2.0'}
+
+def test_run_scenario_collects_query_counts():
+    calls = []
+
+    def scenario(client, fx, i, rng):
+        calls.append(i)
+        return FakeResponse(500 if i == 3 else 200, i % 2 + 1)
+
+    s = run_scenario(None, scenario, {}, requests=4, concurrency=2, warmup=1, seed=1)
+    assert sorted(calls) == [0, 1, 2, 3, 4]
+    assert s["requests"] == 4 and s["errors"] == 1 and s["queries_max"] == 2
@@ -0,0 +1,29 @@
+import time
+from app.cache import TTLCache
+
+def test_ttl_cache_hit_miss_counters():
+    c = TTLCache("test-counters", maxsize=4, ttl=60)
+    assert c.get("a") is None
+    c.set("a", 1)
+    assert c.get("a") == 1
+    assert c.stats()["hits"] == 1 and c.stats()["misses"] == 1
+
+def test_ttl_cache_lru_eviction():
+    c = TTLCache("test-lru", maxsize=2, ttl=60)
+    c.set("a", 1); c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.evictions == 1
+
+def test_ttl_cache_respects_explicit_expiry():
+    c = TTLCache("test-expiry", maxsize=4, ttl=60)
+    c.set("a", 1, expires_at=time.time() - 1)
+    assert c.get("a") is None
+
+def test_ttl_cache_pop_where():
+    c = TTLCache("test-pop", maxsize=4, ttl=60)
+    c.set("s1", {"user": 1}); c.set("s2", {"user": 1}); c.set("s3", {"user": 2})
+    assert c.pop_where(lambda v: v["user"] == 1) == 2
+    assert len(c) == 1
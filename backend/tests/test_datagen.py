@@ -0,0 +1,66 @@
+import uuid
+from datetime import date, datetime, timezone
+from app.datagen import iter_school, copy_value, exam_dates, grade_max_questions, Loader
+from app.models import (ClassSection, Teacher, TeacherScope, Student, TrialExam, TrialResult, TrialResultSubject,
+                        ResourceBook, ResourceOutcomeCheck)
+
+PER_GRADE = {str(g): {"TR": {"max": 20}, "MAT": {"max": 20}, "FEN": {"max": 20},
+                      "INK": {"max": 10}, "DIN": {"max": 10}, "ING": {"max": 10}} for g in range(5, 9)}
+PER_GRADE["aliases"] = {"TR": {"tr": "Türkçe"}}
+
+def _school(seed=3, **kw):
+    outcomes = {code: [uuid.UUID(int=i + 100 * n) for i in range(1, 21)] for n, code in enumerate(PER_GRADE["5"])}
+    args = dict(seed=seed, students=40, years=2, exams_per_year=3, sections_per_grade=2, books_per_student=1,
+                workbooks_per_student=1, config_id=uuid.UUID(int=1), per_grade=PER_GRADE, penalty=0.3333,
+                outcomes=outcomes, existing_sections=frozenset({(8, "8/A")}), password_hash="x",
+                as_of=date(2026, 6, 1))
+    args.update(kw)
+    return list(iter_school(**args))
+
+def test_generation_is_deterministic_per_seed():
+    assert _school(seed=3) == _school(seed=3)
+    assert _school(seed=3) != _school(seed=4)
+
+def test_generated_rows_are_consistent():
+    rows = _school()
+    by = {}
+    for model, row in rows:
+        by.setdefault(model, []).append(row)
+    assert ("8/A" not in {r[2] for r in by[ClassSection]}) and len(by[ClassSection]) == 7
+    teachers = {r[0] for r in by[Teacher]}
+    assert all(s[0] in teachers for s in by[TeacherScope])
+    assert len(by[Student]) == 40
+    subjects = {}
+    for s in by[TrialResultSubject]:
+        _, rid, code, correct, wrong, blank, net = s
+        assert correct + wrong + blank == PER_GRADE["5"][code]["max"]
+        assert net == round(correct - wrong * 0.3333, 3)
+        subjects.setdefault(rid, []).append(s)
+    for rid, student_id, exam_id, c, w, b, net, entered_by, _ in by[TrialResult]:
+        assert len(subjects[rid]) == 6 and c == sum(s[3] for s in subjects[rid]) and entered_by in teachers
+    # Grade 5 students exist only in the current year; last year's exams cover today's grades 6-8.
+    assert {tuple(r[4]) for r in by[TrialExam]} == {(5,), (6,), (7,), (8,)}
+    assert sum(1 for r in by[TrialExam] if not r[6]) == 4   # latest exam per grade is open
+    checks = {}
+    for _, bid, _, checked in by[ResourceOutcomeCheck]:
+        checks[bid] = checks.get(bid, 0) + checked
+    assert all(r[5] == checks.get(r[0], 0) and r[6] == 20 for r in by[ResourceBook])
+
+def test_exam_dates_and_copy_values():
+    dates = exam_dates(2025, 4, as_of=date(2026, 1, 31))
+    assert all(d.weekday() == 5 for d in dates) and dates == sorted(dates) and dates[-1] <= date(2026, 1, 31)
+    assert len(dates) == 3
+    assert grade_max_questions(PER_GRADE)[8] == {"TR": 20, "MAT": 20, "FEN": 20, "INK": 10, "DIN": 10, "ING": 10}
+    assert [copy_value(v) for v in (None, True, [7, 8], {"a": "ş"}, date(2026, 1, 2), uuid.UUID(int=1))] == \
+        ["", "t", "{7,8}", '{"a": "ş"}', "2026-01-02", "00000000-0000-0000-0000-000000000001"]
+
+def test_loader_inserts_in_fk_order(sqlite_db):
+    loader = Loader(sqlite_db, chunk_rows=3)
+    supported = (ClassSection, Teacher, TeacherScope, Student)
+    for model, row in _school():
+        if model in supported:
+            loader.add(model, row)
+    loader.flush()
+    sqlite_db.commit()
+    assert sqlite_db.query(Student).count() == 40 and loader.counts["student"] == 40
+    assert sqlite_db.query(TeacherScope).count() == loader.counts["teacher_scope"] > 0
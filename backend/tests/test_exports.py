@@ -0,0 +1,35 @@
+import csv, json, uuid
+from io import StringIO
+from app.exports import export_subjects, export_fields, iter_exam_rows, csv_chunks, ndjson_chunks
+from app.models import Student, TrialResult, TrialResultSubject
+
+def _seed(db, exam_id):
+    a = Student(id=uuid.uuid4(), full_name="Ali Kaya", grade=8, class_section="8/A")
+    b = Student(id=uuid.uuid4(), full_name="Zeynep Ak", grade=8, class_section="8/B")
+    ra = TrialResult(id=uuid.uuid4(), student_id=a.id, trial_exam_id=exam_id, correct_total=30, wrong_total=4,
+                     blank_total=6, net_total=28.667, entered_by=uuid.uuid4())
+    rb = TrialResult(id=uuid.uuid4(), student_id=b.id, trial_exam_id=exam_id, correct_total=10, wrong_total=0,
+                     blank_total=10, net_total=10, entered_by=uuid.uuid4())
+    db.add_all([a, b, ra, rb,
+                TrialResultSubject(id=uuid.uuid4(), trial_result_id=ra.id, subject_code="TR", correct=15, wrong=3, blank=2, net=14),
+                TrialResultSubject(id=uuid.uuid4(), trial_result_id=ra.id, subject_code="MAT", correct=15, wrong=1, blank=4, net=14.667),
+                TrialResultSubject(id=uuid.uuid4(), trial_result_id=rb.id, subject_code="TR", correct=10, wrong=0, blank=10, net=10)])
+    db.commit()
+
+def test_export_subjects_follow_config_order():
+    per_grade = {"7": {"TR": {"max": 20}}, "8": {"TR": {"max": 20}, "MAT": {"max": 20}}}
+    assert export_subjects(per_grade, [8, 7]) == ["TR", "MAT"]
+    assert export_fields(["TR"])[-4:] == ["TR_correct", "TR_wrong", "TR_blank", "TR_net"]
+
+def test_wide_rows_streamed_as_csv_and_ndjson(sqlite_db):
+    exam_id = uuid.uuid4()
+    _seed(sqlite_db, exam_id)
+    rows = list(iter_exam_rows(sqlite_db, exam_id, yield_per=1))
+    assert [r["full_name"] for r in rows] == ["Ali Kaya", "Zeynep Ak"]
+    assert rows[0]["MAT_net"] == 14.667 and "MAT_net" not in rows[1]
+    chunks = list(csv_chunks(iter(rows), export_fields(["TR", "MAT"]), chunk_rows=1))
+    assert chunks[0].decode().startswith("student_id,full_name")
+    parsed = list(csv.DictReader(StringIO(b"".join(chunks).decode())))
+    assert parsed[1]["TR_correct"] == "10" and parsed[1]["MAT_net"] == ""
+    lines = b"".join(ndjson_chunks(iter(rows))).decode().splitlines()
+    assert json.loads(lines[0])["TR_wrong"] == 3
@@ -0,0 +1,61 @@
+from sqlalchemy import create_engine, text
+from app import metrics
+from app.metrics import Histogram, RequestDb, current_request_db, instrument_engine
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("t_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    h.observe(("/a",), 0.05)
+    h.observe(("/a",), 0.5)
+    h.observe(("/a",), 3)
+    lines = h.render()
+    assert 't_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 't_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 't_seconds_sum{route="/a"} 3.55' in lines
+    assert 't_seconds_count{route="/a"} 3' in lines
+
+def test_engine_time_is_attributed_to_current_request():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    acc = RequestDb()
+    token = current_request_db.set(acc)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+    finally:
+        current_request_db.reset(token)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 3"))   # outside a request: not counted
+    assert acc.queries == 2 and acc.seconds > 0
+
+def test_metrics_endpoint_exposes_routes_and_pool(client, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    monkeypatch.setattr(settings, "APP_ENV", "development")
+    client.get("/healthz")
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert 'lgs_http_requests_total{method="GET",route="/healthz",status="200"}' in body
+    assert 'lgs_http_request_duration_seconds_count{method="GET",route="/healthz"}' in body
+    assert 'lgs_http_request_db_seconds_bucket{method="GET",route="/healthz",le="+Inf"}' in body
+    assert 'lgs_db_pool_size{engine="sync"}' in body
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "render", lambda engines: "")
+    from app.config import settings
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+def test_metrics_off_by_default_and_tokenless_only_in_development(client, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+    monkeypatch.setattr(settings, "APP_ENV", "production")
+    assert client.get("/metrics").json()["detail"] == "not_found"
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    r = client.get("/metrics")
+    assert (r.status_code, r.json()["detail"]) == (404, "metrics_token_required")
@@ -0,0 +1,55 @@
+import uuid
+import pytest
+from app.models import Student
+from app.pagination import encode_cursor, decode_cursor, keyset_after
+
+SORT = [(Student.grade, "desc"), (Student.class_section, "asc"), (Student.full_name, "asc"), (Student.id, "asc")]
+
+def test_cursor_roundtrip():
+    values = [8, "8/A", "Elif Demir", str(uuid.uuid4())]
+    assert decode_cursor(encode_cursor(values), 4) == values
+
+@pytest.mark.parametrize("bad", ["%%%", encode_cursor([1, 2]), encode_cursor({"a": 1})])
+def test_invalid_cursor(bad):
+    with pytest.raises(ValueError):
+        decode_cursor(bad, 4)
+
+def test_keyset_walk_matches_offset_order(sqlite_db):
+    for grade in (7, 8):
+        for section in ("A", "B"):
+            for name in ("Ali", "Ayşe", "Can"):
+                sqlite_db.add(Student(id=uuid.uuid4(), full_name=name, grade=grade, class_section=f"{grade}/{section}"))
+    sqlite_db.commit()
+    order = [c.desc() if d == "desc" else c.asc() for c, d in SORT]
+    expected = [s.id for s in sqlite_db.query(Student).order_by(*order).all()]
+
+    seen, values = [], None
+    while True:
+        q = sqlite_db.query(Student).order_by(*order)
+        if values:
+            q = q.filter(keyset_after(SORT, values))
+        page = q.limit(5).all()
+        if not page:
+            break
+        seen += [s.id for s in page]
+        last = page[-1]
+        values = [last.grade, last.class_section, last.full_name, last.id]
+    assert seen == expected
+
+def test_mixed_directions_become_one_row_comparison():
+    from sqlalchemy.dialects import postgresql
+    sql = str(keyset_after(SORT, [8, "8/A", "Elif", uuid.uuid4()]).compile(dialect=postgresql.dialect()))
+    assert sql.startswith("student.grade < ")
+    assert "(student.class_section, student.full_name, student.id) > (" in sql
+
+def test_page_size_is_clamped(sqlite_db):
+    from datetime import datetime, timezone
+    from types import SimpleNamespace
+    from app.reads import list_students
+    now = datetime.now(timezone.utc)
+    sqlite_db.add_all([Student(id=uuid.uuid4(), full_name=f"Öğrenci {i:03d}", grade=8, class_section="8/A",
+                               created_at=now, updated_at=now) for i in range(105)])
+    sqlite_db.commit()
+    rooter = SimpleNamespace(username="rooter", id=uuid.uuid4())
+    assert len(list_students(sqlite_db, rooter, page_size=10_000, total="none")["items"]) == 100
+    assert len(list_students(sqlite_db, rooter, page=0, page_size=0, total="none")["items"]) == 1
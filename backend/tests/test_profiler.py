@@ -0,0 +1,54 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import text
+from starlette.requests import Request
+from app.models import Student, Workbook, StudentWorkbook, Teacher, Session
+from app.profiler import fingerprint, install, profile_queries
+from app.rbac import ScopeSet
+from app.session_cache import Principal, session_cache
+
+def test_fingerprint_folds_literals_and_in_lists():
+    a = fingerprint("SELECT * FROM w WHERE w.id = %(id_1)s AND g IN (%(g_1_1)s, %(g_1_2)s)  AND n = 'x'")
+    b = fingerprint("SELECT * FROM w\n WHERE w.id = ? AND g IN (?, ?, ?) AND n = 'yy'")
+    assert a == b == "SELECT * FROM w WHERE w.id = ? AND g IN (?) AND n = ?"
+    assert fingerprint("SELECT reltuples::bigint LIMIT 10") == "SELECT reltuples::bigint LIMIT ?"
+
+def test_repeated_statements_are_flagged(sqlite_db):
+    install(sqlite_db.get_bind())
+    with profile_queries(repeat_threshold=3) as prof:
+        for i in range(5):
+            sqlite_db.execute(text("SELECT :i"), {"i": i})
+        sqlite_db.execute(text("SELECT 1 + 1"))
+    sqlite_db.execute(text("SELECT 2"))   # after the block: not recorded
+    assert prof.queries == 6
+    assert prof.repeated() == [("SELECT ?", 5)]
+    header = prof.server_timing(0.01)
+    assert header.startswith('db;dur=') and 'desc="6 queries"' in header and 'sql-repeat;desc="5x SELECT ?"' in header
+    with pytest.raises(AssertionError, match="5x SELECT"):
+        prof.assert_budget(max_repeats=1)
+    prof.assert_budget(max_queries=6)
+
+def test_student_workbooks_query_budget(sqlite_db):
+    from app.main import list_student_workbooks
+    t = Teacher(id=uuid.uuid4(), full_name="T", email="t@x", username="rooter", password_hash="x")
+    st = Student(id=uuid.uuid4(), full_name="S", grade=8, class_section="8/A")
+    books = [Workbook(id=uuid.uuid4(), title=f"W{i}", subject_code="MAT", grade=8) for i in range(6)]
+    sqlite_db.add_all([t, st, *books])
+    sqlite_db.add_all([StudentWorkbook(student_id=st.id, workbook_id=b.id, assigned_by=t.id) for b in books])
+    sqlite_db.commit()
+    sid, student_id = str(uuid.uuid4()), st.id
+    sess = Session(id=uuid.UUID(sid), user_id=t.id, role="rooter", csrf_token="x",
+                   expires_at=datetime.now(timezone.utc) + timedelta(hours=1))
+    session_cache.set(sid, Principal(user=t, session=sess, role="rooter", scopes=ScopeSet([])))
+    request = Request({"type": "http", "method": "GET", "path": "/", "client": ("10.0.0.9", 1),
+                       "headers": [(b"cookie", f"lgs_session={sid}".encode())]})
+    sqlite_db.expire_all()
+    install(sqlite_db.get_bind())
+    try:
+        with profile_queries() as prof:
+            out = list_student_workbooks(student_id, request, db=sqlite_db)
+    finally:
+        session_cache.pop(sid)
+    assert sorted(o["workbook"]["title"] for o in out) == [f"W{i}" for i in range(6)]
+    prof.assert_budget(max_queries=2, max_repeats=1)
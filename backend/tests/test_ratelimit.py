@@ -0,0 +1,101 @@
+import threading
+import pytest
+from starlette.requests import Request
+from fastapi.testclient import TestClient
+from app import ratelimit
+from app.ratelimit import TokenBucketLimiter, retry_after, client_ip
+from app.security import HashPool, HashPoolBusy
+
+def test_bucket_allows_burst_then_refills():
+    lim = TokenBucketLimiter("t", capacity=3, window_seconds=60)
+    assert [lim.take("ip", now=0.0) for _ in range(3)] == [0, 0, 0]
+    wait = lim.take("ip", now=0.0)
+    assert wait == pytest.approx(20.0)
+    assert retry_after(wait) == "20"
+    # One token every 20 s; other keys are independent.
+    assert lim.take("ip", now=20.0) == 0
+    assert lim.take("other", now=0.0) == 0
+    assert lim.stats()["rejected"] == 1
+
+def test_bucket_evicts_least_recent_keys():
+    lim = TokenBucketLimiter("t", capacity=1, window_seconds=60, max_keys=2)
+    lim.take("a", now=0.0); lim.take("b", now=0.0); lim.take("c", now=0.0)
+    assert lim.stats()["keys"] == 2
+    assert lim.take("a", now=0.0) == 0   # evicted, so a fresh bucket
+
+def test_hash_pool_rejects_when_full():
+    pool = HashPool(max_workers=1, max_queue=1)
+    gate = threading.Event()
+    started = threading.Barrier(3)
+    results = []
+
+    def caller():
+        started.wait()
+        results.append(pool.run(gate.wait, 5))
+
+    threads = [threading.Thread(target=caller) for _ in range(2)]
+    for t in threads:
+        t.start()
+    started.wait()
+    # Both slots may not be taken the instant the barrier opens; wait for them.
+    for _ in range(100):
+        if pool._slots._value == 0:
+            break
+        threading.Event().wait(0.01)
+    with pytest.raises(HashPoolBusy):
+        pool.run(lambda: None)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert results == [True, True]
+    assert pool.run(lambda x: x * 2, 21) == 42
+    assert pool.stats()["rejected"] == 1
+
+def test_login_rate_limited(client, monkeypatch):
+    from app import auth
+    lim = TokenBucketLimiter("login_user", capacity=1, window_seconds=60)
+    monkeypatch.setattr(auth, "login_user_limiter", lim)
+    lim.take("someone")
+    r = client.post("/auth/login", json={"username": "Someone", "password": "x"})
+    assert r.status_code == 429
+    assert r.json()["detail"] == "rate_limited"
+    assert int(r.headers["Retry-After"]) >= 1
+
+def _request(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": (peer, 40000)})
+
+def test_client_ip_trusts_only_configured_proxies(monkeypatch):
+    monkeypatch.setattr(ratelimit, "TRUSTED_PROXIES", ratelimit._networks("172.16.0.0/12"))
+    assert client_ip(_request("172.18.0.5", "203.0.113.7")) == "203.0.113.7"
+    # A client-supplied entry left of the real one is ignored.
+    assert client_ip(_request("172.18.0.5", "10.9.9.9, 203.0.113.7")) == "203.0.113.7"
+    # Direct callers cannot pick their own bucket.
+    assert client_ip(_request("198.51.100.1", "203.0.113.7")) == "198.51.100.1"
+    assert client_ip(_request("172.18.0.5")) == "172.18.0.5"
+
+def test_forwarded_clients_get_separate_login_buckets(monkeypatch):
+    from app import auth
+    from app.main import app
+
+    async def via_proxy(scope, receive, send):
+        # Every request reaches the app from the nginx container's address.
+        if scope["type"] == "http":
+            scope = dict(scope, client=("172.18.0.5", 40000))
+        await app(scope, receive, send)
+
+    monkeypatch.setattr(ratelimit, "TRUSTED_PROXIES", ratelimit._networks("172.16.0.0/12"))
+    ip_lim = TokenBucketLimiter("login_ip", capacity=1, window_seconds=60)
+    user_lim = TokenBucketLimiter("login_user", capacity=1, window_seconds=60)
+    monkeypatch.setattr(auth, "login_ip_limiter", ip_lim)
+    monkeypatch.setattr(auth, "login_user_limiter", user_lim)
+    ip_lim.take("203.0.113.1")
+    user_lim.take("someone")   # stop the second login before it reaches the database
+    client = TestClient(via_proxy)
+    for ip in ("203.0.113.1", "203.0.113.2"):
+        r = client.post("/auth/login", json={"username": "someone", "password": "x"},
+                        headers={"X-Forwarded-For": ip})
+        assert r.status_code == 429
+    # The first was stopped by its own IP bucket, the second got past a fresh one.
+    assert ip_lim.stats() == {"keys": 2, "capacity": 1.0, "rejected": 1}
+    assert user_lim.stats()["rejected"] == 1
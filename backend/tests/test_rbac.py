@@ -0,0 +1,20 @@
+from sqlalchemy.dialects import postgresql
+from app.rbac import ScopeSet
+
+def test_scope_set_membership():
+    scope = ScopeSet([(8, None), (7, "7/A"), (8, "8/B")])
+    assert scope.allows(8, "8/C")
+    assert scope.allows(7, "7/A")
+    assert not scope.allows(7, "7/B")
+    assert not scope.allows(6, "6/A")
+    # (8, "8/B") is subsumed by the whole-grade entry
+    assert scope.sections == frozenset({(7, "7/A")})
+
+def test_scope_set_sql_filter():
+    sql = str(ScopeSet([(8, None), (7, "7/A")]).sql_filter().compile(dialect=postgresql.dialect()))
+    assert "student.grade IN" in sql
+    assert "(student.grade, student.class_section) IN" in sql
+
+def test_empty_scope_set_is_falsy():
+    assert not ScopeSet([])
+    assert ScopeSet([]).items() == []
@@ -0,0 +1,78 @@
+import uuid
+import pytest
+from fastapi import HTTPException
+from app.config import settings
+from app.main import toggle_outcomes_for_resource_books
+from app.models import Student, SubjectOutcome, ResourceBook, ResourceOutcomeCheck, Teacher
+from app.rbac import ScopeSet, scope_cache
+from app.resource_progress import apply_toggles, progress_percent, rebuild_all, outcome_catalogue
+from app.schemas import ToggleOutcomeMultiIn
+
+def _book(db, outcomes=None, subject_code="MAT"):
+    st = Student(id=uuid.uuid4(), full_name="Ali Kaya", grade=8, class_section="8/A")
+    outcomes = outcomes or [SubjectOutcome(id=uuid.uuid4(), subject_code=subject_code, code=i, text=f"K{i}")
+                            for i in range(1, 5)]
+    rb = ResourceBook(id=uuid.uuid4(), student_id=st.id, name="Soru Bankası", subject_code=subject_code)
+    db.add_all([st, rb, *outcomes])
+    db.commit()
+    return rb, outcomes
+
+def test_toggles_upsert_and_recount(sqlite_db):
+    outcome_catalogue.clear()
+    rb, outcomes = _book(sqlite_db)
+    assert apply_toggles(sqlite_db, [(rb, o.id, True) for o in outcomes[:3]]) == 3
+    sqlite_db.commit()
+    assert (rb.checked_count, rb.outcome_total, progress_percent(rb)) == (3, 4, 75)
+    # Existing rows are updated in place, repeats collapse to the last toggle, unknown ids are ignored.
+    apply_toggles(sqlite_db, [(rb, outcomes[1].id, True), (rb, outcomes[1].id, False),
+                              (rb, uuid.uuid4(), True)])
+    sqlite_db.commit()
+    assert rb.checked_count == 2
+    assert sqlite_db.query(ResourceOutcomeCheck).count() == 3
+
+def test_toggles_span_several_books(sqlite_db):
+    outcome_catalogue.clear()
+    a, outcomes = _book(sqlite_db)
+    b = ResourceBook(id=uuid.uuid4(), student_id=a.student_id, name="Deneme", subject_code="MAT")
+    sqlite_db.add(b); sqlite_db.commit()
+    apply_toggles(sqlite_db, [(a, outcomes[0].id, True), (b, outcomes[0].id, True), (b, outcomes[1].id, True)])
+    sqlite_db.commit()
+    assert (progress_percent(a), progress_percent(b)) == (25, 50)
+
+def test_rebuild_recomputes_from_checks(sqlite_db):
+    rb, outcomes = _book(sqlite_db)
+    sqlite_db.add(ResourceOutcomeCheck(id=uuid.uuid4(), resource_book_id=rb.id, outcome_id=outcomes[0].id, checked=True))
+    rb.checked_count = 99
+    sqlite_db.commit()
+    assert rebuild_all(sqlite_db) == 1
+    sqlite_db.commit()
+    sqlite_db.refresh(rb)
+    assert (rb.checked_count, rb.outcome_total, progress_percent(rb)) == (1, 4, 25)
+
+def test_multi_book_toggle_rejects_out_of_scope_books(sqlite_db, monkeypatch, session_request):
+    monkeypatch.setattr(settings, "TEACHER_GLOBAL_ACCESS", False)
+    outcome_catalogue.clear()
+    mine, outcomes = _book(sqlite_db)                      # student in 8/A
+    other = Student(id=uuid.uuid4(), full_name="Eda Şahin", grade=7, class_section="7/B")
+    theirs = ResourceBook(id=uuid.uuid4(), student_id=other.id, name="Soru Bankası", subject_code="MAT")
+    t = Teacher(id=uuid.uuid4(), full_name="T", email="t@x", username="teacher8a", password_hash="x")
+    sqlite_db.add_all([other, theirs, t])
+    sqlite_db.commit()
+    request = session_request(t, role="teacher", scopes=[(8, "8/A")])
+    scope_cache.set(str(t.id), ScopeSet([(8, "8/A")]))
+    body = lambda *books: ToggleOutcomeMultiIn(books=[{"resource_book_id": b.id, "items": [
+        {"outcome_id": outcomes[0].id, "checked": True}]} for b in books])
+    try:
+        with pytest.raises(HTTPException) as e:
+            toggle_outcomes_for_resource_books(body(mine, theirs), request, db=sqlite_db, csrf=None)
+        assert (e.value.status_code, e.value.detail) == (403, "out_of_scope")
+        sqlite_db.rollback()
+        assert sqlite_db.query(ResourceOutcomeCheck).count() == 0
+        out = toggle_outcomes_for_resource_books(body(mine), request, db=sqlite_db, csrf=None)
+        assert out["books"] == [{"resource_book_id": str(mine.id), "progress_percent": 25}]
+    finally:
+        scope_cache.pop(str(t.id))
+
+def test_multi_book_toggle_requires_csrf(client):
+    r = client.post("/resource-books/outcomes/toggle", json={"books": []})
+    assert (r.status_code, r.json()["detail"]) == (403, "csrf_mismatch")
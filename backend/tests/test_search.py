@@ -0,0 +1,22 @@
+import uuid
+from app.models import Student
+from app.search import fold_name, like_pattern
+
+def test_fold_name_turkish_case_and_diacritics():
+    assert fold_name("İSMAİL Işık") == "ismail isik"
+    assert fold_name("Zeynep  ÇELİK") == "zeynep celik"
+    assert fold_name("Gülşen Öztürk") == "gulsen ozturk"
+    assert fold_name("Âdem") == "adem"
+
+def test_like_pattern_escapes_wildcards():
+    assert like_pattern("a%b_c") == "%a\\%b\\_c%"
+
+def test_search_name_column_matches_folded_query(sqlite_db):
+    sqlite_db.add_all([Student(id=uuid.uuid4(), full_name=n, grade=8, class_section="8/A")
+                       for n in ("İsmail Yılmaz", "Işıl Demir", "Ahmet Kaya")])
+    sqlite_db.commit()
+    hits = (sqlite_db.query(Student.full_name)
+              .filter(Student.search_name.like(like_pattern(fold_name("ISIL")), escape="\\"))
+              .all())
+    assert [h.full_name for h in hits] == ["Işıl Demir"]
+    assert sqlite_db.query(Student.search_name).filter(Student.full_name == "İsmail Yılmaz").scalar() == "ismail yilmaz"
@@ -0,0 +1,33 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from app.models import Session
+from app.sessions import SessionTouches, reap_expired
+
+def _session(db, expires_in):
+    s = Session(id=uuid.uuid4(), user_id=uuid.uuid4(), role="teacher", csrf_token="x",
+                expires_at=datetime.now(timezone.utc) + timedelta(seconds=expires_in))
+    db.add(s)
+    return s
+
+def test_reaper_deletes_only_expired_in_batches(sqlite_db):
+    for _ in range(5):
+        _session(sqlite_db, -60)
+    live = _session(sqlite_db, 3600)
+    sqlite_db.commit()
+    live_id = live.id
+    assert reap_expired(sqlite_db, batch_size=2) == 5
+    assert [s.id for s in sqlite_db.query(Session).all()] == [live_id]
+
+def test_touches_are_coalesced_per_interval(sqlite_db):
+    s = _session(sqlite_db, 60)
+    sqlite_db.commit()
+    sid, old_expiry = str(s.id), s.expires_at
+    touches = SessionTouches(interval=300, sliding=True, ttl_seconds=7200)
+    assert touches.touch(sid, "10.0.0.1") is True
+    assert touches.touch(sid, "10.0.0.2") is False
+    assert touches.flush(sqlite_db) == 1
+    assert touches.flush(sqlite_db) == 0
+    sqlite_db.expire_all()
+    row = sqlite_db.query(Session).one()
+    assert row.last_seen_ip == "10.0.0.1"
+    assert row.expires_at.replace(tzinfo=timezone.utc) > old_expiry.replace(tzinfo=timezone.utc) + timedelta(hours=1)
@@ -0,0 +1,68 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from app.models import Student, StudentSubjectStats, TrialResult, TrialResultSubject
+from app.subject_stats import roll, apply_results, rebuild_all
+
+def test_roll_keeps_window_best_worst_and_trend():
+    state = None
+    for net in [10, 12, 8, 14, 16, 18]:
+        state = roll(state, float(net), window=5)
+    assert state["recent_nets"] == [12.0, 8.0, 14.0, 16.0, 18.0]
+    assert state["recent_avg"] == 13.6
+    assert state["best"] == 18.0 and state["worst"] == 8.0
+    assert state["sample_count"] == 6
+    assert state["trend"] > 0
+
+def test_apply_results_matches_rebuild(sqlite_db):
+    st = Student(id=uuid.uuid4(), full_name="Ahmet Kaya", grade=7, class_section="7/A")
+    sqlite_db.add(st)
+    t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for i, net in enumerate([9.0, 7.5, 11.0]):
+        tr = TrialResult(id=uuid.uuid4(), student_id=st.id, trial_exam_id=uuid.uuid4(), net_total=net,
+                         entered_by=uuid.uuid4(), entered_at=t0 + timedelta(days=i))
+        sqlite_db.add_all([tr, TrialResultSubject(id=uuid.uuid4(), trial_result_id=tr.id, subject_code="MAT", net=net)])
+        apply_results(sqlite_db, [(st.id, "MAT", net, tr.id)], window=2)
+        sqlite_db.commit()
+    incremental = sqlite_db.query(StudentSubjectStats).one()
+    assert incremental.recent_nets == [7.5, 11.0]
+    assert float(incremental.recent_avg) == 9.25
+
+    rebuild_all(sqlite_db, window=2)
+    sqlite_db.commit()
+    sqlite_db.expire_all()
+    rebuilt = sqlite_db.query(StudentSubjectStats).one()
+    assert rebuilt.recent_nets == [7.5, 11.0]
+    assert (float(rebuilt.best), float(rebuilt.worst), rebuilt.sample_count) == (11.0, 7.5, 3)
+
+def test_results_entered_together_roll_in_rebuild_order(sqlite_db):
+    # One import: every result shares entered_at, and the items arrive in file order.
+    st = Student(id=uuid.uuid4(), full_name="Elif Demir", grade=8, class_section="8/C")
+    sqlite_db.add(st)
+    t0 = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    items = []
+    for net in [4.0, 12.0, 8.0, 10.0]:
+        tr = TrialResult(id=uuid.uuid4(), student_id=st.id, trial_exam_id=uuid.uuid4(), net_total=net,
+                         entered_by=uuid.uuid4(), entered_at=t0)
+        sqlite_db.add_all([tr, TrialResultSubject(id=uuid.uuid4(), trial_result_id=tr.id, subject_code="FEN", net=net)])
+        items.append((st.id, "FEN", net, tr.id))
+    apply_results(sqlite_db, items, window=3)
+    sqlite_db.commit()
+    incremental = sqlite_db.query(StudentSubjectStats).one()
+    snapshot = (list(incremental.recent_nets), incremental.sample_count, float(incremental.best), float(incremental.worst))
+    assert snapshot[1:] == (4, 12.0, 4.0)
+
+    rebuild_all(sqlite_db, window=3)
+    sqlite_db.commit()
+    sqlite_db.expire_all()
+    rebuilt = sqlite_db.query(StudentSubjectStats).one()
+    assert (list(rebuilt.recent_nets), rebuilt.sample_count, float(rebuilt.best), float(rebuilt.worst)) == snapshot
+
+def test_first_entry_fills_the_placeholder_row(sqlite_db):
+    st = Student(id=uuid.uuid4(), full_name="Can Arslan", grade=6, class_section="6/A")
+    sqlite_db.add(st)
+    sqlite_db.commit()
+    apply_results(sqlite_db, [(st.id, "TR", 15.0, uuid.uuid4()), (st.id, "MAT", 6.5, uuid.uuid4())], window=3)
+    sqlite_db.commit()
+    rows = {r.subject_code: r for r in sqlite_db.query(StudentSubjectStats).all()}
+    assert rows["TR"].recent_nets == [15.0] and rows["TR"].sample_count == 1
+    assert (float(rows["MAT"].best), float(rows["MAT"].worst), float(rows["MAT"].recent_avg)) == (6.5, 6.5, 6.5)
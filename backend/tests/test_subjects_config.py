@@ -0,0 +1,55 @@
+import uuid
+import pytest
+from sqlalchemy import event, update
+from app.models import SubjectsConfig
+from app.subjects_config import get_validator, validator_cache
+
+def _config(db):
+    conf = SubjectsConfig(id=uuid.uuid4(), name="LGS", penalty_factor=0.3333,
+                          per_grade={"8": {"TR": {"max": 20}, "MAT": {"max": 20}}, "7": {"TR": {"max": 15}}})
+    db.add(conf)
+    db.commit()
+    return conf
+
+def _count_queries(db):
+    counter = {"n": 0}
+    @event.listens_for(db.get_bind(), "before_cursor_execute")
+    def _count(*args):
+        counter["n"] += 1
+    return counter
+
+def test_validators_are_compiled_once_per_config(sqlite_db):
+    validator_cache.clear()
+    conf_id = _config(sqlite_db).id
+    counter = _count_queries(sqlite_db)
+    v8 = get_validator(sqlite_db, conf_id, 8)
+    assert v8.subjects == {"TR", "MAT"} and v8.penalty == pytest.approx(0.3333)
+    assert get_validator(sqlite_db, conf_id, 7).max_questions == {"TR": 15}
+    assert get_validator(sqlite_db, conf_id, 8) is v8
+    assert counter["n"] == 1
+    # Uncovered grades are remembered too.
+    for _ in range(2):
+        with pytest.raises(ValueError, match="subjects_config_grade_missing"):
+            get_validator(sqlite_db, conf_id, 6)
+    assert counter["n"] == 2
+    with pytest.raises(ValueError, match="subjects_config_missing"):
+        get_validator(sqlite_db, uuid.uuid4(), 8)
+
+def test_config_update_invalidates(sqlite_db):
+    validator_cache.clear()
+    conf = _config(sqlite_db)
+    assert get_validator(sqlite_db, conf.id, 7).max_questions == {"TR": 15}
+    conf.per_grade = {"7": {"TR": {"max": 20}}}
+    sqlite_db.commit()
+    assert get_validator(sqlite_db, conf.id, 7).max_questions == {"TR": 20}
+    with pytest.raises(ValueError, match="subjects_config_grade_missing"):
+        get_validator(sqlite_db, conf.id, 8)
+
+def test_statement_update_invalidates(sqlite_db):
+    validator_cache.clear()
+    conf = _config(sqlite_db)
+    assert get_validator(sqlite_db, conf.id, 7).max_questions == {"TR": 15}
+    sqlite_db.execute(update(SubjectsConfig.__table__).where(SubjectsConfig.id == conf.id)
+                      .values(per_grade={"7": {"TR": {"max": 20}}}))
+    sqlite_db.commit()
+    assert get_validator(sqlite_db, conf.id, 7).max_questions == {"TR": 20}
@@ -0,0 +1,35 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event
+from app.models import Student, TrialResult, TrialResultSubject
+from app.trial_results import load_trial_history
+
+def _seed(db, n_results):
+    st = Student(id=uuid.uuid4(), full_name="Mehmet Yılmaz", grade=8, class_section="8/A")
+    db.add(st)
+    t0 = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    for i in range(n_results):
+        tr = TrialResult(id=uuid.uuid4(), student_id=st.id, trial_exam_id=uuid.uuid4(), correct_total=20,
+                         wrong_total=0, blank_total=0, net_total=20, entered_by=uuid.uuid4(),
+                         entered_at=t0 + timedelta(days=i))
+        db.add(tr)
+        for code in ("MAT", "TR"):
+            db.add(TrialResultSubject(id=uuid.uuid4(), trial_result_id=tr.id, subject_code=code,
+                                      correct=10, wrong=0, blank=0, net=10))
+    db.commit()
+    return st
+
+def test_trial_history_uses_two_queries(sqlite_db):
+    student_id = _seed(sqlite_db, 40).id
+    statements = []
+    event.listen(sqlite_db.get_bind(), "before_cursor_execute", lambda *a: statements.append(a[2]))
+    history = load_trial_history(sqlite_db, student_id)
+    assert len(statements) == 2
+    assert len(history) == 40
+    assert [s["subject_code"] for s in history[0]["subjects"]] == ["MAT", "TR"]
+    assert history[0]["entered_at"] < history[-1]["entered_at"]
+
+def test_trial_history_newest_first(sqlite_db):
+    st = _seed(sqlite_db, 3)
+    history = load_trial_history(sqlite_db, st.id, newest_first=True)
+    assert history[0]["entered_at"] > history[-1]["entered_at"]
@@ -0,0 +1,104 @@
+import uuid
+from datetime import datetime, timezone
+import pytest
+from types import SimpleNamespace as NS
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from app import main
+from app.models import Student, StudentSubjectStats, TrialExam, TrialResult
+from app.rbac import ScopeSet
+from app.schemas import TrialResultCreate
+from app.subjects_config import GradeValidator
+from app.trial_results import score_subjects, check_entry, insert_new_results
+
+PER_GRADE = {"TR": {"max": 20}, "MAT": {"max": 20}, "INK": {"max": 10}}
+
+def test_score_subjects_totals_and_net():
+    scored = score_subjects(PER_GRADE, 1 / 3, [("TR", 18, 2, 0), ("INK", 8, 1, 1)])
+    assert scored["correct_total"] == 26
+    assert scored["wrong_total"] == 3
+    assert scored["blank_total"] == 1
+    assert scored["net_total"] == 25.0
+    assert scored["subjects"][0] == {"subject_code": "TR", "correct": 18, "wrong": 2, "blank": 0, "net": 17.333}
+
+@pytest.mark.parametrize("subjects, error", [
+    ([("FEN", 20, 0, 0)], "subject_not_allowed:FEN"),
+    ([("MAT", 10, 5, 0)], "invalid_total:MAT:20"),
+    ([("MAT", 20, 0, 0), ("MAT", 20, 0, 0)], "duplicate_subject:MAT"),
+    ([("INK", 12, -2, 0)], "negative_value:INK"),
+])
+def test_score_subjects_rejects(subjects, error):
+    with pytest.raises(ValueError, match=error):
+        score_subjects(PER_GRADE, 1 / 3, subjects)
+
+def test_check_entry_reasons_in_order():
+    st = NS(id="s1", grade=8, class_section="8/A")
+    exam = NS(id="e1", is_finalized=False)
+    validator_for = lambda grade: GradeValidator("c1", grade, PER_GRADE, 0.25)
+    row = check_entry(st, exam, [("MAT", 16, 4, 0)], validator_for=validator_for, is_rooter=False)
+    assert (row["student_id"], row["net_total"]) == ("s1", 15.0)
+    cases = [
+        (dict(student=None), "student_not_found"),
+        (dict(exam=NS(id="e1", is_finalized=True)), "finalized"),
+        (dict(scope=ScopeSet([(8, "8/B")])), "out_of_scope"),
+        (dict(existing={("s1", "e1")}), "already_exists"),
+    ]
+    for overrides, error in cases:
+        args = {"student": st, "exam": exam, "scope": None, "existing": frozenset(), **overrides}
+        with pytest.raises(ValueError, match=error):
+            check_entry(args["student"], args["exam"], [("MAT", 16, 4, 0)], validator_for=validator_for,
+                        is_rooter=False, scope=args["scope"], existing=args["existing"])
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+    def filter(self, *a):
+        return self
+    def first(self):
+        return self.rows[0] if self.rows else None
+    def all(self):
+        return list(self.rows)
+
+class FakeDB:
+    # Serves preset rows per model; enough for the entry handlers up to the INSERT.
+    def __init__(self, rows):
+        self.rows, self.rolled_back = rows, False
+    def query(self, model, *cols):
+        return FakeQuery(self.rows.get(model, []))
+    def rollback(self):
+        self.rolled_back = True
+
+def _duplicate_key(*a, **kw):
+    raise IntegrityError("INSERT INTO trial_result ...", {}, Exception("duplicate key value violates unique constraint"))
+
+def test_concurrent_duplicate_entry_is_a_conflict(monkeypatch, session_request):
+    st = NS(id=uuid.uuid4(), grade=8, class_section="8/A")
+    exam = NS(id=uuid.uuid4(), is_finalized=False, subjects_config_id="c1")
+    monkeypatch.setattr(main, "get_validator", lambda db, conf, grade: GradeValidator("c1", grade, PER_GRADE, 0.25))
+    monkeypatch.setattr(main, "insert_results", _duplicate_key)
+    db = FakeDB({Student: [st], TrialExam: [exam]})
+    payload = TrialResultCreate(student_id=st.id, trial_exam_id=exam.id,
+                                subjects=[{"subject_code": "MAT", "correct": 16, "wrong": 4, "blank": 0}])
+    with pytest.raises(HTTPException) as e:
+        main.create_trial_result(payload, session_request(), db=db, csrf=None)
+    assert (e.value.status_code, e.value.detail) == (409, "result_exists") and db.rolled_back
+
+def test_batch_insert_sets_aside_results_entered_concurrently(sqlite_db):
+    exam_id, teacher_id = uuid.uuid4(), uuid.uuid4()
+    students = [Student(id=uuid.uuid4(), full_name=f"Öğrenci {i}", grade=8, class_section="8/A") for i in range(3)]
+    sqlite_db.add_all(students)
+    sqlite_db.commit()
+    rows = [{"student_id": st.id, "trial_exam_id": exam_id, "correct_total": 10, "wrong_total": 2,
+             "blank_total": 8, "net_total": 9.33, "subjects": [{"subject_code": "MAT", "correct": 10,
+             "wrong": 2, "blank": 8, "net": 9.33}]} for st in students]
+    # Entered by another request after check_entry() ran for this batch.
+    sqlite_db.add(TrialResult(id=uuid.uuid4(), student_id=students[1].id, trial_exam_id=exam_id, net_total=5,
+                              entered_by=teacher_id, entered_at=datetime.now(timezone.utc)))
+    sqlite_db.commit()
+
+    ids, inserted, taken = insert_new_results(sqlite_db, rows, teacher_id)
+    sqlite_db.commit()
+    assert [r["student_id"] for r in taken] == [students[1].id]
+    assert [r["student_id"] for r in inserted] == [students[0].id, students[2].id] and len(ids) == 2
+    assert sqlite_db.query(TrialResult).filter(TrialResult.trial_exam_id == exam_id).count() == 3
+    assert {s.student_id for s in sqlite_db.query(StudentSubjectStats)} == {students[0].id, students[2].id}
@@ -0,0 +1,26 @@
+import pytest
+from app.validation import validate_student_row
+
+ROW = {"full_name": "Zeynep  Çelik", "grade": "8", "class_section": "8/A", "guardian_name": "Hasan Çelik",
+       "guardian_phone": "05003334455", "guardian_email": "hasan.celik@example.com", "status": ""}
+
+def test_valid_student_row_is_normalized():
+    out = validate_student_row(ROW)
+    assert out["full_name"] == "Zeynep Çelik"
+    assert out["grade"] == 8
+    assert out["status"] == "active"
+
+@pytest.mark.parametrize("field, value, error", [
+    ("full_name", "A", "full_name_length"),
+    ("full_name", "Ali 3", "full_name_invalid_chars"),
+    ("grade", "9", "grade_out_of_range"),
+    ("grade", "x", "grade_not_integer"),
+    ("class_section", "8a", "class_section_invalid"),
+    ("class_section", "7/A", "class_section_grade_mismatch"),
+    ("guardian_phone", "12345", "guardian_phone_invalid"),
+    ("guardian_email", "not-an-email", "guardian_email_invalid"),
+    ("status", "expelled", "status_invalid"),
+])
+def test_invalid_student_rows(field, value, error):
+    with pytest.raises(ValueError, match=error):
+        validate_student_row({**ROW, field: value})
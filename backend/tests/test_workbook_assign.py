@@ -0,0 +1,52 @@
+import uuid
+import pytest
+from fastapi import HTTPException
+from app import main
+from app.main import assign_workbook
+from app.models import Student, Workbook, StudentWorkbook, Teacher
+from app.rbac import ScopeSet
+from app.schemas import StudentWorkbookCreate
+from app.workbook_assign import resolve_targets, insert_assignments
+
+def _seed(db):
+    t = Teacher(id=uuid.uuid4(), full_name="T", email="t@x", username="t", password_hash="x")
+    wb = Workbook(id=uuid.uuid4(), title="Soru Bankası", subject_code="MAT", grade=8)
+    students = [Student(id=uuid.uuid4(), full_name=f"S{i}", grade=8, class_section=cs)
+                for i, cs in enumerate(["8/A", "8/A", "8/A", "8/B"])]
+    students.append(Student(id=uuid.uuid4(), full_name="Mezun", grade=8, class_section="8/A", status="graduated"))
+    db.add_all([t, wb, *students])
+    db.add(StudentWorkbook(id=uuid.uuid4(), student_id=students[0].id, workbook_id=wb.id, assigned_by=t.id))
+    db.commit()
+    return t, wb, students
+
+def test_section_assignment_skips_existing_and_inactive(sqlite_db):
+    t, wb, students = _seed(sqlite_db)
+    targets, summary = resolve_targets(sqlite_db, wb.id, grade=8, class_section="8/A")
+    assert summary == {"matched": 3, "skipped_existing": 1, "not_found": 0, "out_of_scope": 0}
+    assert insert_assignments(sqlite_db, wb.id, targets, t.id, batch_size=1) == 2
+    sqlite_db.commit()
+    assert sqlite_db.query(StudentWorkbook).count() == 3
+    assert resolve_targets(sqlite_db, wb.id, grade=8, class_section="8/A")[0] == []
+
+def test_student_list_reports_scope_and_missing(sqlite_db):
+    t, wb, students = _seed(sqlite_db)
+    scope = ScopeSet([(8, "8/A")])
+    ids = [students[1].id, students[3].id, uuid.uuid4()]
+    targets, summary = resolve_targets(sqlite_db, wb.id, student_ids=ids, scope=scope)
+    assert targets == [students[1].id]
+    assert summary == {"matched": 1, "skipped_existing": 0, "not_found": 1, "out_of_scope": 1}
+
+def test_single_assignment_rejects_duplicates(sqlite_db, monkeypatch, session_request):
+    monkeypatch.setattr(main, "audit", lambda db, **kw: None)
+    t, wb, students = _seed(sqlite_db)
+    t.username = "rooter"
+    sqlite_db.commit()
+    request = session_request(t)
+    payload = StudentWorkbookCreate(workbook_id=wb.id)
+    sw = assign_workbook(students[1].id, payload, request, db=sqlite_db, csrf=None)
+    assert sw.student_id == students[1].id
+    for student in students[:2]:
+        with pytest.raises(HTTPException) as e:
+            assign_workbook(student.id, payload, request, db=sqlite_db, csrf=None)
+        assert (e.value.status_code, e.value.detail) == (409, "already_assigned")
+    assert sqlite_db.query(StudentWorkbook).count() == 2
@@ -48,12 +48,23 @@ CREATE TABLE IF NOT EXISTS student (
   status student_status NOT NULL DEFAULT 'active',
   notes TEXT,
   created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  -- Turkish-folded name (İ/I/ı -> i, ç -> c, ...) for case/diacritic-insensitive search; keep in sync with backend/app/search.py
+  search_name TEXT GENERATED ALWAYS AS (lower(translate(full_name, 'İIıÇçĞğÖöŞşÜüÂâÎîÛû', 'iiiccggoossuuaaiiuu'))) STORED
 );
 
+-- Upgrade path for databases created before search_name existed
+ALTER TABLE student ADD COLUMN IF NOT EXISTS search_name TEXT
+  GENERATED ALWAYS AS (lower(translate(full_name, 'İIıÇçĞğÖöŞşÜüÂâÎîÛû', 'iiiccggoossuuaaiiuu'))) STORED;
+
 CREATE INDEX IF NOT EXISTS idx_student_grade ON student (grade);
 CREATE INDEX IF NOT EXISTS idx_student_class ON student (class_section);
-CREATE INDEX IF NOT EXISTS idx_student_name_trgm ON student USING gin (full_name gin_trgm_ops);
+-- Trigram index lives on the folded column; the raw full_name index could not serve folded lookups
+DROP INDEX IF EXISTS idx_student_name_trgm;
+CREATE INDEX IF NOT EXISTS idx_student_search_trgm ON student USING gin (search_name gin_trgm_ops);
+-- Matches the /students sort key. keyset_after() emits grade < :g OR (grade = :g AND (class_section, full_name, id) > (...)),
+-- so each branch is an index range condition (a BitmapOr of two ranges, or an ordered scan stopping at LIMIT)
+CREATE INDEX IF NOT EXISTS idx_student_list_order ON student (grade DESC, class_section, full_name, id);
 
 -- Teacher scope (least privilege)
 CREATE TABLE IF NOT EXISTS teacher_scope (
@@ -120,6 +131,22 @@ CREATE TABLE IF NOT EXISTS trial_result_subject (
 CREATE INDEX IF NOT EXISTS idx_trial_result_student ON trial_result (student_id);
 CREATE INDEX IF NOT EXISTS idx_trial_result_exam ON trial_result (trial_exam_id);
 
+-- Rolling per-student subject stats, maintained on result entry (backend/app/subject_stats.py).
+-- Rebuild after bulk SQL edits or a ROLLING_STATS_WINDOW change: python -m app.subject_stats rebuild
+CREATE TABLE IF NOT EXISTS student_subject_stats (
+  student_id UUID NOT NULL REFERENCES student(id) ON DELETE CASCADE,
+  subject_code TEXT NOT NULL,
+  sample_count INT NOT NULL DEFAULT 0,
+  recent_nets JSONB NOT NULL, -- last N nets, oldest first
+  recent_avg NUMERIC(6,3) NOT NULL,
+  best NUMERIC(6,3) NOT NULL,
+  worst NUMERIC(6,3) NOT NULL,
+  trend NUMERIC(6,3) NOT NULL DEFAULT 0, -- least-squares slope over recent_nets
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (student_id, subject_code)
+);
+CREATE INDEX IF NOT EXISTS idx_subject_stats_avg ON student_subject_stats (subject_code, recent_avg);
+
 -- Workbooks
 CREATE TABLE IF NOT EXISTS workbook (
   id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -143,6 +170,7 @@ CREATE TABLE IF NOT EXISTS student_workbook (
   progress_percent INT NOT NULL DEFAULT 0 CHECK (progress_percent BETWEEN 0 AND 100),
   progress_breakdown JSONB
 );
+CREATE INDEX IF NOT EXISTS idx_student_workbook_student ON student_workbook (student_id, workbook_id);
 
 -- Notes
 CREATE TABLE IF NOT EXISTS note (
@@ -155,7 +183,7 @@ CREATE TABLE IF NOT EXISTS note (
 
 -- Audit log
 CREATE TABLE IF NOT EXISTS audit_log (
-  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  id UUID NOT NULL DEFAULT uuid_generate_v4(),
   actor_id UUID NOT NULL,
   actor_role TEXT NOT NULL,
   action TEXT NOT NULL,
@@ -165,11 +193,31 @@ CREATE TABLE IF NOT EXISTS audit_log (
   before JSONB,
   after JSONB,
   ip TEXT,
-  user_agent TEXT
-);
-CREATE INDEX IF NOT EXISTS idx_audit_log_ts ON audit_log (ts);
-CREATE INDEX IF NOT EXISTS idx_audit_log_actor ON audit_log (actor_id);
-CREATE INDEX IF NOT EXISTS idx_audit_entity ON audit_log (entity_type, entity_id);
+  user_agent TEXT,
+  PRIMARY KEY (id, ts)
+) PARTITION BY RANGE (ts);
+-- Monthly partitions (UTC bounds) named audit_log_yYYYYmMM. The API creates future months on
+-- startup and `python -m app.audit_partitions retention` archives old ones (see audit_model.md).
+DO $$
+DECLARE m DATE;
+BEGIN
+  FOR m IN SELECT generate_series(date_trunc('month', now() AT TIME ZONE 'UTC'),
+                                  date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months',
+                                  interval '1 month')::date LOOP
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF audit_log FOR VALUES FROM (%L) TO (%L)',
+                   'audit_log_y' || to_char(m, 'YYYY') || 'm' || to_char(m, 'MM'),
+                   m::text || ' 00:00:00+00', (m + interval '1 month')::date::text || ' 00:00:00+00');
+  END LOOP;
+END $$;
+-- Composite indexes match the viewer filters; each ends in (ts, id) so the
+-- keyset cursor (ORDER BY ts DESC, id DESC) is served straight from the index.
+DROP INDEX IF EXISTS idx_audit_log_ts;
+DROP INDEX IF EXISTS idx_audit_log_actor;
+DROP INDEX IF EXISTS idx_audit_entity;
+CREATE INDEX IF NOT EXISTS idx_audit_ts_id ON audit_log (ts, id);
+CREATE INDEX IF NOT EXISTS idx_audit_actor_ts ON audit_log (actor_id, ts, id);
+CREATE INDEX IF NOT EXISTS idx_audit_action_ts ON audit_log (action, ts, id);
+CREATE INDEX IF NOT EXISTS idx_audit_entity_ts ON audit_log (entity_type, entity_id, ts, id);
 
 -- Sessions (server-side)
 CREATE TABLE IF NOT EXISTS session (
@@ -272,3 +320,8 @@ VALUES ('88888888-8888-8888-8888-888888888881', '44444444-4444-4444-4444-4444444
 INSERT INTO audit_log (id, actor_id, actor_role, action, entity_type, entity_id, before, after)
 VALUES ('99999999-9999-9999-9999-999999999991', '22222222-2222-2222-2222-222222222222', 'teacher', 'create', 'trial_result', '77777777-7777-7777-7777-777777777771', NULL,
         '{{"net_total": 80.0}}');
+
+-- Resource-book progress counters (backend/app/resource_progress.py); the table itself is created by the API.
+-- After upgrading, backfill with: python -m app.resource_progress rebuild
+ALTER TABLE IF EXISTS resource_book ADD COLUMN IF NOT EXISTS checked_count INT NOT NULL DEFAULT 0;
+ALTER TABLE IF EXISTS resource_book ADD COLUMN IF NOT EXISTS outcome_total INT NOT NULL DEFAULT 0;
@@ -13,6 +13,13 @@ GROUP BY s.id
 HAVING AVG(l.net) < 10
 ORDER BY avg_mat_net ASC;
 
+-- Same report from the maintained summary (window = ROLLING_STATS_WINDOW); also served by GET /reports/below-target
+SELECT s.full_name, s.class_section, st.recent_avg AS avg_mat_net, st.trend
+FROM student_subject_stats st
+JOIN student s ON s.id = st.student_id
+WHERE st.subject_code = 'MAT' AND st.recent_avg < 10
+ORDER BY st.recent_avg ASC;
+
 -- Workbook progress overview per class
 SELECT s.class_section, COUNT(*) AS student_count, AVG(sw.progress_percent) AS avg_progress
 FROM student_workbook sw